@@ -2,6 +2,8 @@
 import csv
 from pathlib import Path
 
+from pipeline.keywords import as_items, compile_matcher
+
 IN = Path("companies_master_final_auto_mapped.csv")
 OUT = Path("companies_master_final_auto_mapped_v2.csv")
 SUG = Path("keyword_map_suggestions.csv")
@@ -20,12 +22,12 @@ EXT_MAP = {
     "フィットネス":"フィットネス・健康サービス","スポーツ":"フィットネス・健康サービス"
 }
 
+MATCHER = compile_matcher({"ext": as_items(EXT_MAP)})
+
 def find_token_suggestion(text):
     t = (text or "").lower()
-    for tok, ind in EXT_MAP.items():
-        if tok in t:
-            return ind
-    return None
+    # EXT_MAP の順で最初に当たったトークンの業界
+    return MATCHER.scan(t).first("ext")
 
 # If IN doesn't exist, try fallback to companies_master_final.csv
 if not IN.exists():
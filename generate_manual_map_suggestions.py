@@ -1,7 +1,10 @@
 # generate_manual_map_suggestions.py
 import csv
+from collections import Counter
 from pathlib import Path
 
+from pipeline.keywords import as_items, compile_matcher
+
 IN_OTHERS = Path("others_companies.csv")
 IN_TOP100 = Path("top100_by_score.csv")
 OUT = Path("manual_industry_map_suggestions.csv")
@@ -20,16 +23,14 @@ KEYWORD_MAP = {
     "フィットネス":"フィットネス・健康サービス","スポーツ":"フィットネス・健康サービス",
 }
 
+MATCHER = compile_matcher({"industry": as_items(KEYWORD_MAP)})
+
 def score_suggestion(text):
     text = (text or "").lower()
-    hits = []
-    for k,v in KEYWORD_MAP.items():
-        if k in text:
-            hits.append(v)
+    hits = MATCHER.scan(text).values("industry")
     if not hits:
         return None, 0.0
     # 最頻値を候補、confidence = min(0.9, 0.4 + 0.2 * count)
-    from collections import Counter
     c = Counter(hits)
     cand, cnt = c.most_common(1)[0]
     confidence = min(0.95, 0.4 + 0.15 * cnt)
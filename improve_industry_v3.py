@@ -2,6 +2,8 @@
 import csv
 from pathlib import Path
 
+from pipeline.keywords import as_items, compile_matcher
+
 IN = Path("companies_master_with_meta.csv")
 OUT = Path("companies_master_reclassified_v4.csv")
 
@@ -18,6 +20,8 @@ KEYWORD_MAP = {
     "フィットネス":"フィットネス・健康サービス","スポーツ":"フィットネス・健康サービス",
 }
 
+MATCHER = compile_matcher({"industry": as_items(KEYWORD_MAP)})
+
 def classify_row(row):
     text = " ".join([
         (row.get("company_name") or ""),
@@ -25,10 +29,8 @@ def classify_row(row):
         (row.get("raw_medical_keywords") or ""),
         (row.get("raw_medical_domains") or "")
     ]).lower()
-    for k, v in KEYWORD_MAP.items():
-        if k in text:
-            return v
-    return row.get("industry") or "その他医療関連"
+    # 辞書の順で最初に当たったキーワードの業界（テキストは1回だけ走査）
+    return MATCHER.scan(text).first("industry") or row.get("industry") or "その他医療関連"
 
 with IN.open(encoding="utf-8") as f_in, OUT.open("w", encoding="utf-8", newline="") as f_out:
     reader = csv.DictReader(f_in)
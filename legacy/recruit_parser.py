@@ -1,6 +1,11 @@
 import requests
 from bs4 import BeautifulSoup
 
+try:
+    from pipeline.keywords import compile_matcher
+except ImportError:   # python legacy/recruit_parser.py で直接実行したとき。従来どおり k in text で照合する
+    compile_matcher = None
+
 # ============================
 # フェーズ4-1：医療系キーワード辞書
 # ============================
@@ -26,8 +31,9 @@ MEDICAL_KEYWORDS = [
 ]
 
 
-def calculate_medical_score(text):
-    hits = [kw for kw in MEDICAL_KEYWORDS if kw in text]
+def calculate_medical_score(text, found=None):
+    found = found or scan(text)
+    hits = found.keys("keywords")
     count = len(hits)
 
     if count <= 1:
@@ -79,13 +85,13 @@ MEDICAL_DOMAINS = {
 }
 
 
-def classify_medical_domain(text):
+def classify_medical_domain(text, found=None):
+    found = found or scan(text)
     domain_scores = {}
 
-    for domain, keywords in MEDICAL_DOMAINS.items():
-        count = sum(1 for kw in keywords if kw in text)
-        if count > 0:
-            domain_scores[domain] = count
+    # 領域ごとのヒット数（values は領域の順に並ぶ）
+    for domain in found.values("domains"):
+        domain_scores[domain] = domain_scores.get(domain, 0) + 1
 
     if not domain_scores:
         return [], {}
@@ -125,17 +131,49 @@ MEDICAL_ROLE_KEYWORDS = {
 }
 
 
-def extract_medical_roles(text):
-    matched_roles = []
-
-    for category, keywords in MEDICAL_ROLE_KEYWORDS.items():
-        for kw in keywords:
-            if kw in text:
-                matched_roles.append(kw)
+def extract_medical_roles(text, found=None):
+    found = found or scan(text)
+    matched_roles = found.keys("roles")
 
     return list(dict.fromkeys(matched_roles))
 
 
+# ============================
+# 3つの辞書をまとめた照合（ページのテキストは1回だけ走査する）
+# ============================
+
+def dictionary_items(mapping):
+    """[キーワード] → [(キーワード, キーワード)]、{値: [キーワード, ...]} → [(キーワード, 値)]"""
+    if isinstance(mapping, dict):
+        return [(kw, name) for name, kws in mapping.items() for kw in kws]
+    return [(kw, kw) for kw in mapping]
+
+
+DICTIONARIES = {
+    "keywords": dictionary_items(MEDICAL_KEYWORDS),
+    "domains": dictionary_items(MEDICAL_DOMAINS),
+    "roles": dictionary_items(MEDICAL_ROLE_KEYWORDS),
+}
+MATCHER = compile_matcher(DICTIONARIES) if compile_matcher else None
+
+
+class PlainHits:
+    """pipeline を読み込めないときの照合結果（辞書を1つずつ k in text で調べる。結果は MATCHER と同じ）"""
+
+    def __init__(self, text):
+        self.text = text or ""
+
+    def keys(self, name):
+        return [k for k, _ in DICTIONARIES[name] if k in self.text]
+
+    def values(self, name):
+        return [v for k, v in DICTIONARIES[name] if k in self.text]
+
+
+def scan(text):
+    return MATCHER.scan(text) if MATCHER else PlainHits(text)
+
+
 # ============================
 # フェーズ4-4：総合スコア
 # ============================
@@ -187,7 +225,7 @@ def calculate_total_score(medical_score, domains, medical_roles):
 # メイン関数：採用ページ解析
 # ============================
 
-def parse_recruit_page(url):
+def fetch_page_text(url):
     try:
         resp = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
         html = resp.text
@@ -195,11 +233,16 @@ def parse_recruit_page(url):
         html = ""
 
     soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text(separator=" ", strip=True)
+    return soup.get_text(separator=" ", strip=True)
+
+
+def parse_recruit_page(url):
+    text = fetch_page_text(url)
 
-    medical_hits, medical_count, medical_score = calculate_medical_score(text)
-    domains, domain_scores = classify_medical_domain(text)
-    medical_roles = extract_medical_roles(text)
+    found = scan(text)
+    medical_hits, medical_count, medical_score = calculate_medical_score(text, found)
+    domains, domain_scores = classify_medical_domain(text, found)
+    medical_roles = extract_medical_roles(text, found)
 
     total_score = calculate_total_score(
         medical_score,
@@ -17,6 +17,14 @@ except Exception:
     TextMessage = None
     TextSendMessage = None
 
+# Similar-companies graph (built offline by `python -m pipeline.similar`)
+try:
+    from line_tools.similar_companies import load_graph
+except ImportError:
+    from similar_companies import load_graph
+
+DETAIL_SUFFIX = " の詳細を知りたい"   # line_sender.send_carousel() の「詳細を見る」が送る文言
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("line_server")
@@ -73,6 +81,22 @@ def callback():
 
     return jsonify({}), 200
 
+def similar_companies_reply(text):
+    """「詳細を見る」のメッセージなら似ている企業の一覧を返す（それ以外・一覧がなければ None）"""
+    if not text.endswith(DETAIL_SUFFIX):
+        return None
+    graph = load_graph()
+    if graph is None:
+        return None
+    similar = graph.similar(name=text[:-len(DETAIL_SUFFIX)])
+    if not similar:
+        return None
+    lines = ["こちらの企業も似ています。"]
+    for i, c in enumerate(similar, start=1):
+        tags = f"（{' / '.join(c['tags'])}）" if c["tags"] else ""
+        lines.append(f"{i}. {c['name']}{tags}")
+    return "\n".join(lines)
+
 # Register message handler only if handler is initialized
 if handler is not None and MessageEvent is not None:
     @handler.add(MessageEvent, message=TextMessage)
@@ -80,8 +104,8 @@ if handler is not None and MessageEvent is not None:
         try:
             text = event.message.text if event.message and hasattr(event.message, "text") else ""
             app.logger.info(f"handle_message called. text={text!r}, reply_token={event.reply_token}")
-            # Echo back the received text
-            line_bot_api.reply_message(event.reply_token, TextSendMessage(text=text))
+            reply = similar_companies_reply(text) or text  # Echo back the received text otherwise
+            line_bot_api.reply_message(event.reply_token, TextSendMessage(text=reply))
             app.logger.info("reply_message succeeded")
         except Exception:
             app.logger.error("Failed to reply message:")
@@ -0,0 +1,71 @@
+# line_tools/similar_companies.py
+# 似ている企業の一覧（python -m pipeline.similar で作る similar_companies.bin / .json）を引く
+# ファイルは mmap するだけなので、起動時に全件を読み込まず、1社あたり O(k) で引ける（numpy 不要）
+import json
+import mmap
+import os
+import struct
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+GRAPH_PATH = os.path.join(THIS_DIR, "similar_companies.bin")
+
+MAGIC = b"SIMC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIII")   # pipeline/similar.py と同じ
+
+
+class SimilarCompanies:
+    def __init__(self, path=GRAPH_PATH):
+        with open(os.path.splitext(path)[0] + ".json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.n, self.k = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or self.n != len(self.meta):
+            raise ValueError(f"{path} の形式が違います。python -m pipeline.similar で作り直してください。")
+        self._nbrs = struct.Struct(f"<{self.k}i")
+        self._sims = struct.Struct(f"<{self.k}f")
+        self._sims_offset = HEADER.size + self.n * self.k * 4
+        self.row_by_id = {m["company_id"]: i for i, m in enumerate(self.meta)}
+        self.row_by_name = {}
+        for i, m in enumerate(self.meta):
+            self.row_by_name.setdefault(m["company_name"], i)
+
+    def neighbors(self, row, limit=None):
+        """行番号 → [(近傍の行番号, 類似度)]（類似度の高い順）"""
+        nbrs = self._nbrs.unpack_from(self._mm, HEADER.size + row * self.k * 4)
+        sims = self._sims.unpack_from(self._mm, self._sims_offset + row * self.k * 4)
+        out = [(j, s) for j, s in zip(nbrs, sims) if j >= 0]
+        return out[:limit] if limit else out
+
+    def similar(self, company_id=None, name=None, limit=3):
+        """company_id（または社名）に似ている企業を send_carousel() に渡せる dict で返す"""
+        row = self.row_by_id.get(company_id) if company_id is not None else self.row_by_name.get(name)
+        if row is None:
+            return []
+        out = []
+        for j, s in self.neighbors(row, limit):
+            m = self.meta[j]
+            out.append({
+                "company_id": m["company_id"],
+                "name": m["company_name"],
+                "medical_score": m["medical_relevance_score"],
+                "tags": [m["industry"]] if m["industry"] else [],
+                "similarity": round(s, 3),
+            })
+        return out
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+_GRAPH = None
+
+
+def load_graph():
+    """サーバーで共有する1つのインスタンス（ファイルがなければ None）"""
+    global _GRAPH
+    if _GRAPH is None and os.path.exists(GRAPH_PATH):
+        _GRAPH = SimilarCompanies(GRAPH_PATH)
+    return _GRAPH
@@ -1,4 +1,4 @@
-import csv
+from pathlib import Path
 from flask import Flask, request, abort
 from linebot import LineBotApi, WebhookHandler
 from linebot.exceptions import InvalidSignatureError
@@ -6,6 +6,7 @@ from linebot.models import MessageEvent, TextMessage, TextSendMessage
 
 from diagnosis.diagnosis_core import diagnose_thinking_pattern
 from diagnosis.questions import questions
+from pipeline.company import load_companies as load_company_records
 
 app = Flask(__name__)
 
@@ -26,21 +27,16 @@ user_answers = {}  # {user_id: {1:1, 2:0, ...}}
 def load_companies(csv_path="data/companies_master.csv"):
     companies = []
     try:
-        with open(csv_path, encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # 数値項目を int に変換
-                for key in [
-                    "medical_relevance_score",
-                    "side_job_fit_score",
-                    "career_shift_fit_score",
-                    "hybrid_fit_score",
-                ]:
-                    if key in row and row[key].isdigit():
-                        row[key] = int(row[key])
-                    else:
-                        row[key] = 0
-                companies.append(row)
+        companies, _ = load_company_records(Path(csv_path))
+        # 数値項目は従来どおり、数字だけのセルを int にしてそれ以外（小数・空欄など）は 0 にする
+        for c in companies:
+            for key in [
+                "medical_relevance_score",
+                "side_job_fit_score",
+                "career_shift_fit_score",
+                "hybrid_fit_score",
+            ]:
+                c[key] = int(c.cell(key)) if c.cell(key).isdigit() else 0
     except Exception as e:
         print("CSV読み込みエラー:", e)
     return companies
@@ -0,0 +1,168 @@
+# pipeline/backup_store.py
+# 内容アドレス型のバックアップ（backup_before_run/ の .bak 全件コピーの置き換え）
+#
+# backup_before_run/
+#   objects/ab/abcdef....gz   ファイル内容の gzip。キーは元内容の sha256（同じ内容は1回だけ保存）
+#   manifests/<run_id>.json   実行ごとの一覧（ファイル名 → ハッシュ・サイズ・mtime）
+#
+# サイズと mtime が前回と同じファイルはハッシュ計算もしないので、変化のないファイルのバックアップは
+# manifest の1行だけで済む。
+import argparse, gzip, hashlib, json, shutil, sys, time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_KEEP = 20   # 既定で残す実行数
+
+
+def sha256_file(path: Path):
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BackupStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.manifests = self.root / "manifests"
+
+    def object_path(self, digest):
+        return self.objects / digest[:2] / (digest + ".gz")
+
+    def runs(self):
+        """run_id を古い順に返す"""
+        if not self.manifests.exists():
+            return []
+        return sorted(p.stem for p in self.manifests.glob("*.json"))
+
+    def manifest(self, run_id):
+        return json.loads((self.manifests / (run_id + ".json")).read_text(encoding="utf-8"))
+
+    def _new_run_id(self):
+        base = datetime.now().strftime("%Y%m%d-%H%M%S")
+        run_id, n = base, 1
+        while (self.manifests / (run_id + ".json")).exists():
+            n += 1
+            run_id = f"{base}-{n:03d}"
+        return run_id
+
+    def _known_stats(self):
+        """直近の manifest から (name, size, mtime_ns) → hash を引けるようにする"""
+        runs = self.runs()
+        if not runs:
+            return {}
+        files = self.manifest(runs[-1])["files"]
+        return {(name, f["size"], f["mtime_ns"]): f["sha256"] for name, f in files.items()}
+
+    def backup(self, paths, note=""):
+        """存在するファイルを保存し、run_id を返す。新しい内容だけ objects に書く"""
+        self.manifests.mkdir(parents=True, exist_ok=True)
+        known = self._known_stats()
+        files = {}
+        stored = 0
+        for p in paths:
+            p = Path(p)
+            if not p.exists():
+                continue
+            st = p.stat()
+            digest = known.get((p.name, st.st_size, st.st_mtime_ns))
+            if digest is None or not self.object_path(digest).exists():
+                digest = sha256_file(p)
+            obj = self.object_path(digest)
+            if not obj.exists():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                tmp = obj.with_suffix(".tmp")
+                with p.open("rb") as src, gzip.open(tmp, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                tmp.replace(obj)
+                stored += 1
+            files[p.name] = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "path": str(p)}
+        run_id = self._new_run_id()
+        manifest = {"run_id": run_id, "created": time.time(), "note": note, "files": files}
+        (self.manifests / (run_id + ".json")).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        return run_id, stored
+
+    def open_text(self, run_id, name):
+        """保存済みファイルをテキストで開く（展開せずに読む用）"""
+        digest = self.manifest(run_id)["files"][name]["sha256"]
+        return gzip.open(self.object_path(digest), "rt", encoding="utf-8", newline="")
+
+    def restore(self, run_id, dest: Path, names=None):
+        """run_id の時点のファイルを dest に戻す。戻したファイル名を返す"""
+        files = self.manifest(run_id)["files"]
+        restored = []
+        for name, f in files.items():
+            if names and name not in names:
+                continue
+            with gzip.open(self.object_path(f["sha256"]), "rb") as src, (Path(dest) / name).open("wb") as dst:
+                shutil.copyfileobj(src, dst)
+            restored.append(name)
+        return restored
+
+    def prune(self, keep=DEFAULT_KEEP, max_age_days=None):
+        """古い manifest を消し、どの manifest からも参照されない objects を消す"""
+        runs = self.runs()
+        drop = set(runs[:-keep]) if keep and len(runs) > keep else set()
+        if max_age_days is not None:
+            limit = time.time() - max_age_days * 86400
+            for run_id in runs:
+                if self.manifest(run_id)["created"] < limit:
+                    drop.add(run_id)
+        if runs and len(drop) == len(runs):
+            drop.discard(runs[-1])   # 最新の1件は必ず残す
+        for run_id in drop:
+            (self.manifests / (run_id + ".json")).unlink()
+        removed = 0
+        if drop and self.objects.exists():
+            live = {f["sha256"] for run_id in self.runs() for f in self.manifest(run_id)["files"].values()}
+            for obj in self.objects.glob("*/*.gz"):
+                if obj.name[:-3] not in live:
+                    obj.unlink()
+                    removed += 1
+        return len(drop), removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="backup_before_run/ のバックアップ管理")
+    parser.add_argument("--root", default="backup_before_run")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="実行ごとのバックアップ一覧")
+    p_res = sub.add_parser("restore", help="指定した実行時点のファイルを戻す")
+    p_res.add_argument("run_id", help="run_id（latest で最新）")
+    p_res.add_argument("files", nargs="*", help="戻すファイル名（省略時は全部）")
+    p_res.add_argument("--dest", default=".")
+    p_pr = sub.add_parser("prune", help="保持ポリシーで古いバックアップを削除")
+    p_pr.add_argument("--keep", type=int, default=DEFAULT_KEEP, help="残す実行数")
+    p_pr.add_argument("--max-age-days", type=float, help="これより古い実行を消す")
+    args = parser.parse_args(argv)
+
+    store = BackupStore(Path(args.root))
+    if args.cmd == "list":
+        for run_id in store.runs():
+            m = store.manifest(run_id)
+            print(run_id, len(m["files"]), "files", m.get("note", ""))
+    elif args.cmd == "restore":
+        runs = store.runs()
+        if not runs:
+            print("ERROR: バックアップがありません。")
+            return 1
+        run_id = runs[-1] if args.run_id == "latest" else args.run_id
+        if run_id not in runs:
+            print(f"ERROR: run_id {run_id} のバックアップはありません。あるもの:", ", ".join(runs))
+            return 1
+        missing = sorted(set(args.files) - set(store.manifest(run_id)["files"]))
+        if missing:
+            print(f"ERROR: {run_id} に含まれないファイル: {', '.join(missing)}"
+                  f"（含まれるもの: {', '.join(store.manifest(run_id)['files'])}）")
+            return 1
+        for name in store.restore(run_id, Path(args.dest), names=set(args.files)):
+            print("復元:", name)
+    elif args.cmd == "prune":
+        runs, objs = store.prune(keep=args.keep, max_age_days=args.max_age_days)
+        print(f"削除: manifest {runs} 件 / object {objs} 件")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# pipeline/bench.py
+# 企業パイプラインのベンチマーク（合成データ 1k〜1M 行）
+#
+#   python -m pipeline.bench --sizes 1000,10000,100000 --out bench_results.json
+#
+# サイズごとに一時ディレクトリへ合成の companies_master_raw.csv を作り、対象ごとに別プロセスで実行する
+# （ピーク RSS をプロセス単位で測るため）。
+#   pipeline        run_pipeline() を --profile と同じ計測付きで実行（ステージ別の時間・件/秒）
+#   compute_scores  compute_scores.py（入力 companies_master_final.csv）
+#   rescale_scores  rescale_scores.py（入力 companies_master_reclassified_v4.csv）
+# 結果は JSON（サイズ×対象ごとの時間・件/秒・ピーク RSS と、サイズに対するスケーリング指数）。
+import argparse, json, math, os, runpy, shutil, subprocess, sys, tempfile, time
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+from pipeline.synthetic import Vocab, generate
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TARGETS = ["pipeline", "compute_scores", "rescale_scores"]
+# スクリプトごとの入力ファイル名
+SCRIPT_INPUTS = {
+    "compute_scores": "companies_master_final.csv",
+    "rescale_scores": "companies_master_reclassified_v4.csv",
+}
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KiB、macOS は byte
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def child(target, workdir: Path, rows):
+    """子プロセス側: workdir で target を1回実行し、結果を JSON で標準出力の最終行に出す"""
+    os.chdir(workdir)
+    result = {"target": target, "rows": rows}
+    if target == "pipeline":
+        from pipeline.profiling import Profiler
+        from pipeline.runner import PipelineConfig, run_pipeline
+        # メモリは RSS で測るので tracemalloc は使わない（有効にすると処理が大きく遅くなる）
+        prof = Profiler(trace_memory=False)
+        cfg = PipelineConfig(root=workdir, manual_prefill=workdir / "manual_industry_map_prefill.csv",
+                             auto_apply_log=workdir / "auto_apply_log.csv", profiler=prof)
+        t = time.perf_counter()
+        run_pipeline(cfg)
+        result["wall_sec"] = time.perf_counter() - t
+        result["stages"] = prof.report()["stages"]
+    else:
+        shutil.copy(workdir / "companies_master_raw.csv", workdir / SCRIPT_INPUTS[target])
+        t = time.perf_counter()
+        script = str(REPO_ROOT / (target + ".py"))
+        sys.argv = [script]   # bench 自身の引数をスクリプトに渡さない
+        try:
+            runpy.run_path(script, run_name="__main__")
+        except SystemExit as e:   # sys.exit(main()) で終わるスクリプト。0 以外は失敗
+            if e.code not in (None, 0):
+                raise
+        result["wall_sec"] = time.perf_counter() - t
+    result["rows_per_sec"] = rows / result["wall_sec"] if result["wall_sec"] > 0 else None
+    result["peak_rss_bytes"] = peak_rss_bytes()
+    sys.stdout.flush()
+    print("\n" + json.dumps(result, ensure_ascii=False))
+
+
+def run_child(target, workdir: Path, rows):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run([sys.executable, "-m", "pipeline.bench", "--child", target, "--workdir", str(workdir),
+                           "--rows", str(rows)], capture_output=True, text=True, encoding="utf-8", env=env)
+    if proc.returncode != 0:
+        return {"target": target, "rows": rows, "error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def scaling(results, target):
+    """log(時間)/log(件数) の傾き。1 付近なら線形、2 付近なら二乗"""
+    pts = sorted((r["rows"], r["wall_sec"]) for r in results if r["target"] == target and r.get("wall_sec"))
+    slopes = []
+    for (n0, t0), (n1, t1) in zip(pts, pts[1:]):
+        if n1 > n0 and t0 > 0 and t1 > 0:
+            slopes.append(round(math.log(t1 / t0) / math.log(n1 / n0), 3))
+    return slopes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="企業パイプラインのベンチマーク")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="カンマ区切りの行数（例 1000,10000,100000,1000000）")
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--keep", action="store_true", help="作業ディレクトリを残す")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child, Path(args.workdir), args.rows)
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    targets = [t for t in args.targets.split(",") if t]
+    vocab = Vocab.from_master()
+    results = []
+    for n in sizes:
+        workdir = Path(tempfile.mkdtemp(prefix=f"bench_{n}_"))
+        try:
+            t = time.perf_counter()
+            generate(n, workdir / "companies_master_raw.csv", vocab, args.seed)
+            print(f"[{n} 行] 合成データ生成 {time.perf_counter() - t:.2f}s")
+            for target in targets:
+                res = run_child(target, workdir, n)
+                results.append(res)
+                if "error" in res:
+                    print(f"  {target:<15} ERROR {res['error']}")
+                else:
+                    rss = f"{res['peak_rss_bytes'] / 1024 / 1024:.0f}MiB" if res["peak_rss_bytes"] else "-"
+                    print(f"  {target:<15} {res['wall_sec']:.3f}s  {res['rows_per_sec']:.0f} 行/秒  peak RSS {rss}")
+        finally:
+            if args.keep:
+                print("  作業ディレクトリ:", workdir)
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "sizes": sizes,
+        "results": results,
+        "scaling_exponent": {t: scaling(results, t) for t in targets},
+    }
+    Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("スケーリング指数（1≒線形）:", report["scaling_exponent"])
+    print("書き出し完了:", args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# pipeline/categorical.py
+# 種類の少ない文字列列の辞書エンコード（industry / target_background / short_description）
+#
+#   col = CategoricalColumn.encode([r["industry"] for r in rows])
+#   col.dictionary.values   → ["医療機器メーカー", "その他医療関連", ...]（出現順）
+#   col.codes               → 行ごとのコード（numpy int32）
+#   col.counts()            → 値ごとの行数（業界別の集計。文字列の比較はしない）
+#
+# 業界ごとの計算（pipeline/scoring.py の industry_codes）と集計（runner.print_summary）はコードで行う。
+# 行の dict にはそのまま文字列が入るが、share_strings() で同じ値を1つの str オブジェクトにまとめるので
+# 行ごとのコピーは持たない。スナップショット（pipeline/snapshots.py）ではこの列を Arrow の dictionary 型で保存する。
+import numpy as np
+
+CATEGORICAL_FIELDS = ["industry", "target_background", "short_description"]
+
+
+class Dictionary:
+    """値 ↔ コード の対応（コードは出現順の連番）"""
+
+    def __init__(self, values=()):
+        self.values = []
+        self.index = {}
+        for v in values:
+            self.code(v)
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        """value のコード（未登録なら追加する）"""
+        c = self.index.get(value)
+        if c is None:
+            c = self.index[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+
+class CategoricalColumn:
+    def __init__(self, dictionary, codes):
+        self.dictionary = dictionary
+        self.codes = codes
+
+    @classmethod
+    def encode(cls, values, dictionary=None):
+        d = dictionary or Dictionary()
+        codes = np.fromiter((d.code(v or "") for v in values), dtype=np.int32)
+        return cls(d, codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def counts(self):
+        """値 → 行数（辞書の順 = 最初に出てきた順。数えるのはコードの bincount 1回）"""
+        n = np.bincount(self.codes, minlength=len(self.dictionary)).tolist()
+        return dict(zip(self.dictionary.values, n))
+
+
+def share_strings(rows, fields=CATEGORICAL_FIELDS):
+    """rows の fields 列で同じ値の文字列を1つのオブジェクトにまとめる（行ごとのコピーをなくす）"""
+    for k in fields:
+        shared = {}
+        for r in rows:
+            v = r.get(k)
+            if v is not None:
+                r[k] = shared.setdefault(v, v)
+    return rows
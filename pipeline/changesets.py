@@ -0,0 +1,173 @@
+# pipeline/changesets.py
+# 実行ごとの変更セット（前回の companies_master_final.csv との差分）
+#
+# changes/
+#   index.json           実行の一覧（古い順。run_id・件数・作成日時）
+#   <run_id>.jsonl       1行1変更 {"op": "added" | "removed" | "changed", "company_id", "company_name", "fields"}
+#                          added   : fields = 追跡列の値
+#                          removed : fields = 削除前の追跡列の値
+#                          changed : fields = 変わった列だけ {列: [前, 後]}
+#
+# run_id は実行開始時のバックアップ（pipeline/backup_store.py）と同じ。前回の最終ファイルは
+# そのバックアップから読み、company_id をキーにしたハッシュ結合で比較する。
+#
+# 利用側（PDF 再生成・LINE サーバー・select_and_pitch.py など）は前回処理した run_id 以降の変更だけを読む:
+#   log = ChangeLog(Path("changes"))
+#   for run_id, ch in log.since(last_run_id):
+#       ...
+#   upserts, removed = log.pending_ids(last_run_id)   # 再処理する ID / 消す ID
+#   last_run_id = log.latest()
+import argparse, csv, json, sys, time
+from pathlib import Path
+
+from pipeline.backup_store import BackupStore
+from pipeline.loader import load_rows
+from pipeline.rules import FINAL_FIELDS
+
+KEY = "company_id"
+# 比較する列（業界・スコア・説明文）
+TRACKED_FIELDS = ["industry", "medical_relevance_score"] + FINAL_FIELDS
+
+
+def read_tracked(rows):
+    """dict 行 → company_id → (company_name, 追跡列の値のタプル)。同じ ID は後の行を使う"""
+    out = {}
+    for r in rows:
+        out[r.get(KEY) or ""] = (r.get("company_name") or "", tuple(r.get(k) or "" for k in TRACKED_FIELDS))
+    return out
+
+
+def diff(prev, cur):
+    """prev / cur（read_tracked の結果）の変更を入力順（cur の順 → 削除分）で返す"""
+    changes = []
+    for cid, (name, vals) in cur.items():
+        old = prev.get(cid)
+        if old is None:
+            changes.append({"op": "added", KEY: cid, "company_name": name,
+                            "fields": dict(zip(TRACKED_FIELDS, vals))})
+        elif old[1] != vals:
+            fields = {k: [a, b] for k, a, b in zip(TRACKED_FIELDS, old[1], vals) if a != b}
+            changes.append({"op": "changed", KEY: cid, "company_name": name, "fields": fields})
+    for cid, (name, vals) in prev.items():
+        if cid not in cur:
+            changes.append({"op": "removed", KEY: cid, "company_name": name,
+                            "fields": dict(zip(TRACKED_FIELDS, vals))})
+    return changes
+
+
+class ChangeLog:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+
+    def index(self):
+        if not self.index_path.exists():
+            return []
+        return json.loads(self.index_path.read_text(encoding="utf-8"))
+
+    def runs(self):
+        """run_id を古い順に返す"""
+        return [e["run_id"] for e in self.index()]
+
+    def latest(self):
+        runs = self.runs()
+        return runs[-1] if runs else None
+
+    def write(self, run_id, changes):
+        """run_id の変更セットを保存し、件数の dict を返す"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (run_id + ".jsonl.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for ch in changes:
+                f.write(json.dumps(ch, ensure_ascii=False) + "\n")
+        tmp.replace(self.root / (run_id + ".jsonl"))
+        counts = {op: sum(1 for ch in changes if ch["op"] == op) for op in ["added", "removed", "changed"]}
+        index = [e for e in self.index() if e["run_id"] != run_id]
+        index.append(dict({"run_id": run_id, "created": time.time()}, **counts))
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.index_path)
+        return counts
+
+    def changes(self, run_id):
+        """run_id の変更を1件ずつ返す"""
+        with (self.root / (run_id + ".jsonl")).open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def since(self, run_id=None):
+        """run_id より後の実行の変更を古い順に (run_id, 変更) で返す（None なら全部）"""
+        runs = self.runs()
+        if run_id is not None:
+            if run_id not in runs:
+                raise KeyError(f"変更セットにない run_id です: {run_id}")
+            runs = runs[runs.index(run_id) + 1:]
+        for r in runs:
+            for ch in self.changes(r):
+                yield r, ch
+
+    def pending_ids(self, run_id=None):
+        """run_id 以降の変更をまとめた (再処理する ID の集合, 削除された ID の集合)"""
+        upserts, removed = set(), set()
+        for _, ch in self.since(run_id):
+            cid = ch[KEY]
+            if ch["op"] == "removed":
+                upserts.discard(cid)
+                removed.add(cid)
+            else:
+                removed.discard(cid)
+                upserts.add(cid)
+        return upserts, removed
+
+
+def record_changeset(cfg, changes_dir: Path):
+    """今回の実行開始時のバックアップにある前回の最終ファイルと、今回の最終ファイルの差分を保存する"""
+    store = BackupStore(cfg.backup_dir)
+    runs = store.runs()
+    if not runs or not cfg.final.exists():
+        return None
+    run_id = runs[-1]
+    prev = {}
+    if cfg.final.name in store.manifest(run_id)["files"]:
+        with store.open_text(run_id, cfg.final.name) as f:
+            prev = read_tracked(csv.DictReader(f))
+    rows, _ = load_rows(cfg.final, [KEY, "company_name"] + TRACKED_FIELDS)
+    changes = diff(prev, read_tracked(rows))
+    counts = ChangeLog(changes_dir).write(run_id, changes)
+    print(f"Step: 変更セット {run_id}（追加 {counts['added']} / 削除 {counts['removed']} / 変更 {counts['changed']}）"
+          f" -> {changes_dir.name}/")
+    return run_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="実行ごとの変更セット（changes/）")
+    parser.add_argument("--root", default="changes")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="実行ごとの件数")
+    p_since = sub.add_parser("since", help="指定した run_id より後の変更を表示する")
+    p_since.add_argument("run_id", nargs="?", help="省略時は全部")
+    p_since.add_argument("--ids", action="store_true", help="再処理する ID / 削除された ID だけを表示する")
+    args = parser.parse_args(argv)
+
+    log = ChangeLog(Path(args.root))
+    if args.cmd == "list":
+        for e in log.index():
+            print(e["run_id"], f"added={e['added']} removed={e['removed']} changed={e['changed']}")
+        return 0
+    try:
+        if args.ids:
+            upserts, removed = log.pending_ids(args.run_id)
+            print("upsert:", ",".join(sorted(upserts)))
+            print("removed:", ",".join(sorted(removed)))
+        else:
+            for run_id, ch in log.since(args.run_id):
+                print(run_id, json.dumps(ch, ensure_ascii=False))
+    except KeyError as e:
+        print("ERROR:", e.args[0])
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
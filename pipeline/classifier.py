@@ -0,0 +1,223 @@
+# pipeline/classifier.py
+# manual 指定・自動適用ログから学習する業界分類器（--classifier）
+#
+#   python -m pipeline.classifier train     # manual_industry_map_template.csv とキーワード推定から学習し直す
+#   python -m pipeline.classifier update    # まだ学習していない指定だけを partial_fit で追加学習
+#   python run_pipeline_full.py --classifier
+#
+# 社名・説明・キーワード・領域の文字 n-gram を HashingVectorizer で疎行列にし、SGDClassifier（log loss）で
+# 分類する。全行の予測は疎行列の積1回。confidence は交差検証の予測から作った isotonic 回帰で
+# 「その confidence の候補が正解だった割合」に補正してあるので、prefill / 自動適用の閾値にそのまま使える。
+# 補正に使えるのは学習例（＝分類しやすい行）だけなので、補正は confidence を下げる向きにだけ効かせる。
+# 学習例は manual 指定（重み 1.0）と、キーワード推定が自動適用の閾値以上になる行（重み AUTO_WEIGHT）。
+# 自動適用ログは分類器の予測でも書き換わるので学習には使わない（自分の予測を学習し続けないように）。
+# DEFAULT_CLASS（その他医療関連）は「どの業界でもない」を学ぶために学習するが、候補には出さない
+# （キーワード推定でヒットがないときと同じ空の候補にする。具体的な業界を catch-all で上書きしないように）。
+import argparse, hashlib, pickle, sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import KFold
+
+from pipeline.company_table import load_manual_map
+from pipeline.loader import load_rows
+from pipeline.rules import KEYWORD_MAP, suggest_row, suggestion_text
+
+MODEL_PATH = Path("industry_classifier.pkl")
+MODEL_VERSION = 1   # 保存形式・特徴量の作り方を変えたら上げる
+FEATURE_FIELDS = ["company_name","short_description","raw_medical_keywords","raw_medical_domains"]
+DEFAULT_CLASS = "その他医療関連"   # 学習はするが候補にはしない
+N_FEATURES = 2 ** 18
+NGRAM_RANGE = (1, 3)
+EPOCHS = 30              # 学習時に partial_fit を回す回数
+UPDATE_EPOCHS = 5        # 追加学習で回す回数
+AUTO_WEIGHT = 0.3        # キーワード推定で自動適用される行の重み（manual は 1.0）
+AUTO_THRESHOLD = 0.8     # キーワード推定をこの confidence 以上で学習例にする（自動適用の閾値と同じ）
+MIN_CALIBRATION = 20     # これより例が少なければ confidence を補正しない
+FOLDS = 5
+
+
+def make_vectorizer():
+    return HashingVectorizer(analyzer="char", ngram_range=NGRAM_RANGE, n_features=N_FEATURES,
+                             alternate_sign=False, norm="l2", lowercase=True)
+
+
+def make_model():
+    return SGDClassifier(loss="log_loss", alpha=1e-4, random_state=0)
+
+
+def fit_epochs(model, X, y, w, classes, epochs):
+    for _ in range(epochs):
+        model.partial_fit(X, y, classes=classes, sample_weight=w)
+    return model
+
+
+class IndustryClassifier:
+    def __init__(self, classes):
+        self.classes = np.array(sorted(classes), dtype=object)
+        self.model = make_model()
+        self.calibrator = None
+        self.seen = {}   # 学習済みの例 company_id → (業界, 重み)
+        self.vectorizer = make_vectorizer()   # 状態を持たないので保存しない
+
+    def fingerprint(self):
+        """重みのハッシュ（差分実行の状態に使う）"""
+        h = hashlib.sha1(self.model.coef_.tobytes())
+        h.update(self.model.intercept_.tobytes())
+        return h.hexdigest()
+
+    def fit(self, ids, texts, labels, weights):
+        """学習し直す。交差検証で confidence の補正を作り、その正解率を返す"""
+        X = self.vectorizer.transform(texts)
+        y = np.array(labels, dtype=object)
+        w = np.asarray(weights, dtype=float)
+        acc = None
+        self.calibrator = None
+        if len(y) >= MIN_CALIBRATION:
+            conf = np.zeros(len(y))
+            correct = np.zeros(len(y))
+            for tr, te in KFold(n_splits=FOLDS, shuffle=True, random_state=0).split(X):
+                m = fit_epochs(make_model(), X[tr], y[tr], w[tr], self.classes, EPOCHS)
+                proba = m.predict_proba(X[te])
+                conf[te] = proba.max(axis=1)
+                correct[te] = self.classes[proba.argmax(axis=1)] == y[te]
+            self.calibrator = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip")
+            self.calibrator.fit(conf, correct, sample_weight=w)
+            acc = float(np.average(correct, weights=w))
+        self.model = fit_epochs(make_model(), X, y, w, self.classes, EPOCHS)
+        self.seen = {cid: (lab, wt) for cid, lab, wt in zip(ids, labels, weights)}
+        return acc
+
+    def partial_fit(self, ids, texts, labels, weights):
+        """新しい例だけで追加学習する（confidence の補正はそのまま）。学習した件数を返す"""
+        keep = [i for i, lab in enumerate(labels) if lab in set(self.classes)]
+        if not keep:
+            return 0
+        X = self.vectorizer.transform([texts[i] for i in keep])
+        y = np.array([labels[i] for i in keep], dtype=object)
+        w = np.array([weights[i] for i in keep], dtype=float)
+        fit_epochs(self.model, X, y, w, self.classes, UPDATE_EPOCHS)
+        for i in keep:
+            self.seen[ids[i]] = (labels[i], weights[i])
+        return len(keep)
+
+    def predict(self, texts):
+        """(予測した業界のリスト, 補正済み confidence の配列)"""
+        proba = self.model.predict_proba(self.vectorizer.transform(texts))
+        conf = proba.max(axis=1)
+        if self.calibrator is not None:
+            conf = np.minimum(conf, self.calibrator.predict(conf))
+        return self.classes[proba.argmax(axis=1)].tolist(), conf
+
+    def suggest_rows(self, rows):
+        """suggest_row() と同じ形の候補行を全行まとめて作る（DEFAULT_CLASS の予測は空の候補）"""
+        rows = rows if isinstance(rows, list) else list(rows)
+        labels, conf = self.predict([suggestion_text(r).lower() for r in rows])
+        return [{
+            "company_id": r.get("company_id",""),
+            "company_name": r.get("company_name",""),
+            "suggested_industry": "" if lab == DEFAULT_CLASS else lab,
+            "confidence": 0.0 if lab == DEFAULT_CLASS else round(float(c), 2),
+            "matched_tokens": "",
+            "note": "classifier",
+        } for r, lab, c in zip(rows, labels, conf.tolist())]
+
+    def save(self, path: Path):
+        # クラスそのものではなく中身を保存する（python -m で実行したときも読み込めるように）
+        state = {"version": MODEL_VERSION, "classes": self.classes.tolist(), "model": self.model,
+                 "calibrator": self.calibrator, "seen": self.seen}
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+
+def load_classifier(path: Path):
+    with Path(path).open("rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != MODEL_VERSION:
+        raise ValueError(f"{Path(path).name} は古い形式です。train で学習し直してください。")
+    clf = IndustryClassifier(state["classes"])
+    clf.model, clf.calibrator, clf.seen = state["model"], state["calibrator"], state["seen"]
+    return clf
+
+
+def load_examples(source: Path, manual_template: Path, auto_threshold=AUTO_THRESHOLD):
+    """学習例 (ids, texts, labels, weights)。manual 指定はキーワード推定より優先する"""
+    manual_map = load_manual_map(manual_template)
+    rows, _ = load_rows(source, ["company_id"] + FEATURE_FIELDS)
+    labels = {}
+    for r in rows:
+        cid = r.get("company_id","")
+        if cid in manual_map:
+            labels[cid] = (manual_map[cid], 1.0)
+        elif cid not in labels:
+            s = suggest_row(r)
+            if s["suggested_industry"] and s["confidence"] >= auto_threshold:
+                labels[cid] = (s["suggested_industry"], AUTO_WEIGHT)
+    ids, texts, labs, weights = [], [], [], []
+    seen = set()
+    for r in rows:
+        cid = r.get("company_id","")
+        if cid in labels and cid not in seen:
+            seen.add(cid)
+            ids.append(cid)
+            texts.append(suggestion_text(r).lower())
+            labs.append(labels[cid][0])
+            weights.append(labels[cid][1])
+    return ids, texts, labs, weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="manual 指定から学習する業界分類器")
+    parser.add_argument("cmd", choices=["train", "update"])
+    parser.add_argument("--source", default="companies_master_raw.csv", help="社名・説明などを引く企業 CSV")
+    parser.add_argument("--manual", default="manual_industry_map_template.csv")
+    parser.add_argument("--auto-threshold", type=float, default=AUTO_THRESHOLD,
+                        help="キーワード推定をこの confidence 以上で学習例にする")
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    args = parser.parse_args(argv)
+
+    source = Path(args.source)
+    if not source.exists():
+        source = Path("companies_master_final.csv")
+    if not source.exists():
+        print(f"ERROR: {args.source} がありません。")
+        return 1
+    ids, texts, labels, weights = load_examples(source, Path(args.manual), args.auto_threshold)
+    if not ids:
+        print("ERROR: 学習例がありません（manual 指定・キーワード推定の候補がありません）。")
+        return 1
+    model_path = Path(args.model)
+
+    if args.cmd == "train":
+        clf = IndustryClassifier(set(KEYWORD_MAP.values()) | set(labels) | {DEFAULT_CLASS})
+        acc = clf.fit(ids, texts, labels, weights)
+        clf.save(model_path)
+        print(f"Step: 学習しました（{len(ids)} 件 / {len(clf.classes)} 業界）-> {model_path.name}")
+        print("交差検証の正解率:", round(acc, 3) if acc is not None else f"-（{MIN_CALIBRATION} 件未満のため補正なし）")
+    else:
+        if not model_path.exists():
+            print(f"ERROR: {model_path.name} がありません。先に train を実行してください。")
+            return 1
+        try:
+            clf = load_classifier(model_path)
+        except ValueError as e:
+            print("ERROR:", e)
+            return 1
+        new = [i for i, cid in enumerate(ids) if clf.seen.get(cid) != (labels[i], weights[i])]
+        unknown = sorted({labels[i] for i in new} - set(clf.classes))
+        n = clf.partial_fit([ids[i] for i in new], [texts[i] for i in new],
+                            [labels[i] for i in new], [weights[i] for i in new])
+        clf.save(model_path)
+        print(f"Step: 追加学習しました（新しい例 {n} 件 / 学習済み {len(clf.seen)} 件）-> {model_path.name}")
+        if unknown:
+            print("注意: 未知の業界は train で学習し直してください:", ", ".join(unknown))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# pipeline/company.py
+# 企業1件のレコード（__slots__）
+# 数値列は読み込み時に1回だけ int にし（空欄・数値にならない値は None）、
+# 値の種類が少ない文字列列は sys.intern で同じ文字列オブジェクトを共有する。
+# int は並べ替え・絞り込み用で、元のセルの文字列も raw に残す。to_row は raw を書き出すので、
+# 変更していない数値列は "85.0" や "abc" もそのまま戻る。
+# CSV 行・dict への変換は入出力の境目（to_row / to_dict）でだけ行う。
+import sys
+from pathlib import Path
+
+from pipeline.loader import load_rows
+
+TEXT_FIELDS = ["company_id","company_name","short_description","industry","work_style","target_background",
+               "note_for_coach","raw_medical_keywords","raw_medical_domains"]
+INT_FIELDS = ["medical_relevance_score","side_job_fit_score","career_shift_fit_score","hybrid_fit_score",
+              "risk_level","learning_growth_score","raw_total_medical_score"]
+# 値の種類が少ない列（intern して共有する）
+INTERN_FIELDS = ["short_description","industry","work_style","target_background","note_for_coach",
+                      "raw_medical_keywords","raw_medical_domains"]
+# companies_master_final.csv の列順
+MASTER_FIELDS = ["company_id","company_name","short_description","medical_relevance_score","side_job_fit_score",
+                 "career_shift_fit_score","hybrid_fit_score","industry","work_style","risk_level",
+                 "learning_growth_score","target_background","note_for_coach","raw_medical_keywords",
+                 "raw_medical_domains","raw_total_medical_score"]
+
+
+def parse_int(v):
+    """'85' / '85.0' → 85。空欄・数値にならない値は None"""
+    if v is None or v == "":
+        return None
+    if isinstance(v, int):
+        return v
+    try:
+        return int(v)
+    except ValueError:
+        try:
+            return int(float(v))
+        except (ValueError, OverflowError):   # 'inf' / 'nan'
+            return None
+
+
+class Company:
+    __slots__ = TEXT_FIELDS + INT_FIELDS + ["raw", "extra"]
+
+    def __init__(self, **kw):
+        for k in TEXT_FIELDS:
+            setattr(self, k, kw.pop(k, ""))
+        self.raw = {}
+        for k in INT_FIELDS:
+            v = kw.pop(k, None)
+            setattr(self, k, parse_int(v))
+            self.raw[k] = "" if v is None else str(v)
+        self.extra = kw   # マスタ以外の列（company_website など）
+
+    @classmethod
+    def from_row(cls, row):
+        """CSV の dict 行から作る（数値の解析と intern はここで1回だけ）"""
+        c = cls.__new__(cls)
+        extra, raw = {}, {}
+        for k, v in row.items():
+            if k in INT_FIELDS:
+                setattr(c, k, parse_int(v))
+                raw[k] = v or ""
+            elif k in TEXT_FIELDS:
+                v = v or ""
+                setattr(c, k, sys.intern(v) if k in INTERN_FIELDS else v)
+            elif k is not None:
+                extra[k] = v
+        for k in TEXT_FIELDS:
+            if not hasattr(c, k):
+                setattr(c, k, "")
+        for k in INT_FIELDS:
+            if not hasattr(c, k):
+                setattr(c, k, None)
+        c.raw = raw
+        c.extra = extra
+        return c
+
+    # dict 行と同じ呼び方もできるようにする（c["company_name"] / c.get("hybrid_fit_score", 0)）
+    def get(self, key, default=None):
+        if key in Company.__slots__ and key not in ("raw", "extra"):
+            v = getattr(self, key)
+            return default if v is None else v
+        return self.extra.get(key, default)
+
+    def __getitem__(self, key):
+        if key in Company.__slots__ and key not in ("raw", "extra"):
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in INT_FIELDS:
+            setattr(self, key, parse_int(value))
+            self.raw[key] = "" if value is None else str(value)
+        elif key in TEXT_FIELDS:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def score(self, key, default=0):
+        """数値列の値（無い・不正なら default）"""
+        v = getattr(self, key)
+        return default if v is None else v
+
+    def cell(self, key):
+        """数値列の元のセルの文字列（無ければ空欄）"""
+        return self.raw.get(key, "")
+
+    def number(self, key, default=0):
+        """数値列の元のセルを float にした値（小数も切り捨てない。空欄・不正なら default）"""
+        try:
+            v = float(self.cell(key))
+        except ValueError:
+            return default
+        return default if v != v else v   # nan
+
+    def to_dict(self):
+        d = {k: getattr(self, k) for k in MASTER_FIELDS}
+        d.update(self.extra)
+        return d
+
+    def to_row(self, fieldnames=None):
+        """CSV 書き出し用の dict（数値列は読み込んだときのセルの文字列のまま）"""
+        out = {}
+        for k in (fieldnames or list(MASTER_FIELDS) + list(self.extra)):
+            out[k] = self.cell(k) if k in INT_FIELDS else self.get(k, "")
+        return out
+
+    def __repr__(self):
+        return f"Company({self.company_id!r}, {self.company_name!r})"
+
+
+def load_companies(path: Path, columns=None):
+    """CSV を Company のリストと列名で返す"""
+    rows, fieldnames = load_rows(Path(path), columns)
+    return [Company.from_row(r) for r in rows], fieldnames
@@ -0,0 +1,122 @@
+# pipeline/company_table.py
+# company_id をキーにした企業テーブル
+# 候補・手動指定・元データの結合を索引で行い、全体を O(n) で処理する
+import csv
+from pathlib import Path
+
+from pipeline.categorical import share_strings
+from pipeline.loader import load_rows
+
+
+def read_csv(path: Path):
+    with path.open(encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def write_csv(path: Path, rows, fieldnames):
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(fieldnames), extrasaction="ignore")
+        w.writeheader()
+        for r in rows:
+            w.writerow(r)
+
+
+def index_by(rows, key="company_id"):
+    """key -> 行 の索引を作る（重複 ID は先勝ち。従来の next(...) と同じ挙動）"""
+    idx = {}
+    for r in rows:
+        idx.setdefault(r.get(key, ""), r)
+    return idx
+
+
+def load_manual_map(path: Path):
+    """manual_industry_map_template.csv を company_id -> force_industry に変換"""
+    manual_map = {}
+    if not path.exists():
+        return manual_map
+    for r in read_csv(path):
+        cid = (r.get("company_id") or "").strip()
+        if cid and r.get("force_industry"):
+            manual_map[cid] = r["force_industry"].strip()
+    return manual_map
+
+
+class CompanyTable:
+    """企業行の並びと company_id 索引を持つテーブル"""
+
+    def __init__(self, rows, fieldnames=None):
+        self.rows = list(rows)
+        self._fieldnames = list(fieldnames) if fieldnames else None
+        self.index = index_by(self.rows)
+
+    @classmethod
+    def from_csv(cls, path: Path, columns=None):
+        # pyarrow のマルチスレッド解析で読む（値は csv.DictReader と同じ文字列）
+        # industry などの種類の少ない列は同じ値を1つの文字列オブジェクトで共有する
+        rows, fieldnames = load_rows(path, columns)
+        return cls(share_strings(rows), fieldnames)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __contains__(self, cid):
+        return cid in self.index
+
+    def get(self, cid, default=None):
+        return self.index.get(cid, default)
+
+    @property
+    def fieldnames(self):
+        # 行に列が追加されている場合も拾えるよう、先頭行のキーを優先する
+        if self.rows:
+            return list(self.rows[0].keys())
+        return list(self._fieldnames or [])
+
+    def sorted_by(self, key="medical_relevance_score", reverse=True):
+        def score(r):
+            try:
+                return int(r.get(key) or 0)
+            except ValueError:
+                return 0
+        return CompanyTable(sorted(self.rows, key=score, reverse=reverse), self.fieldnames)
+
+    def split(self, n):
+        return CompanyTable(self.rows[:n], self.fieldnames), CompanyTable(self.rows[n:], self.fieldnames)
+
+    def apply_industry(self, suggestions, manual_map, threshold):
+        """manual override を優先し、閾値以上の候補を industry に適用する。
+
+        suggestions は company_id -> 候補行 の索引。適用ログ（行のリスト）を返す。
+        """
+        log = []
+        for r in self.rows:
+            entry = apply_industry_row(r, suggestions.get(r.get("company_id","")), manual_map, threshold)
+            if entry:
+                log.append(entry)
+        return log
+
+
+def apply_industry_row(r, s, manual_map, threshold):
+    """1行に manual override / 自動適用を行う。適用した場合はログ行を返す"""
+    cid = r.get("company_id","")
+    original_ind = r.get("industry","") or ""
+    applied_from = ""
+    if cid in manual_map:
+        r["industry"] = manual_map[cid]
+        applied_from = "manual_template"
+    elif s and s.get("suggested_industry") and float(s.get("confidence") or 0) >= threshold:
+        r["industry"] = s["suggested_industry"]
+        applied_from = f"auto_conf_{s['confidence']}"
+    if not applied_from:
+        return None
+    return {
+        "company_id": cid,
+        "company_name": r.get("company_name",""),
+        "applied_from": applied_from,
+        "new_industry": r.get("industry",""),
+        "original_industry": original_ind,
+        "confidence": s["confidence"] if s else ""
+    }
@@ -0,0 +1,146 @@
+# pipeline/compare_rules.py
+# スコアルール（pipeline/scoring.py の RULE_SETS）の比較
+#
+#   python -m pipeline.compare_rules --input companies_master_final.csv --baseline pipeline --top-k 100
+#
+# マスタを1回だけ読み、登録済みのルールをすべて同じ列（ms・業界コード）に対して評価する。
+# 基準ルールとの比較として、列ごとに
+#   変化した行数・平均差・平均絶対差・順位相関（Spearman）・上位 K 件の重なり
+# を表示し、差のある企業だけを company_id ごとの差分 CSV に書き出す。
+# 上位 K 件は帯の値で同点が多いので、同点は元の medical_relevance_score の降順・入力順で並べる。
+import argparse, csv, sys
+from pathlib import Path
+
+import numpy as np
+
+from pipeline.scoring import RULE_SETS, SCORE_FIELDS, industry_codes, parse_scores
+
+NUMERIC_FIELDS = [f for f in SCORE_FIELDS if f != "target_background"]
+
+
+def rankdata(a):
+    """平均順位（同値は順位の平均）"""
+    a = np.asarray(a)
+    order = np.argsort(a, kind="mergesort")
+    s = a[order]
+    first = np.r_[True, s[1:] != s[:-1]]
+    group = np.cumsum(first) - 1
+    starts = np.flatnonzero(first)
+    ends = np.r_[starts[1:], len(a)]
+    ranks = np.empty(len(a))
+    ranks[order] = ((starts + ends - 1) / 2 + 1)[group]
+    return ranks
+
+
+def spearman(a, b):
+    ra, rb = rankdata(a), rankdata(b)
+    if ra.std() == 0 or rb.std() == 0:
+        return None
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def top_k(values, ms, k):
+    # 値の降順 → 元の ms の降順 → 入力順
+    order = np.lexsort((np.arange(len(values)), -ms, -np.asarray(values)))
+    return set(order[:k].tolist())
+
+
+def evaluate(rule_names, ms, encoded):
+    """ルール名 → 列の dict（transform のあるルールは変換後の ms で評価）"""
+    results = {}
+    for name in rule_names:
+        rules = RULE_SETS[name]
+        ms_eff = rules.transform(ms) if rules.transform else ms
+        results[name] = rules.score_columns(ms_eff, encoded=encoded)
+    return results
+
+
+def compare(results, baseline, ms, k):
+    base = results[baseline]
+    report = []
+    for name, cols in results.items():
+        if name == baseline:
+            continue
+        for field in SCORE_FIELDS:
+            if field not in cols or field not in base:
+                continue
+            a, b = base[field], cols[field]
+            changed = a != b
+            ent = {"rules": name, "field": field, "changed": int(changed.sum())}
+            if field in NUMERIC_FIELDS:
+                d = b - a
+                ent.update({
+                    "mean_delta": round(float(d.mean()), 3),
+                    "mean_abs_delta": round(float(np.abs(d).mean()), 3),
+                    "spearman": spearman(a, b),
+                    "top_k_overlap": len(top_k(a, ms, k) & top_k(b, ms, k)) / min(k, len(a)),
+                })
+            report.append(ent)
+    return report
+
+
+def write_deltas(path: Path, ids, names, results, baseline):
+    """基準との差がある企業だけ company_id ごとに書き出す（列は <ルール>:<列> の差）"""
+    base = results[baseline]
+    cols = [(name, f) for name in results if name != baseline for f in NUMERIC_FIELDS
+            if f in results[name] and f in base]
+    deltas = np.column_stack([results[name][f] - base[f] for name, f in cols]) if cols else np.zeros((len(ids), 0))
+    rows = np.flatnonzero(np.any(deltas != 0, axis=1))
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["company_id","company_name"] + [f"{name}:{fld}" for name, fld in cols])
+        for i in rows:
+            w.writerow([ids[i], names[i]] + deltas[i].tolist())
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="スコアルールの比較")
+    parser.add_argument("--input", default="companies_master_final.csv")
+    parser.add_argument("--rules", default=",".join(RULE_SETS), help="比較するルール（カンマ区切り）")
+    parser.add_argument("--baseline", default="pipeline")
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--out", default="rule_comparison.csv", help="企業ごとの差分 CSV")
+    args = parser.parse_args(argv)
+
+    names = [n for n in args.rules.split(",") if n]
+    unknown = [n for n in names + [args.baseline] if n not in RULE_SETS]
+    if unknown:
+        print("ERROR: 未登録のルール:", ", ".join(unknown), "（登録済み:", ", ".join(RULE_SETS), "）")
+        return 1
+    if args.baseline not in names:
+        names.insert(0, args.baseline)
+    src = Path(args.input)
+    if not src.exists():
+        print(f"ERROR: {src} がありません。")
+        return 1
+
+    with src.open(encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        print("ERROR: 入力ファイルが空です。")
+        return 1
+    ms = parse_scores([r.get("medical_relevance_score") for r in rows])
+    encoded = industry_codes([r.get("industry") for r in rows])
+    results = evaluate(names, ms, encoded)
+
+    report = compare(results, args.baseline, ms, args.top_k)
+    print(f"\n===== RULES vs {args.baseline}（{len(rows)} 件 / top-{args.top_k}）=====")
+    print(f"{'ルール':<9}{'列':<24}{'変化':>6}{'平均差':>9}{'平均|差|':>9}{'順位相関':>9}{'top-K重複':>10}")
+    for e in report:
+        if "mean_delta" in e:
+            rho = f"{e['spearman']:.3f}" if e["spearman"] is not None else "-"
+            print(f"{e['rules']:<9}{e['field']:<24}{e['changed']:>6}{e['mean_delta']:>9}{e['mean_abs_delta']:>9}"
+                  f"{rho:>9}{e['top_k_overlap']:>10.2f}")
+        else:
+            print(f"{e['rules']:<9}{e['field']:<24}{e['changed']:>6}")
+    print("=" * 40 + "\n")
+
+    n = write_deltas(Path(args.out), [r.get("company_id","") for r in rows],
+                     [r.get("company_name","") for r in rows], results, args.baseline)
+    print(f"書き出し完了: {args.out}（差のある企業 {n} 件）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# pipeline/incremental.py
+# 差分実行（--incremental）用の状態ファイル
+# company_id ごとに行の内容ハッシュ・manual 指定・前回の候補/スコアを保存し、
+# 変化のない行は前回の結果を再利用する
+import hashlib, json
+from pathlib import Path
+
+STATE_VERSION = 1
+
+
+def row_hash(r):
+    """行の内容ハッシュ（列順に依存しない）"""
+    payload = json.dumps(r, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def rules_fingerprint(cfg):
+    """キーワード辞書・分類器・閾値・ルール/スコアのコードのハッシュ。変わったら状態を全て破棄する"""
+    # stages は runner 経由でこのモジュールを読み込むので、ここで読み込む
+    from pipeline.stages import code_version
+    rules = {
+        "version": STATE_VERSION,
+        "code": code_version(),
+        "keyword_map": cfg.keyword_map,
+        "auto_apply_threshold": cfg.auto_apply_threshold,
+    }
+    if cfg.classifier is not None:
+        rules["classifier"] = cfg.classifier.fingerprint()
+    payload = json.dumps(rules, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class IncrementalState:
+    """前回実行の行ごとの結果。lookup() で再利用可否を判定し、record() で今回分を積む"""
+
+    def __init__(self, path: Path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.prev = {}
+        self.rows = {}
+        self.reused = 0
+        self.recomputed = 0
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if data.get("fingerprint") == fingerprint:
+                self.prev = data.get("rows", {})
+
+    def lookup(self, cid, h, manual):
+        ent = self.prev.get(cid)
+        if ent and ent["hash"] == h and ent["manual"] == manual:
+            self.reused += 1
+            return ent
+        self.recomputed += 1
+        return None
+
+    def record(self, cid, h, manual, suggestion, industry, log, final):
+        self.rows[cid] = {
+            "hash": h,
+            "manual": manual,
+            "suggestion": suggestion,
+            "industry": industry,
+            "log": log,
+            "final": final,
+        }
+
+    def save(self):
+        data = {"fingerprint": self.fingerprint, "rows": self.rows}
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,169 @@
+# pipeline/keywords.py
+# キーワード辞書の一括照合（Aho-Corasick）
+#
+#   matcher = compile_matcher({"industry": list(KEYWORD_MAP.items())})
+#   hits = matcher.scan(text)
+#   hits.values("industry")   → [v for k, v in KEYWORD_MAP.items() if k in text] と同じ（辞書の順）
+#   hits.first("industry")    → 最初に当たったキーの値（辞書の順で最初。for ... if k in t: return v と同じ）
+#
+# 複数の辞書をまとめて1つのオートマトンにするので、テキストは1回走査するだけで全辞書のヒットがわかる。
+# 照合の手間はテキスト長 + ヒット数に比例し、辞書の大きさには依存しない。
+# 「k in text」と同じく、キーがテキストに1回でも含まれればヒット（出現回数は数えない）。
+# 大文字小文字はそのまま比べる（従来どおり呼び出し側で lower() する）。
+#
+# コンパイル済みのオートマトンは辞書の内容ハッシュをキーに CACHE_DIR（リポジトリ直下の .pipeline_cache/keywords。
+# 実行したディレクトリにはよらない）に pickle で保存し、次回はそれを読む。
+import hashlib, json, pickle
+from collections import deque
+from pathlib import Path
+
+AUTOMATON_VERSION = 1   # オートマトンの形式を変えたら上げる（古いキャッシュは使わない）
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".pipeline_cache" / "keywords"
+
+
+class Automaton:
+    """patterns のうち text に含まれるものの番号を1回の走査で求める"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        goto, out = [{}], [[]]
+        self.always = []   # 空文字のパターン（"" in text は常に真）
+        for pid, p in enumerate(self.patterns):
+            if not p:
+                self.always.append(pid)
+                continue
+            s = 0
+            for ch in p:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                s = nxt
+            out[s].append(pid)
+
+        # 失敗遷移（幅優先）。出力は失敗遷移先の出力も含めておく
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            s = queue.popleft()
+            for ch, t in goto[s].items():
+                queue.append(t)
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[t] = goto[f].get(ch, 0) if s else 0
+                out[t] = out[t] + out[fail[t]]
+        self.goto = goto
+        self.fail = fail
+        self.out = [tuple(o) for o in out]
+
+    def find(self, text):
+        """text に含まれるパターン番号の集合"""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set(self.always)
+        s = 0
+        for ch in text:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                found.update(out[s])
+        return found
+
+
+class Hits:
+    """scan() の結果。辞書ごとに、ヒットしたエントリの番号を辞書の順で持つ"""
+
+    def __init__(self, matcher, found):
+        self.matcher = matcher
+        per = {}
+        for pid in found:
+            for name, idx in matcher.entries[pid]:
+                per.setdefault(name, []).append(idx)
+        for idxs in per.values():
+            idxs.sort()
+        self.per = per
+
+    def indices(self, name):
+        return self.per.get(name, [])
+
+    def keys(self, name):
+        items = self.matcher.dictionaries[name]
+        return [items[i][0] for i in self.indices(name)]
+
+    def values(self, name):
+        items = self.matcher.dictionaries[name]
+        return [items[i][1] for i in self.indices(name)]
+
+    def first(self, name, default=None):
+        idxs = self.indices(name)
+        return self.matcher.dictionaries[name][idxs[0]][1] if idxs else default
+
+    def count(self, name):
+        return len(self.indices(name))
+
+
+class KeywordMatcher:
+    """名前 → [(キーワード, 値), ...] の辞書をまとめて照合する"""
+
+    def __init__(self, dictionaries):
+        self.dictionaries = {name: [tuple(kv) for kv in items] for name, items in dictionaries.items()}
+        index = {}
+        self.entries = []   # パターン番号 → [(辞書名, エントリ番号)]
+        for name, items in self.dictionaries.items():
+            for idx, (key, _) in enumerate(items):
+                pid = index.setdefault(key, len(index))
+                if pid == len(self.entries):
+                    self.entries.append([])
+                self.entries[pid].append((name, idx))
+        self.automaton = Automaton(index)
+
+    def scan(self, text):
+        return Hits(self, self.automaton.find(text or ""))
+
+
+def dictionary_digest(dictionaries):
+    payload = json.dumps([AUTOMATON_VERSION, {k: [list(kv) for kv in v] for k, v in dictionaries.items()}],
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_COMPILED = {}   # プロセス内のキャッシュ（内容ハッシュ → KeywordMatcher）
+
+
+def compile_matcher(dictionaries, cache_dir=None):
+    """辞書をコンパイルする。同じ内容ならプロセス内・ディスクのキャッシュを使う"""
+    digest = dictionary_digest(dictionaries)
+    if digest in _COMPILED:
+        return _COMPILED[digest]
+    path = Path(cache_dir or CACHE_DIR) / (digest + ".pickle")
+    matcher = None
+    if path.exists():
+        try:
+            with path.open("rb") as f:
+                matcher = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            matcher = None
+    if not isinstance(matcher, KeywordMatcher):
+        matcher = KeywordMatcher(dictionaries)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with tmp.open("wb") as f:
+                pickle.dump(matcher, f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp.replace(path)
+        except OSError:   # 書き込めない場所でもコンパイル結果はそのまま使う
+            pass
+    _COMPILED[digest] = matcher
+    return matcher
+
+
+def as_items(mapping):
+    """{キーワード: 値} → [(キーワード, 値)]、{値: [キーワード, ...]} → [(キーワード, 値)]、[キーワード] → [(キーワード, キーワード)]"""
+    if isinstance(mapping, dict):
+        if all(isinstance(v, (list, tuple)) for v in mapping.values()):
+            return [(kw, name) for name, kws in mapping.items() for kw in kws]
+        return list(mapping.items())
+    return [(kw, kw) for kw in mapping]
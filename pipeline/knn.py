@@ -0,0 +1,258 @@
+# pipeline/knn.py
+# 埋め込みの近傍投票で「その他医療関連」の行に業界を提案する
+#
+#   python -m pipeline.knn                       # companies_master_final_auto_mapped_v2.csv を読む
+#   python -m pipeline.knn --input companies_master_final.csv --threshold 0.7
+#
+# apply_keyword_map_extension.py / auto_apply_suggested_keywords.py の後も「その他医療関連」のまま残る行は
+# others_top50_for_review.csv で人が確認している。ここでは全社のテキスト（社名・説明・キーワード・領域）を
+# sentence-transformers（CPU）でまとめて埋め込み、業界の付いた行で FAISS の索引を作って、
+# 未分類の行を1回の検索でまとめて近傍 k 件の類似度による重み付き投票にかける。
+#
+#   knn_industry_suggestions.csv   未分類の行すべての候補（manual_industry_map_suggestions.csv と同じ列。
+#                                  matched_tokens は票を入れた近傍の社名）
+#   knn_industry_prefill.csv       confidence が閾値以上の候補（manual_industry_map_template.csv に反映できる）
+#   others_top50_for_review.csv    閾値に届かず残った行だけをスコア順に REVIEW_N 件
+#
+# 埋め込みはテキストのハッシュをキーに CACHE_DIR に保存し、変わった行だけモデルに通す（全行キャッシュ済みなら
+# モデルも読み込まない）。今回の入力にないテキストの埋め込みは実行の最後に捨てる。
+# 索引は業界付きの行（ハッシュと業界）が前回と同じなら保存済みのものを使う。
+# キャッシュはどちらもリポジトリ直下の .pipeline_cache に置く（実行したディレクトリにはよらない）。
+import argparse, hashlib, json, sys
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from pipeline.company_table import write_csv
+from pipeline.loader import load_rows
+from pipeline.rules import SUGGEST_FIELDS, safe_int, suggestion_text
+from pipeline.runner import prefill_rows, PREFILL_FIELDS
+
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"   # 日本語を含む多言語モデル
+CACHE_ROOT = Path(__file__).resolve().parent.parent / ".pipeline_cache"
+CACHE_DIR = CACHE_ROOT / "embeddings"
+INDEX_DIR = CACHE_ROOT / "knn"
+UNLABELED = {"", "その他医療関連"}   # 業界が決まっていない行
+DEFAULT_K = 10
+MIN_SIMILARITY = 0.3     # これ未満の近傍は票に数えない（コサイン類似度）
+DEFAULT_THRESHOLD = 0.6  # prefill に入れ、レビュー待ちから外す confidence
+BATCH_SIZE = 64
+REVIEW_N = 50
+REVIEW_FIELDS = ["company_id","company_name","medical_relevance_score","short_description",
+                 "raw_medical_keywords","raw_medical_domains"]
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """テキストのハッシュ → 埋め込み（正規化済み float32）。モデルごとに keys.json / vectors.npy で保存する"""
+
+    def __init__(self, model_name=MODEL_NAME, cache_dir=CACHE_DIR):
+        self.model_name = model_name
+        self.dir = Path(cache_dir) / model_name.replace("/", "__")
+        self.model = None
+        self.keys = []
+        self.vectors = None
+        if (self.dir / "keys.json").exists() and (self.dir / "vectors.npy").exists():
+            self.keys = json.loads((self.dir / "keys.json").read_text(encoding="utf-8"))
+            self.vectors = np.load(self.dir / "vectors.npy")
+            if len(self.keys) != len(self.vectors):   # 書き込み途中で止まったなど。作り直す
+                self.keys, self.vectors = [], None
+        self.pos = {k: i for i, k in enumerate(self.keys)}
+        self.encoded = 0   # 今回モデルに通した件数
+
+    def _encode(self, texts):
+        if self.model is None:
+            # sentence-transformers（torch）は埋め込みが足りないときだけ読み込む
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(self.model_name, device="cpu")
+        vecs = self.model.encode(texts, batch_size=BATCH_SIZE, convert_to_numpy=True,
+                                 normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vecs, dtype=np.float32)
+
+    def embed(self, texts):
+        """texts の埋め込み行列。キャッシュにないテキストだけをまとめてモデルに通す"""
+        if not texts:
+            dim = 0 if self.vectors is None else self.vectors.shape[1]
+            return np.zeros((0, dim), dtype=np.float32)
+        hashes = [text_hash(t) for t in texts]
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in self.pos and h not in missing:
+                missing[h] = t
+        if missing:
+            vecs = self._encode(list(missing.values()))
+            self.vectors = vecs if self.vectors is None else np.vstack([self.vectors, vecs])
+            for h in missing:
+                self.pos[h] = len(self.keys)
+                self.keys.append(h)
+            self.encoded += len(missing)
+            self.save()
+        return self.vectors[[self.pos[h] for h in hashes]]
+
+    def prune(self, texts):
+        """texts にないテキストの埋め込みを捨てる。捨てた件数を返す"""
+        keep = {text_hash(t) for t in texts}
+        rows = [i for i, h in enumerate(self.keys) if h in keep]
+        dropped = len(self.keys) - len(rows)
+        if dropped:
+            self.keys = [self.keys[i] for i in rows]
+            self.vectors = self.vectors[rows]
+            self.pos = {k: i for i, k in enumerate(self.keys)}
+            self.save()
+        return dropped
+
+    def save(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / "vectors.tmp.npy"
+        np.save(tmp, self.vectors)
+        tmp.replace(self.dir / "vectors.npy")
+        tmp = self.dir / "keys.json.tmp"
+        tmp.write_text(json.dumps(self.keys), encoding="utf-8")
+        tmp.replace(self.dir / "keys.json")
+
+
+class LabeledIndex:
+    """業界付きの行の埋め込みの FAISS 索引（内積 = 正規化済みなのでコサイン類似度）"""
+
+    def __init__(self, index, labels, names):
+        self.index = index
+        self.labels = labels      # 索引の番号 → 業界
+        self.names = names        # 索引の番号 → 社名
+        self.classes = sorted(set(labels))
+        code = {c: i for i, c in enumerate(self.classes)}
+        self.codes = np.array([code[l] for l in labels], dtype=np.int64)
+
+    @classmethod
+    def build(cls, vectors, labels, names):
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        return cls(index, labels, names)
+
+    def save(self, path: Path, digest):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        faiss.write_index(self.index, str(tmp))
+        tmp.replace(path)
+        meta = path.with_suffix(".json")
+        tmp = meta.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"digest": digest, "labels": self.labels, "names": self.names},
+                                  ensure_ascii=False), encoding="utf-8")
+        tmp.replace(meta)
+
+    @classmethod
+    def load(cls, path: Path, digest):
+        """保存済みの索引（digest が違えば None）"""
+        meta = path.with_suffix(".json")
+        if not (path.exists() and meta.exists()):
+            return None
+        data = json.loads(meta.read_text(encoding="utf-8"))
+        if data.get("digest") != digest:
+            return None
+        return cls(faiss.read_index(str(path)), data["labels"], data["names"])
+
+    def vote(self, queries, k=DEFAULT_K, min_similarity=MIN_SIMILARITY):
+        """全クエリを1回で検索し、近傍の類似度で重み付き投票する。
+
+        (業界のリスト, confidence の配列, 近傍番号の行列) を返す。confidence は最多票の業界の類似度の和を
+        k 件すべての近傍の類似度の和で割ったもの（min_similarity 未満の近傍も分母には入れるので、
+        票を入れた近傍が少なければ confidence も低い）。min_similarity 以上の近傍がなければ業界は "" で confidence は 0。
+        """
+        k = min(k, self.index.ntotal)
+        sims, idx = self.index.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+        w = np.where((idx >= 0) & (sims >= min_similarity), sims, 0.0)
+        scores = np.zeros((len(queries), len(self.classes)))
+        np.add.at(scores, (np.repeat(np.arange(len(queries)), k), self.codes[np.maximum(idx, 0)].ravel()), w.ravel())
+        total = scores.sum(axis=1)
+        mass = np.where(idx >= 0, np.maximum(sims, 0.0), 0.0).sum(axis=1)
+        best = scores.argmax(axis=1)
+        conf = np.divide(scores[np.arange(len(queries)), best], mass, out=np.zeros(len(queries)), where=total > 0)
+        labels = [self.classes[b] if t > 0 else "" for b, t in zip(best.tolist(), total.tolist())]
+        idx = np.where(w > 0, idx, -1)
+        return labels, conf, idx
+
+
+def labeled_digest(model_name, hashes, labels):
+    payload = json.dumps([model_name, list(zip(hashes, labels))], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def suggest_unlabeled(rows, k=DEFAULT_K, cache=None, index_dir=INDEX_DIR):
+    """業界が決まっていない行への候補（SUGGEST_FIELDS の dict）を行の順で返す"""
+    if not rows:
+        return []
+    cache = cache or EmbeddingCache()
+    texts = [suggestion_text(r) for r in rows]
+    vecs = cache.embed(texts)
+    industries = [(r.get("industry") or "").strip() for r in rows]
+    lab = [i for i, ind in enumerate(industries) if ind not in UNLABELED]
+    unl = [i for i, ind in enumerate(industries) if ind in UNLABELED]
+    if not lab or not unl:
+        return []
+
+    labels = [industries[i] for i in lab]
+    digest = labeled_digest(cache.model_name, [text_hash(texts[i]) for i in lab], labels)
+    path = Path(index_dir) / "labeled.faiss"
+    index = LabeledIndex.load(path, digest)
+    if index is None:
+        index = LabeledIndex.build(vecs[lab], labels, [rows[i].get("company_name","") for i in lab])
+        index.save(path, digest)
+
+    suggested, conf, idx = index.vote(vecs[unl], k)
+    out = []
+    for j, i in enumerate(unl):
+        names = [index.names[n] for n in idx[j] if n >= 0][:3]
+        out.append({
+            "company_id": rows[i].get("company_id",""),
+            "company_name": rows[i].get("company_name",""),
+            "suggested_industry": suggested[j],
+            "confidence": round(float(conf[j]), 2),
+            "matched_tokens": ";".join(names),
+            "note": "knn",
+        })
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="埋め込みの近傍投票で「その他医療関連」の行に業界を提案する")
+    parser.add_argument("--input", default="companies_master_final_auto_mapped_v2.csv")
+    parser.add_argument("--out", default="knn_industry_suggestions.csv")
+    parser.add_argument("--prefill", default="knn_industry_prefill.csv")
+    parser.add_argument("--review", default="others_top50_for_review.csv")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    parser.add_argument("--model", default=MODEL_NAME)
+    args = parser.parse_args(argv)
+
+    src = Path(args.input)
+    if not src.exists():
+        src = Path("companies_master_final.csv")
+    if not src.exists():
+        print(f"ERROR: {args.input} がありません。")
+        return 1
+    rows, _ = load_rows(src)
+    cache = EmbeddingCache(args.model)
+    suggestions = suggest_unlabeled(rows, args.k, cache)
+    if not suggestions:
+        print("ERROR: 業界付きの行か「その他医療関連」の行がありません。")
+        return 1
+    dropped = cache.prune(suggestion_text(r) for r in rows)
+    print(f"Step: 埋め込み {len(rows)} 件（新規 {cache.encoded} 件・破棄 {dropped} 件）・近傍 {args.k} 件で投票しました。")
+
+    write_csv(Path(args.out), suggestions, fieldnames=SUGGEST_FIELDS)
+    prefill = prefill_rows(suggestions, args.threshold)
+    write_csv(Path(args.prefill), prefill, fieldnames=PREFILL_FIELDS)
+    resolved = {s["company_id"] for s in prefill}
+    pending = [r for r in rows if (r.get("industry") or "").strip() in UNLABELED and r.get("company_id","") not in resolved]
+    pending.sort(key=lambda r: safe_int(r.get("medical_relevance_score")), reverse=True)
+    write_csv(Path(args.review), pending[:REVIEW_N], fieldnames=REVIEW_FIELDS)
+    print(f"Step: 候補 {len(suggestions)} 件 -> {args.out}（confidence {args.threshold} 以上 {len(prefill)} 件 -> {args.prefill}）")
+    print(f"Step: レビュー待ち {len(pending)} 件（上位 {REVIEW_N} 件）-> {args.review}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
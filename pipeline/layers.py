@@ -0,0 +1,233 @@
+# pipeline/layers.py
+# 層を重ねた遅延ビュー（--emit）
+#
+#   最終の表 = 元の行 ⊕ キーワード候補 ⊕ 自動適用 ⊕ manual 指定 ⊕ スコア再計算
+#
+# 各層は company_id → {列: 値} の疎な上書き（Layer）。build のある層は、最初に読まれたときに
+# 下の層までを重ねた行から作る。ビューは読むときに元の行へ上書きを順に当てるだけなので、
+# 途中の層を CSV に書き出して次の処理で読み直す必要はない。どの層をファイルに書くかは --emit で選ぶ。
+#
+# 層を差し替える（replace）と、その層より上のキャッシュだけを捨てる。下の層（候補生成など）は作り直さない。
+# スコア再計算の層は行の内容ごとに結果を覚えているので、manual 指定を差し替えても再計算は変わった行だけになる。
+# company_id が重複する行には同じ上書きが当たる。
+import time
+from collections import Counter
+
+from pipeline.company_table import write_csv, load_manual_map
+from pipeline.rules import FINAL_FIELDS, suggest_row, split_tokens, finalize_rows
+from pipeline.runner import (
+    PREFILL_FIELDS, AUTO_APPLY_LOG_FIELDS, backup_outputs, ensure_manual_template, load_source,
+    prefill_rows, print_summary, write_keyword_freq,
+)
+
+KEY = "company_id"
+# --emit で選べる出力（既定はすべて = 従来どおり）
+EMIT_CHOICES = ["top100", "others", "suggest", "keyword_freq", "prefill", "auto", "log", "final"]
+SUGGESTION_COLUMNS = ["suggested_industry", "confidence", "matched_tokens"]
+
+
+class Layer:
+    """company_id → {列: 値} の疎な上書き。
+
+    values を渡せば固定の上書き、build を渡せば build(下の層までの行) で初回の参照時に作る。
+    fields を指定すると行にはその列だけを重ねる（候補の note などを行に混ぜない）。
+    """
+
+    def __init__(self, name, values=None, build=None, fields=None):
+        self.name = name
+        self.values = values
+        self.build = build
+        self.fields = fields
+
+
+class LayeredView:
+    def __init__(self, rows, fieldnames, layers=()):
+        self.base = list(rows)
+        self.fieldnames = list(fieldnames)
+        self.layers = list(layers)
+        self._resolved = {}   # 層の名前 → 作った上書き
+
+    def names(self):
+        return [l.name for l in self.layers]
+
+    def _position(self, name):
+        if name is None:
+            return len(self.layers) - 1
+        names = self.names()
+        if name not in names:
+            raise KeyError(f"層がありません: {name}（{', '.join(names)}）")
+        return names.index(name)
+
+    def add(self, layer):
+        self.layers.append(layer)
+        return self
+
+    def replace(self, layer):
+        """同じ名前の層を差し替える。差し替えた層とそれより上のキャッシュだけを捨てる"""
+        i = self._position(layer.name)
+        self.layers[i] = layer
+        for l in self.layers[i:]:
+            self._resolved.pop(l.name, None)
+
+    def overlay(self, name):
+        """層の上書き（company_id → {列: 値}）。build の層はここで初めて作る"""
+        if name not in self._resolved:
+            i = self._position(name)
+            layer = self.layers[i]
+            self._resolved[name] = layer.values if layer.values is not None else layer.build(self._rows(i))
+        return self._resolved[name]
+
+    def _rows(self, n):
+        """下から n 層を重ねた行（元の行はコピーして使う）"""
+        overlays = [(self.overlay(l.name), l.fields) for l in self.layers[:n]]
+        out = []
+        for r in self.base:
+            r = dict(r)
+            cid = r.get(KEY, "")
+            for ov, fields in overlays:
+                v = ov.get(cid)
+                if v:
+                    r.update(v if fields is None else {k: v[k] for k in fields if k in v})
+            out.append(r)
+        return out
+
+    def rows(self, upto=None):
+        """upto の層まで重ねた行（省略時はすべての層）"""
+        return self._rows(self._position(upto) + 1)
+
+    def row(self, cid, upto=None):
+        """1社分だけを解決する（見つからなければ None）"""
+        for r in self.base:
+            if r.get(KEY, "") == cid:
+                for l in self.layers[:self._position(upto) + 1]:
+                    v = self.overlay(l.name).get(cid)
+                    if v:
+                        r = dict(r, **(v if l.fields is None else {k: v[k] for k in l.fields if k in v}))
+                return dict(r)
+        return None
+
+
+# ---- パイプラインの層 ----
+
+def suggestion_layer(keyword_map):
+    return Layer("suggest", build=lambda rows: {r.get(KEY, ""): suggest_row(r, keyword_map) for r in rows},
+                 fields=SUGGESTION_COLUMNS)
+
+
+def auto_apply_layer(threshold):
+    def build(rows):
+        return {r.get(KEY, ""): {"industry": r["suggested_industry"]} for r in rows
+                if r.get("suggested_industry") and float(r.get("confidence") or 0) >= threshold}
+    return Layer("auto", build=build)
+
+
+def manual_layer(manual_map):
+    return Layer("manual", values={cid: {"industry": ind} for cid, ind in manual_map.items()})
+
+
+def rescore_layer():
+    """スコア再計算と short_description の補完。行の内容ごとに結果を覚え、変わった行だけ計算する"""
+    memo = {}
+
+    def build(rows):
+        # finalize_rows は行を書き換えるので、覚えるキーは先に取る
+        keys = [tuple(r.items()) for r in rows]
+        pending = [(k, r) for k, r in zip(keys, rows) if k not in memo]
+        finalize_rows([r for _, r in pending])
+        for k, r in pending:
+            memo[k] = {f: r[f] for f in FINAL_FIELDS}
+        return {r.get(KEY, ""): memo[k] for r, k in zip(rows, keys)}
+
+    return Layer("rescore", build=build)
+
+
+def pipeline_view(table, cfg, manual_map):
+    return LayeredView(table.rows, table.fieldnames, [
+        suggestion_layer(cfg.keyword_map),
+        auto_apply_layer(cfg.auto_apply_threshold),
+        manual_layer(manual_map),
+        rescore_layer(),
+    ])
+
+
+def auto_apply_log(view):
+    """manual / 自動適用の層から適用ログ（apply_industry_row のログと同じ行）を作る"""
+    suggest, auto, manual = view.overlay("suggest"), view.overlay("auto"), view.overlay("manual")
+    log = []
+    for r in view.base:
+        cid = r.get(KEY, "")
+        if cid in manual:
+            applied_from, new = "manual_template", manual[cid]["industry"]
+        elif cid in auto:
+            applied_from, new = f"auto_conf_{suggest[cid]['confidence']}", auto[cid]["industry"]
+        else:
+            continue
+        log.append({
+            "company_id": cid,
+            "company_name": r.get("company_name",""),
+            "applied_from": applied_from,
+            "new_industry": new,
+            "original_industry": r.get("industry","") or "",
+            "confidence": suggest[cid]["confidence"],
+        })
+    return log
+
+
+def parse_emit(spec):
+    """'all' または 'final,log' → 出力名の集合"""
+    names = EMIT_CHOICES if spec in (None, "", "all") else [s.strip() for s in spec.split(",") if s.strip()]
+    unknown = [n for n in names if n not in EMIT_CHOICES]
+    if unknown:
+        raise ValueError("不明な --emit: " + ", ".join(unknown) + "（" + ", ".join(EMIT_CHOICES) + "）")
+    return set(names)
+
+
+def run_pipeline_layered(cfg, emit):
+    """層のビューで最終の表を作り、emit に含まれる出力だけを書き出す"""
+    t0 = time.perf_counter()
+    table = load_source(cfg)
+    backup_outputs(cfg)
+    table = table.sorted_by("medical_relevance_score")
+    ensure_manual_template(cfg.manual_template)
+    view = pipeline_view(table, cfg, load_manual_map(cfg.manual_template))
+
+    fieldnames = table.fieldnames
+    auto_fieldnames = fieldnames + [k for k in ["industry"] if k not in fieldnames]
+    final_fieldnames = auto_fieldnames + [k for k in FINAL_FIELDS if k not in auto_fieldnames]
+    paths = {"top100": cfg.top100, "others": cfg.others, "suggest": cfg.suggest, "keyword_freq": cfg.keyword_freq,
+             "prefill": cfg.manual_prefill, "auto": cfg.auto_mapped, "log": cfg.auto_apply_log, "final": cfg.final}
+
+    if "top100" in emit or "others" in emit:
+        top, others = table.split(cfg.top_n)
+        if "top100" in emit:
+            write_csv(cfg.top100, top, fieldnames=table.fieldnames)
+        if "others" in emit:
+            write_csv(cfg.others, others, fieldnames=table.fieldnames)
+    if "suggest" in emit or ("prefill" in emit and cfg.manual_prefill is not None):
+        suggest = view.overlay("suggest")
+        suggestions = [suggest[r.get(KEY, "")] for r in table]
+        if "suggest" in emit:
+            write_csv(cfg.suggest, suggestions, fieldnames=cfg.suggest_fields)
+        if "prefill" in emit and cfg.manual_prefill is not None:
+            write_csv(cfg.manual_prefill, prefill_rows(suggestions, cfg.prefill_threshold), fieldnames=PREFILL_FIELDS)
+    if "keyword_freq" in emit:
+        token_freq = Counter()
+        for r in table:
+            token_freq.update(split_tokens(r.get("raw_medical_keywords")))
+        write_keyword_freq(cfg.keyword_freq, token_freq)
+    if "auto" in emit:
+        write_csv(cfg.auto_mapped, view.rows(upto="manual"), fieldnames=auto_fieldnames)
+    if "log" in emit and cfg.auto_apply_log is not None:
+        write_csv(cfg.auto_apply_log, auto_apply_log(view), fieldnames=AUTO_APPLY_LOG_FIELDS)
+    rows = view.rows()
+    if "final" in emit:
+        write_csv(cfg.final, rows, fieldnames=final_fieldnames)
+
+    written = [paths[n].name for n in EMIT_CHOICES if n in emit and paths[n] is not None]
+    skipped = [paths[n].name for n in EMIT_CHOICES if n not in emit and paths[n] is not None]
+    print(f"Step: 層 {' ⊕ '.join(['base'] + view.names())} を解決しました（{time.perf_counter() - t0:.2f} 秒）")
+    print("Step: 書き出し:", ", ".join(written) or "なし")
+    if skipped:
+        print("Step: 書き出さなかった層:", ", ".join(skipped))
+    print_summary(rows)
+    return view
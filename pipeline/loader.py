@@ -0,0 +1,128 @@
+# pipeline/loader.py
+# 企業 CSV の共通ローダー（pyarrow.csv のマルチスレッド解析）
+#
+#   cols = load_columns(path, ["industry", "medical_relevance_score"], numeric=["medical_relevance_score"])
+#       → 列名 → 値のリスト / 数値列は numpy の int64 配列（使う列だけ解析する）
+#   rows, fieldnames = load_rows(path, columns=None, numeric=())
+#       → csv.DictReader 互換の dict 行（数値列だけ int にできる）
+#
+# 文字列は csv.DictReader と同じ（空欄は ""）。数値列は int(v or 0)、数値にならない値は 0。
+# pyarrow が無い環境や、列数の合わない行などで pyarrow が読めないファイルは csv モジュールで読む。
+import csv
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:   # pyarrow なしでも動かす（csv モジュールで読む）
+    pa = None
+
+
+def _to_int(values):
+    out = np.zeros(len(values), dtype=np.int64)
+    for i, v in enumerate(values):
+        try:
+            out[i] = int(v or 0)
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+def _header(path: Path):
+    with path.open(encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def read_table(path: Path, columns=None):
+    """pyarrow で読み、全列を文字列の Table で返す（columns があればその列だけ。無い列は空欄）"""
+    names = _header(path)
+    # 同名の列（DictReader は後の値を使う）や BOM 付きの列名（DictReader は BOM ごと列名にする）は
+    # pyarrow では同じ結果にならないので csv モジュールで読む
+    if len(set(names)) != len(names):
+        raise ValueError("重複した列名があります: " + path.name)
+    if names and names[0].startswith("\ufeff"):
+        raise ValueError("BOM 付きのファイルです: " + path.name)
+    wanted = list(columns) if columns is not None else names
+    table = pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(use_threads=True, encoding="utf8"),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types={k: pa.string() for k in names},
+            include_columns=wanted,
+            include_missing_columns=True,
+            strings_can_be_null=False,
+        ),
+    )
+    # ファイルに無い列は null 列になるので空欄にする
+    return pa.table({k: pc.fill_null(table.column(k).cast(pa.string()), "") for k in wanted})
+
+
+def _int_column(col):
+    """文字列の列 → int64 配列。すべて整数表記ならそのまま cast、そうでなければ1件ずつ"""
+    try:
+        return pc.cast(pc.if_else(pc.equal(col, ""), "0", col), pa.int64()).to_numpy(zero_copy_only=False)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return _to_int(col.to_pylist())
+
+
+def _str_list(col):
+    # to_pylist() より numpy 経由のほうがかなり速い
+    return col.to_numpy(zero_copy_only=False).tolist()
+
+
+def _read_dicts(path: Path):
+    with path.open(encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return list(reader), list(reader.fieldnames or [])
+
+
+def load_columns(path: Path, columns, numeric=()):
+    """使う列だけを列単位で読む。numeric の列は int64 配列、ほかは文字列のリスト"""
+    path = Path(path)
+    if pa is not None:
+        try:
+            table = read_table(path, columns)
+            return {k: _int_column(table.column(k)) if k in numeric else _str_list(table.column(k))
+                    for k in columns}
+        except ValueError:   # pa.ArrowInvalid / UnicodeDecodeError も含む
+            pass
+    rows, _ = _read_dicts(path)
+    return {k: _to_int([r.get(k) for r in rows]) if k in numeric else [r.get(k) or "" for r in rows]
+            for k in columns}
+
+
+def load_rows(path: Path, columns=None, numeric=()):
+    """csv.DictReader 互換の dict 行と列名を返す。
+
+    numeric の列は int にする（ファイルに無い numeric 列は 0 で末尾に足す）。
+    """
+    path = Path(path)
+    if pa is not None:
+        try:
+            table = read_table(path, columns)
+            names = table.column_names
+            fieldnames = names + [k for k in numeric if k not in names]
+            cols = []
+            for k in fieldnames:
+                if k not in numeric:
+                    cols.append(_str_list(table.column(k)))
+                elif k in names:
+                    cols.append(_int_column(table.column(k)).tolist())
+                else:
+                    cols.append([0] * table.num_rows)
+            return [dict(zip(fieldnames, vals)) for vals in zip(*cols)], fieldnames
+        except ValueError:   # pa.ArrowInvalid / UnicodeDecodeError も含む
+            pass
+    rows, fieldnames = _read_dicts(path)
+    if columns is not None:
+        fieldnames = list(columns)
+        rows = [{k: r.get(k) or "" for k in fieldnames} for r in rows]
+    fieldnames = fieldnames + [k for k in numeric if k not in fieldnames]
+    for k in numeric:
+        for r, v in zip(rows, _to_int([r.get(k) for r in rows]).tolist()):
+            r[k] = v
+    return rows, fieldnames
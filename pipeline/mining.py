@@ -0,0 +1,193 @@
+# pipeline/mining.py
+# 採用ページ本文からのキーワード発掘（keyword_map_suggestions.csv）
+#
+#   python -m pipeline.mining                      # company_recruit_pages.csv の recruit_url を1件ずつ取得して数える
+#   python -m pipeline.mining --offline            # 取得せず企業マスターの説明・キーワード・領域で数える
+#
+# analyze_keywords_and_suggest_map.py は raw_medical_keywords にすでにあるトークンしか数えないので、
+# 新しい語は見つからない。ここでは legacy/recruit_parser.py と同じ方法で取り出したページ本文を1ページずつ流し、
+# 日本語の文字 n-gram（英数字は3文字以上の単語）を文書頻度で数える。出すのは前後に伸ばしても件数がほぼ同じにならない語
+# （途中で切れた断片でない語）だけ。
+#
+# 数えるのは Space-Saving スケッチ（SpaceSaving）。保持する語は capacity の2倍までで、コーパスが
+# どれだけ大きくなってもメモリは一定。語ごとに業界別の文書数も持ち、
+#   lift = P(業界 | 語) / P(業界)
+# で各業界に偏る語を候補にする。count は保証された文書数（count - err）。
+# 出力の先頭3列（token,count,suggested_industry）は従来と同じで auto_apply_suggested_keywords.py も読めるが、
+# あちらは「tok in text」の部分一致で業界を書き換える。そのため既定では、業界での文書数が MIN_SUPPORT 以上で、
+# 語を含む文書の MIN_PRECISION 以上がその業界の語（「現場」「患者」のようにどの業界にも出る語は除く）だけを出す。
+# それでも一般的な語は残りうるので、反映する前に一覧を確認すること。
+import argparse, csv, re, sys
+from pathlib import Path
+
+from pipeline.company_table import write_csv
+from pipeline.loader import load_rows
+from pipeline.rules import KEYWORD_MAP
+
+OUT = Path("keyword_map_suggestions.csv")
+PAGES = Path("company_recruit_pages.csv")
+MASTER = Path("companies_master_final.csv")
+OUT_FIELDS = ["token","count","suggested_industry","lift","industry_count"]   # count は保証された文書数（下限）
+MASTER_TEXT_FIELDS = ["short_description","raw_medical_keywords","raw_medical_domains"]
+UNLABELED = {"", "その他医療関連"}   # 候補の業界にはしない（文書数には数える）
+DEFAULT_CAPACITY = 50000
+NGRAM_MIN, NGRAM_MAX = 2, 8   # NGRAM_MAX 文字の語は断片かどうか確かめられないので出さない
+MIN_SUPPORT = 10     # 保証された文書数（count - err）・業界での文書数がこれ未満の語は出さない
+MIN_LIFT = 1.5
+MIN_PRECISION = 0.5  # 語を含む文書のうち候補の業界の割合 P(業界 | 語) の下限
+TOP_N = 500
+
+JA_RUN = re.compile(r"[ぁ-んァ-ヶー一-龠々]+")
+ASCII_WORD = re.compile(r"(?<![a-z0-9])[a-z][a-z0-9]{2,}(?![a-z0-9])")   # "it" のような2文字の語は部分一致で誤爆するので数えない
+HIRAGANA = re.compile(r"[ぁ-ん]")   # ひらがなで始まる・終わる語は文の切れ端（「を提供し」など）なので出さない
+
+
+def text_ngrams(text, n_min=NGRAM_MIN, n_max=NGRAM_MAX):
+    """本文に含まれる語の集合（日本語は連続部分の文字 n-gram、英数字は単語）"""
+    text = (text or "").lower()
+    grams = set(ASCII_WORD.findall(text))
+    for run in JA_RUN.findall(text):
+        for n in range(n_min, min(n_max, len(run)) + 1):
+            for i in range(len(run) - n + 1):
+                grams.add(run[i:i + n])
+    return grams
+
+
+class SpaceSaving:
+    """Space-Saving の heavy hitters スケッチ（業界別の件数つき）。
+
+    保持数が 2 * capacity を超えたら件数の多い capacity 語だけを残し、捨てた語の最大件数を floor にする。
+    新しく入る語は floor から数え始めるので、真の件数は [count - err, count] に入る。
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.items = {}    # 語 → [count, err, {業界: 件数}]
+        self.floor = 0
+        self.n = 0         # 文書数
+        self.labels = {}   # 業界 → 文書数
+
+    def add_document(self, grams, label):
+        self.n += 1
+        self.labels[label] = self.labels.get(label, 0) + 1
+        items = self.items
+        for g in grams:
+            ent = items.get(g)
+            if ent is None:
+                ent = items[g] = [self.floor, self.floor, {}]
+            ent[0] += 1
+            ent[2][label] = ent[2].get(label, 0) + 1
+        if len(items) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        ranked = sorted(self.items.items(), key=lambda kv: kv[1][0], reverse=True)
+        self.floor = max(self.floor, ranked[self.capacity][1][0])
+        self.items = dict(ranked[:self.capacity])
+
+    def candidates(self, min_support=MIN_SUPPORT, min_lift=MIN_LIFT, min_precision=MIN_PRECISION):
+        """(語, 件数の下限, 業界, lift, 業界での件数) を lift・件数の大きい順に返す（断片の語は除く）"""
+        out = []
+        closed = closed_grams(self.items)
+        for g, (count, err, per) in self.items.items():
+            if count - err < min_support or g not in closed or HIRAGANA.match(g) or HIRAGANA.match(g[-1]):
+                continue
+            best = None
+            for label, c in per.items():
+                if label in UNLABELED or c < min_support or c / count < min_precision:
+                    continue
+                lift = (c / count) / (self.labels[label] / self.n)
+                if best is None or lift > best[0]:
+                    best = (lift, label, c)
+            if best and best[0] >= min_lift:
+                out.append((g, count - err, best[1], round(best[0], 2), best[2]))
+        out.sort(key=lambda x: (-x[3], -x[1], x[0]))
+        return out
+
+
+def closed_grams(items, ratio=0.9):
+    """ほぼ必ず1文字長い語の一部として現れる語（「療機器技」は「医療機器技」の一部、など）を除いた語の集合。
+
+    ある語の前後に1文字足した語の件数が ratio 倍以上なら、その語は途中で切れた断片とみなす。
+    NGRAM_MAX 文字の語はそれ以上伸ばして確かめられないので候補にしない。
+    """
+    longest = {}   # 語 → 1文字足した語の最大件数
+    for g, ent in items.items():
+        if len(g) > NGRAM_MIN and JA_RUN.fullmatch(g):
+            for sub in (g[1:], g[:-1]):
+                longest[sub] = max(longest.get(sub, 0), ent[0])
+    return {g for g, ent in items.items()
+            if not (JA_RUN.fullmatch(g) and len(g) >= NGRAM_MAX) and longest.get(g, 0) < ratio * ent[0]}
+
+
+def master_industries(path: Path):
+    """company_name → industry"""
+    rows, _ = load_rows(path, ["company_name", "industry"])
+    return {(r.get("company_name") or "").strip(): (r.get("industry") or "").strip() for r in rows}
+
+
+def page_documents(pages: Path, industries):
+    """company_recruit_pages.csv の採用ページを1件ずつ取得して (業界, 本文) を返す"""
+    # bs4 / requests は本文を取得するときだけ読み込む
+    from legacy.recruit_parser import fetch_page_text
+    with pages.open(encoding="utf-8-sig") as f:
+        for r in csv.DictReader(f):
+            url = (r.get("recruit_url") or "").strip()
+            if url:
+                yield industries.get((r.get("company_name") or "").strip(), ""), fetch_page_text(url)
+
+
+def master_documents(path: Path):
+    """企業マスターの説明・キーワード・領域（社名は固有名詞の断片ばかりになるので使わない）"""
+    rows, _ = load_rows(path, ["industry"] + MASTER_TEXT_FIELDS)
+    for r in rows:
+        yield (r.get("industry") or "").strip(), " ".join((r.get(k) or "") for k in MASTER_TEXT_FIELDS)
+
+
+def mine(documents, capacity=DEFAULT_CAPACITY, min_support=MIN_SUPPORT, min_lift=MIN_LIFT,
+         min_precision=MIN_PRECISION, known=None):
+    """documents（(業界, 本文) の iterable）を流して候補を返す。known の語は除く"""
+    sketch = SpaceSaving(capacity)
+    for label, text in documents:
+        sketch.add_document(text_ngrams(text), label)
+    known = {k.lower() for k in (KEYWORD_MAP if known is None else known)}
+    return [c for c in sketch.candidates(min_support, min_lift, min_precision) if c[0] not in known], sketch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="採用ページ本文から業界に偏る語を発掘する")
+    parser.add_argument("--pages", default=str(PAGES), help="recruit_url の一覧（legacy/recruit_finder.py の出力）")
+    parser.add_argument("--master", default=str(MASTER), help="業界を引く企業マスター")
+    parser.add_argument("--offline", action="store_true", help="ページを取得せず企業マスターの説明・キーワード・領域で数える")
+    parser.add_argument("--out", default=str(OUT))
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="スケッチに保持する語の数")
+    parser.add_argument("--min-support", type=int, default=MIN_SUPPORT)
+    parser.add_argument("--min-lift", type=float, default=MIN_LIFT)
+    parser.add_argument("--min-precision", type=float, default=MIN_PRECISION,
+                        help="語を含む文書のうち候補の業界の割合の下限")
+    parser.add_argument("--top", type=int, default=TOP_N)
+    args = parser.parse_args(argv)
+
+    master = Path(args.master)
+    if not master.exists():
+        print(f"ERROR: {master.name} がありません。")
+        return 1
+    if args.offline:
+        docs = master_documents(master)
+    else:
+        pages = Path(args.pages)
+        if not pages.exists():
+            print(f"ERROR: {pages.name} がありません（legacy/recruit_finder.py で作成するか --offline を指定）。")
+            return 1
+        docs = page_documents(pages, master_industries(master))
+
+    cands, sketch = mine(docs, args.capacity, args.min_support, args.min_lift, args.min_precision)
+    print(f"Step: {sketch.n} 文書を数えました（保持 {len(sketch.items)} 語 / 下限 {sketch.floor}）。")
+    rows = [dict(zip(OUT_FIELDS, c)) for c in cands[:args.top]]
+    write_csv(Path(args.out), rows, fieldnames=OUT_FIELDS)
+    print(f"Step: 候補 {len(rows)} 件 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# pipeline/profiling.py
+# ステージごとの計測（--profile）
+# 実時間・CPU 時間・件数・件/秒・tracemalloc のピーク割り当てを記録し、JSON で書き出す。
+# cprofile=True のときは各ステージを cProfile で計測し、最も遅いステージの統計だけを残す。
+import cProfile, json, time, tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+class Profiler:
+    def __init__(self, cprofile=False, trace_memory=True):
+        self.cprofile = cprofile
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.slowest = None   # (wall, name, cProfile.Profile)
+        self._own_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._own_tracing:
+            tracemalloc.start()
+
+    def _entry(self, name, substep=False):
+        return self.stages.setdefault(name, {"wall_sec": 0.0, "cpu_sec": 0.0, "rows": 0, "peak_alloc_bytes": None,
+                                             "substep": substep})
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        """with prof.stage("name") as rec: ... rec["rows"] = n で件数を入れる"""
+        rec = {"rows": rows}
+        pr = cProfile.Profile() if self.cprofile else None
+        if self.trace_memory:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if pr:
+            pr.enable()
+        try:
+            yield rec
+        finally:
+            if pr:
+                pr.disable()
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            e = self._entry(name)
+            e["wall_sec"] += wall
+            e["cpu_sec"] += cpu
+            e["rows"] += rec["rows"]
+            if self.trace_memory:
+                peak = max(0, tracemalloc.get_traced_memory()[1] - base)
+                e["peak_alloc_bytes"] = max(e["peak_alloc_bytes"] or 0, peak)
+            if pr and (self.slowest is None or wall > self.slowest[0]):
+                self.slowest = (wall, name, pr)
+
+    def call(self, name, fn, *args):
+        """ループ内の小ステップ fn(*args) を1件として時間を積み上げる（メモリは計測しない）"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            return fn(*args)
+        finally:
+            e = self._entry(name, substep=True)
+            e["wall_sec"] += time.perf_counter() - wall
+            e["cpu_sec"] += time.process_time() - cpu
+            e["rows"] += 1
+
+    def report(self):
+        stages = []
+        for name, e in self.stages.items():
+            rps = round(e["rows"] / e["wall_sec"], 1) if e["rows"] and e["wall_sec"] > 0 else None
+            stages.append({"stage": name, **{k: (round(v, 6) if isinstance(v, float) else v) for k, v in e.items()},
+                           "rows_per_sec": rps})
+        # 小ステップは親ステージの内訳なので合計・最遅の判定には入れない
+        top = [s for s in stages if not s["substep"]]
+        return {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "total_wall_sec": round(sum(s["wall_sec"] for s in top), 6),
+            "tracemalloc_peak_bytes": tracemalloc.get_traced_memory()[1] if self.trace_memory else None,
+            "stages": stages,
+            "slowest_stage": max(top, key=lambda s: s["wall_sec"])["stage"] if top else None,
+        }
+
+    def write(self, path: Path):
+        """JSON レポートと（あれば）最も遅いステージの cProfile を書き出す"""
+        rep = self.report()
+        if self.slowest:
+            prof_path = path.with_name(f"{path.stem}_{self.slowest[1]}.prof")
+            self.slowest[2].dump_stats(str(prof_path))
+            rep["cprofile_dump"] = prof_path.name
+        path.write_text(json.dumps(rep, ensure_ascii=False, indent=2), encoding="utf-8")
+        if self._own_tracing:
+            tracemalloc.stop()
+        return rep
+
+    def print_table(self):
+        print("\n===== PROFILE =====")
+        for s in self.report()["stages"]:
+            peak = f"{s['peak_alloc_bytes'] / 1024:.0f}KiB" if s["peak_alloc_bytes"] is not None else "-"
+            name = ("  " if s["substep"] else "") + s["stage"]
+            print(f"{name:<14} wall {s['wall_sec']:.3f}s cpu {s['cpu_sec']:.3f}s rows {s['rows']} "
+                  f"rows/s {s['rows_per_sec'] or '-'} peak {peak}")
+        print("===================\n")
+
+
+class NullProfiler:
+    """計測しないときの代わり（Profiler と同じ呼び方ができる）"""
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        yield {"rows": rows}
+
+    def call(self, name, fn, *args):
+        return fn(*args)
@@ -0,0 +1,212 @@
+# pipeline/quantiles.py
+# medical_relevance_score のパーセンタイル正規化（rescale_scores.py）用のストリーミング分位点スケッチ
+#
+# KLL スケッチ: 値を1件ずつ（またはまとめて）入れても保持件数は k の定数倍に収まる。
+# 件数が k 以下のあいだは全件を保持するので、分位点は np.percentile（linear）と完全に一致する。
+# 別プロセス・別ファイルで作ったスケッチは merge() で合成でき、JSON で保存・読み込みできる。
+#
+#   sk = KLLSketch(); sk.update_many(scores)
+#   bps = breakpoints(sk)              # 0,1,...,100 パーセンタイルの値
+#   scaled = rescale(new_scores, bps)  # 全件まとめて np.interp
+#
+#   python -m pipeline.quantiles build companies_master_reclassified_v4.csv --out score_sketch.json
+#   python -m pipeline.quantiles merge a.json b.json --out score_sketch.json
+#   python -m pipeline.quantiles show score_sketch.json
+import argparse, csv, json, math, random, sys
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_K = 1024
+# rescale_scores.py の 101 点（0〜100 パーセンタイル）
+PERCENT_POINTS = np.linspace(0, 100, 101)
+
+
+class KLLSketch:
+    C = 2 / 3   # 上のレベルほど容量を大きくする係数
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.seed = seed
+        self.levels = [[]]   # levels[h] の各値は重み 2**h
+        self.n = 0
+        self.min = None
+        self.max = None
+        self._rng = random.Random(seed)
+
+    def capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return max(2, int(math.ceil(self.k * self.C ** depth)))
+
+    def size(self):
+        return sum(len(lvl) for lvl in self.levels)
+
+    def max_size(self):
+        return sum(self.capacity(h) for h in range(len(self.levels)))
+
+    def _track(self, lo, hi):
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+
+    def update(self, x):
+        x = float(x)
+        self.levels[0].append(x)
+        self.n += 1
+        self._track(x, x)
+        if self.size() > self.max_size():
+            self._compress()
+
+    def update_many(self, values):
+        """配列をまとめて入れる（k 件ずつ入れて圧縮するので、1件ずつ入れたときと同じ精度）"""
+        arr = np.asarray(values, dtype=np.float64).ravel()
+        if not len(arr):
+            return self
+        self._track(float(arr.min()), float(arr.max()))
+        for i in range(0, len(arr), self.k):
+            chunk = arr[i:i + self.k].tolist()
+            self.levels[0].extend(chunk)
+            self.n += len(chunk)
+            while self.size() > self.max_size():
+                self._compress()
+        return self
+
+    def _compress(self):
+        """容量を超えた一番下のレベルを半分にして1つ上へ送る"""
+        for h, lvl in enumerate(self.levels):
+            if len(lvl) >= self.capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append([])
+                lvl.sort()
+                keep = [lvl.pop()] if len(lvl) % 2 else []
+                self.levels[h + 1].extend(lvl[self._rng.randint(0, 1)::2])
+                self.levels[h] = keep
+                return
+
+    def merge(self, other):
+        """other の内容を取り込む（同じ k 同士を想定。違う場合は self の k を使う）"""
+        if other.n == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, lvl in enumerate(other.levels):
+            self.levels[h].extend(lvl)
+        self.n += other.n
+        self._track(other.min, other.max)
+        while self.size() > self.max_size():
+            self._compress()
+        return self
+
+    def _weighted(self):
+        """(昇順の値, 累積重み)"""
+        vals = np.concatenate([np.asarray(lvl, dtype=np.float64) for lvl in self.levels])
+        weights = np.concatenate([np.full(len(lvl), 1 << h, dtype=np.int64) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(vals, kind="stable")
+        return vals[order], np.cumsum(weights[order])
+
+    def percentiles(self, ps):
+        """ps（0〜100）のパーセンタイル。np.percentile の linear と同じ補間"""
+        if self.n == 0:
+            raise ValueError("スケッチが空です")
+        vals, cw = self._weighted()
+        total = int(cw[-1])
+        q = np.true_divide(np.asarray(ps, dtype=np.float64), 100)
+        virtual = (total - 1) * q
+        lo = np.floor(virtual)
+        gamma = virtual - lo
+        # 順位 r（0始まり）の値 = 累積重みが r を超える最初の値
+        a = vals[np.searchsorted(cw, lo, side="right")]
+        b = vals[np.searchsorted(cw, np.minimum(lo + 1, total - 1), side="right")]
+        diff = b - a
+        out = np.where(gamma >= 0.5, b - diff * (1 - gamma), a + diff * gamma)
+        out = np.where(q <= 0, self.min, out)
+        return np.where(q >= 1, self.max, out)
+
+    def to_dict(self):
+        return {"k": self.k, "seed": self.seed, "n": self.n, "min": self.min, "max": self.max, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, d):
+        sk = cls(k=d["k"], seed=d.get("seed", 0))
+        sk.levels = [list(lvl) for lvl in d["levels"]] or [[]]
+        sk.n = d["n"]
+        sk.min = d["min"]
+        sk.max = d["max"]
+        return sk
+
+    def save(self, path: Path):
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path):
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def breakpoints(sketch, points=PERCENT_POINTS):
+    """points パーセンタイルの値（np.interp の xp に使う）"""
+    return sketch.percentiles(points)
+
+
+def rescale(values, bps, points=PERCENT_POINTS):
+    """値を 0〜100 に写す（全件まとめて補間し、整数に切り捨て）"""
+    return np.interp(np.asarray(values), bps, points).astype(np.int64)
+
+
+def sketch_csv(path: Path, column="medical_relevance_score", k=DEFAULT_K, chunk=65536):
+    """CSV を1回だけ読み、column の値でスケッチを作る（行は保持しない）"""
+    sk = KLLSketch(k=k)
+    buf = []
+    with Path(path).open(encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            try:
+                buf.append(int(r.get(column) or 0))
+            except ValueError:
+                buf.append(0)
+            if len(buf) >= chunk:
+                sk.update_many(buf)
+                buf = []
+    sk.update_many(buf)
+    return sk
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="スコア分布スケッチの作成・合成・表示")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_b = sub.add_parser("build", help="CSV からスケッチを作る")
+    p_b.add_argument("csv")
+    p_b.add_argument("--column", default="medical_relevance_score")
+    p_b.add_argument("--k", type=int, default=DEFAULT_K)
+    p_b.add_argument("--out", default="score_sketch.json")
+    p_m = sub.add_parser("merge", help="複数のスケッチを合成する")
+    p_m.add_argument("sketches", nargs="+")
+    p_m.add_argument("--out", default="score_sketch.json")
+    p_s = sub.add_parser("show", help="件数と主なパーセンタイルを表示")
+    p_s.add_argument("sketch")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        sk = sketch_csv(Path(args.csv), args.column, args.k)
+        sk.save(Path(args.out))
+        print(f"書き出し完了: {args.out}（{sk.n} 件 / 保持 {sk.size()} 件）")
+    elif args.cmd == "merge":
+        sk = KLLSketch.load(Path(args.sketches[0]))
+        for p in args.sketches[1:]:
+            sk.merge(KLLSketch.load(Path(p)))
+        sk.save(Path(args.out))
+        print(f"書き出し完了: {args.out}（{sk.n} 件 / 保持 {sk.size()} 件）")
+    elif args.cmd == "show":
+        sk = KLLSketch.load(Path(args.sketch))
+        if not sk.n:
+            print("ERROR: スケッチが空です。")
+            return 1
+        ps = [0, 10, 25, 50, 75, 90, 100]
+        print(f"件数 {sk.n} / 保持 {sk.size()} 件 / k={sk.k}")
+        for p, v in zip(ps, sk.percentiles(ps)):
+            print(f"  p{p}: {v:g}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
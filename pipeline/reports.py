@@ -0,0 +1,316 @@
+# pipeline/reports.py
+# 集計レポートの共通エンジン（1回の読み込み・1回の走査で登録済みの集計をすべて計算する）
+#
+#   python -m pipeline.reports --input companies_master_final.csv --reports stats,summary,top100,others
+#
+# 集計（CountBy / Buckets / TopKRows / Subset / Summary）は add(idx, row, nums) で1行ずつ受け取り、result() で結果を返す。
+# row は csv.DictReader と同じ文字列の dict、nums は数値列を int にしたもの（各行1回だけ解析する）。
+# レポート（Report）は使う集計と、その結果から出力を作る emit の組。stats.py などの各スクリプトは
+# ここに登録したレポートを1つ実行するだけで、複数のレポートをまとめて実行すると CSV の読み込みは1回で済む。
+# 同じ名前の集計はレポート間で共有する（業界別件数など）。
+# 入力 CSV と同じディレクトリの snapshots/ に CSV より新しいスナップショット（run_pipeline_full.py --snapshot）が
+# あれば、CSV を解析せずにそちらの必要な列だけを読む。
+import argparse, csv, heapq, sys
+from collections import Counter
+from pathlib import Path
+
+from pipeline.loader import load_rows
+from pipeline.quantiles import KLLSketch
+from pipeline.scoring import Bands
+
+SCORE = "medical_relevance_score"
+
+
+class TopK:
+    """スコア上位 k 件を保持する。同点は先に来た行を優先（sorted の安定ソートと同じ順）"""
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []
+
+    def push(self, score, idx, item):
+        entry = (score, -idx, item)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self):
+        """(idx, item) をスコア降順で返す"""
+        return [(-neg, item) for _, neg, item in sorted(self.heap, key=lambda e: e[:2], reverse=True)]
+
+
+# ---- 集計 ----
+# columns: 使う列（None は全列）、numeric: int にして nums で受け取る列
+
+class CountBy:
+    """field の値ごとの件数（空欄は missing）"""
+
+    def __init__(self, name, field, missing="その他"):
+        self.name = name
+        self.columns = [field]
+        self.numeric = []
+        self.field = field
+        self.missing = missing
+        self.counts = Counter()
+
+    def add(self, idx, row, nums):
+        self.counts[row.get(self.field) or self.missing] += 1
+
+    def result(self):
+        return self.counts
+
+
+class Buckets:
+    """数値列の帯ごとの件数（bands は scoring.Bands。キーは最初に出てきた順）"""
+
+    def __init__(self, name, field, bands):
+        self.name = name
+        self.columns = [field]
+        self.numeric = [field]
+        self.field = field
+        self.bands = bands
+        self.counts = Counter()
+
+    def add(self, idx, row, nums):
+        self.counts[self.bands.one(nums[self.field])] += 1
+
+    def result(self):
+        return self.counts
+
+
+class TopKRows:
+    """field の降順で上位 k 行（同点は入力順）。結果の行の field は int"""
+
+    def __init__(self, name, field, k, columns=None):
+        self.name = name
+        self.columns = None if columns is None else list(dict.fromkeys(list(columns) + [field]))
+        self.numeric = [field]
+        self.field = field
+        self.top = TopK(k)
+
+    def add(self, idx, row, nums):
+        score = nums[self.field]
+        self.top.push(score, idx, (score, row))
+
+    def result(self):
+        return [dict(row, **{self.field: score}) for _, (score, row) in self.top.items()]
+
+
+class Subset:
+    """pred(row) が真の行（入力順）"""
+
+    def __init__(self, name, pred, columns):
+        self.name = name
+        self.columns = list(columns)
+        self.numeric = []
+        self.pred = pred
+        self.rows = []
+
+    def add(self, idx, row, nums):
+        if self.pred(row):
+            self.rows.append(row)
+
+    def result(self):
+        return self.rows
+
+
+class Summary:
+    """数値列の件数・合計・平均と、percentiles に指定したパーセンタイル（KLL スケッチ）"""
+
+    def __init__(self, name, field, percentiles=()):
+        self.name = name
+        self.columns = [field]
+        self.numeric = [field]
+        self.field = field
+        self.percentiles = list(percentiles)
+        self.count = 0
+        self.total = 0
+        self.sketch = KLLSketch() if self.percentiles else None
+
+    def add(self, idx, row, nums):
+        v = nums[self.field]
+        self.count += 1
+        self.total += v
+        if self.sketch is not None:
+            self.sketch.update(v)
+
+    def result(self):
+        out = {"count": self.count, "sum": self.total, "mean": self.total / self.count if self.count else 0}
+        if self.sketch is not None and self.count:
+            out["percentiles"] = dict(zip(self.percentiles, self.sketch.percentiles(self.percentiles).tolist()))
+        return out
+
+
+def to_int(v):
+    """int(v or 0)、数値にならない値は 0（pipeline.loader の数値列と同じ）"""
+    try:
+        return int(v or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def scan(rows, aggregates):
+    """rows を1回だけ走査して、集計名 → 結果 を返す"""
+    numeric = required_columns(aggregates)[1]
+    for idx, row in enumerate(rows):
+        nums = {k: to_int(row.get(k)) for k in numeric}
+        for a in aggregates:
+            a.add(idx, row, nums)
+    return {a.name: a.result() for a in aggregates}
+
+
+def required_columns(aggregates):
+    """集計が使う列（全列が要るものがあれば None）と数値列"""
+    columns, numeric = [], []
+    for a in aggregates:
+        if a.columns is None:
+            columns = None
+        elif columns is not None:
+            columns += [c for c in a.columns if c not in columns]
+        numeric += [c for c in a.numeric if c not in numeric]
+    return columns, numeric
+
+
+# ---- レポート定義 ----
+
+class Report:
+    """make_aggregates() で集計を作り、emit(results, fieldnames) で出力する"""
+
+    def __init__(self, name, make_aggregates, emit):
+        self.name = name
+        self.make_aggregates = make_aggregates
+        self.emit = emit
+
+
+REPORTS = {}
+
+
+def register(report):
+    REPORTS[report.name] = report
+    return report
+
+
+SCORE_BUCKETS = Bands.descending([(80, "80+"), (50, "50-79"), (20, "20-49")], "0-19")
+OUT_STATS = Path("companies_master_stats.txt")
+OUT_TOP_FULL = Path("companies_top100_by_score.csv")
+OUT_TOP = Path("top100_by_score.csv")
+OUT_OTHERS = Path("others_companies.csv")
+TOP_FIELDS = ["company_id","company_name","medical_relevance_score","industry","short_description",
+              "raw_medical_keywords","raw_medical_domains"]
+OTHERS_FIELDS = ["company_id","company_name","medical_relevance_score","short_description",
+                 "raw_medical_keywords","raw_medical_domains"]
+
+
+def write_rows(path: Path, rows, fieldnames):
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        w.writeheader()
+        for r in rows:
+            w.writerow(r)
+
+
+def _emit_stats(results, fieldnames):
+    print("業界上位10:")
+    for k, v in results["industry_counts"].most_common(10):
+        print(k, v)
+    s = results["score_summary"]
+    print("件数", s["count"], "平均", s["mean"])
+
+
+def _emit_summary(results, fieldnames):
+    with OUT_STATS.open("w", encoding="utf-8") as f:
+        f.write("業界別件数\n")
+        for k, v in results["industry_counts"].most_common():
+            f.write(f"{k}: {v}\n")
+        f.write("\nスコア分布\n")
+        for k, v in results["score_buckets"].items():
+            f.write(f"{k}: {v}\n")
+    write_rows(OUT_TOP_FULL, results["top100_full"], fieldnames + [SCORE] * (SCORE not in fieldnames))
+    print("統計出力:", OUT_STATS)
+    print("上位100社出力:", OUT_TOP_FULL)
+
+
+def _emit_top100(results, fieldnames):
+    write_rows(OUT_TOP, results["top100"], TOP_FIELDS)
+    print("書き出し完了:", OUT_TOP)
+
+
+def _emit_others(results, fieldnames):
+    write_rows(OUT_OTHERS, results["others"], OTHERS_FIELDS)
+    print("書き出し完了:", OUT_OTHERS)
+
+
+def _is_other_medical(row):
+    return (row.get("industry") or "").strip() == "その他医療関連"
+
+
+register(Report("stats", lambda: [
+    CountBy("industry_counts", "industry"),
+    Summary("score_summary", SCORE),
+], _emit_stats))
+register(Report("summary", lambda: [
+    CountBy("industry_counts", "industry"),
+    Buckets("score_buckets", SCORE, SCORE_BUCKETS),
+    TopKRows("top100_full", SCORE, 100),
+], _emit_summary))
+register(Report("top100", lambda: [
+    TopKRows("top100", SCORE, 100, columns=TOP_FIELDS),
+], _emit_top100))
+register(Report("others", lambda: [
+    Subset("others", _is_other_medical, OTHERS_FIELDS + ["industry"]),
+], _emit_others))
+
+
+def load_input(path: Path, columns):
+    """集計の入力 (dict 行, 列名)。最新のスナップショットがあればそれを、なければ CSV を読む"""
+    try:
+        # pyarrow はスナップショットを読むときだけ使う
+        from pipeline.snapshots import load_latest_rows
+    except ImportError:
+        loaded = None
+    else:
+        loaded = load_latest_rows(path.parent / "snapshots", path, columns)
+    if loaded is None:
+        return load_rows(path, columns)
+    print(f"Step: スナップショット {path.stem} から読み込みました")
+    return loaded
+
+
+def run_reports(path: Path, names):
+    """names のレポートを path の1回の読み込みでまとめて実行する"""
+    reports = [REPORTS[n] for n in names]
+    aggregates = {}
+    for rep in reports:
+        for a in rep.make_aggregates():
+            aggregates.setdefault(a.name, a)   # 同じ名前の集計は共有
+    aggs = list(aggregates.values())
+    columns, numeric = required_columns(aggs)
+    rows, fieldnames = load_input(Path(path), columns)
+    results = scan(rows, aggs)
+    for rep in reports:
+        rep.emit(results, fieldnames)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="集計レポートをまとめて出力する（入力は1回だけ読む）")
+    parser.add_argument("--input", default="companies_master_final.csv")
+    parser.add_argument("--reports", default=",".join(REPORTS), help="出力するレポート（カンマ区切り）")
+    args = parser.parse_args(argv)
+
+    names = [n for n in args.reports.split(",") if n]
+    unknown = [n for n in names if n not in REPORTS]
+    if unknown:
+        print("ERROR: 未登録のレポート:", ", ".join(unknown), "（登録済み:", ", ".join(REPORTS), "）")
+        return 1
+    src = Path(args.input)
+    if not src.exists():
+        print(f"ERROR: {src} がありません。")
+        return 1
+    run_reports(src, names)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
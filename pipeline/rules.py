@@ -0,0 +1,121 @@
+# pipeline/rules.py
+# 業界推定・スコア再計算・説明文補完のルール（run_* パイプライン共通）
+from collections import Counter
+
+from pipeline.keywords import as_items, compile_matcher
+from pipeline.scoring import PIPELINE_RULES, SCORE_FIELDS, TARGET_BACKGROUNDS, ScoreRules, score_rows
+
+# キーワード→業界マップ（run_pipeline_full.py と同じ内容）
+KEYWORD_MAP = {
+    "介護":"介護・福祉","看護":"介護・福祉","在宅":"介護・福祉",
+    "検査":"医療機器メーカー","診断":"医療機器メーカー","画像":"医療機器メーカー","医療機器":"医療機器メーカー","装置":"医療機器メーカー",
+    "医療データ":"医療IT・医療データ","医療情報":"医療IT・医療データ","医療saas":"医療IT・医療データ","ai":"医療IT・医療データ",
+    "製薬":"製薬・バイオ","医薬":"製薬・バイオ","バイオ":"製薬・バイオ","薬":"製薬・バイオ",
+    "栄養":"ヘルスケア食品・栄養","サプリ":"ヘルスケア食品・栄養","健康食品":"ヘルスケア食品・栄養",
+    "流通":"医療卸・流通","卸":"医療卸・流通",
+    "物流":"医療物流","配送":"医療物流","倉庫":"医療物流",
+    "出版":"医療メディア・出版","メディア":"医療メディア・出版","情報発信":"医療メディア・出版",
+    "教育":"教育・研修","研修":"教育・研修","スクール":"教育・研修",
+    "フィットネス":"フィットネス・健康サービス","スポーツ":"フィットネス・健康サービス"
+}
+
+# industry に応じた short_description のテンプレ
+TEMPLATES = {
+    "医療機器メーカー":"医療機器の開発・製造を行い、医療現場で使われる製品を提供しています。",
+    "製薬・バイオ":"医薬品やバイオ製品の研究開発・製造を行い、治療に用いられる薬を提供しています。",
+    "医療IT・医療データ":"医療×ITでシステムやデータサービスを提供し、現場の効率化を支援します。",
+    "介護・福祉":"介護・福祉サービスを提供し、高齢者支援や在宅ケアを行っています。"
+}
+
+SUGGEST_FIELDS = ["company_id","company_name","suggested_industry","confidence","matched_tokens","note"]
+
+# finalize_row() が書き換える列
+FINAL_FIELDS = ["side_job_fit_score","career_shift_fit_score","hybrid_fit_score","learning_growth_score","risk_level","target_background","short_description"]
+
+
+def suggestion_text(r):
+    """候補生成に使うテキスト（社名・説明・キーワード・領域を連結）"""
+    return " ".join([r.get("company_name","") or "", r.get("short_description","") or "", r.get("raw_medical_keywords","") or "", r.get("raw_medical_domains","") or ""])
+
+
+_MATCHERS = {}   # id(keyword_map) → (keyword_map, KeywordMatcher)。keyword_map は実行中に書き換えない前提
+
+
+def keyword_matcher(keyword_map=None):
+    """keyword_map のコンパイル済みオートマトン（辞書ごとに1回だけ作る）"""
+    keyword_map = keyword_map or KEYWORD_MAP
+    ent = _MATCHERS.get(id(keyword_map))
+    if ent is None or ent[0] is not keyword_map:
+        ent = _MATCHERS[id(keyword_map)] = (keyword_map, compile_matcher({"industry": as_items(keyword_map)}))
+    return ent[1]
+
+
+def suggest_industry_from_text(text: str, keyword_map=None):
+    t = (text or "").lower()
+    # キーワードの多さによらずテキストを1回走査するだけ（ヒットは辞書の順）
+    hits = keyword_matcher(keyword_map).scan(t).values("industry")
+    if not hits:
+        return "", 0.0, []
+    # 最頻出候補を選ぶ
+    cand = Counter(hits).most_common(1)[0][0]
+    # confidence: ベース0.4 + 0.15 * ヒット数（上限0.95）
+    conf = min(0.95, 0.4 + 0.15 * len(hits))
+    return cand, round(conf,2), hits
+
+
+def suggest_row(r, keyword_map=None):
+    """1行分の候補行（suggestions.csv の1行）を作る"""
+    suggested, conf, hits = suggest_industry_from_text(suggestion_text(r), keyword_map)
+    return {
+        "company_id": r.get("company_id",""),
+        "company_name": r.get("company_name",""),
+        "suggested_industry": suggested,
+        "confidence": conf,
+        "matched_tokens": ";".join(hits),
+        "note": ""
+    }
+
+
+def split_tokens(raw):
+    """raw_medical_keywords を ; , 両方対応で分割"""
+    return [t.strip() for t in (raw or "").replace(";",",").split(",") if t.strip()]
+
+
+def safe_int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
+
+def recompute(ms, industry):
+    """1行分の (side, career, hybrid, learning_growth, risk_level)"""
+    sc = PIPELINE_RULES.score_one(safe_int(ms), industry)
+    return tuple(sc[k] for k in SCORE_FIELDS[:5])
+
+
+def target_background(industry):
+    return TARGET_BACKGROUNDS[ScoreRules.target_category(industry)]
+
+
+def fill_description(r):
+    sd = r.get("short_description","") or ""
+    industry = r.get("industry") or ""
+    if len(sd) < 30 and industry in TEMPLATES:
+        r["short_description"] = TEMPLATES[industry]
+
+
+def finalize_row(r):
+    """スコア再計算・target_background・short_description 補完を1行に適用する"""
+    r.update(PIPELINE_RULES.score_one(safe_int(r.get("medical_relevance_score") or 0), r.get("industry") or ""))
+    fill_description(r)
+    return r
+
+
+def finalize_rows(rows):
+    """finalize_row() を全行まとめて適用する（スコアは列単位で計算）"""
+    rows = rows if isinstance(rows, list) else list(rows)
+    score_rows(rows, PIPELINE_RULES)
+    for r in rows:
+        fill_description(r)
+    return rows
@@ -0,0 +1,247 @@
+# pipeline/runner.py
+# run_* スクリプト共通の一発実行パイプライン本体
+import csv, sys
+from pathlib import Path
+from collections import Counter
+
+from pipeline.backup_store import BackupStore, DEFAULT_KEEP
+from pipeline.categorical import CategoricalColumn
+from pipeline.company_table import CompanyTable, write_csv, load_manual_map, apply_industry_row
+from pipeline.profiling import NullProfiler
+from pipeline.incremental import IncrementalState, row_hash, rules_fingerprint
+from pipeline.rules import KEYWORD_MAP, SUGGEST_FIELDS, FINAL_FIELDS, suggest_row, split_tokens, finalize_rows
+
+PREFILL_FIELDS = ["company_id","company_name","suggested_industry","confidence","matched_tokens"]
+AUTO_APPLY_LOG_FIELDS = ["company_id","company_name","applied_from","new_industry","original_industry","confidence"]
+
+
+class PipelineConfig:
+    """入出力ファイルと閾値の設定。スクリプトごとの差分はここで吸収する"""
+
+    def __init__(self, root=None, **kw):
+        root = Path(root) if root else Path.cwd()
+        self.root = root
+        self.backup_dir = kw.get("backup_dir", root / "backup_before_run")
+        # 入力候補（先頭から順に存在するものを使う）
+        self.sources = kw.get("sources", [root / "companies_master_raw.csv", root / "companies_master_final.csv"])
+        self.top100 = kw.get("top100", root / "top100_by_score.csv")
+        self.others = kw.get("others", root / "others_companies.csv")
+        self.manual_template = kw.get("manual_template", root / "manual_industry_map_template.csv")
+        self.manual_prefill = kw.get("manual_prefill")          # None なら prefill を書かない
+        self.suggest = kw.get("suggest", root / "manual_industry_map_suggestions.csv")
+        self.keyword_freq = kw.get("keyword_freq", root / "keyword_frequency.csv")
+        self.auto_mapped = kw.get("auto_mapped", root / "companies_master_auto.csv")
+        self.final = kw.get("final", root / "companies_master_final.csv")
+        self.auto_apply_log = kw.get("auto_apply_log")          # None ならログを書かない
+        self.extra_backups = kw.get("extra_backups", [])
+        # バックアップの保持ポリシー（実行数 / 日数）
+        self.backup_keep = kw.get("backup_keep", DEFAULT_KEEP)
+        self.backup_max_age_days = kw.get("backup_max_age_days")
+        self.keyword_map = kw.get("keyword_map", KEYWORD_MAP)
+        self.suggest_fields = kw.get("suggest_fields", SUGGEST_FIELDS)
+        self.prefill_threshold = kw.get("prefill_threshold", 0.6)
+        self.auto_apply_threshold = kw.get("auto_apply_threshold", 0.8)
+        self.top_n = kw.get("top_n", 100)
+        # 差分実行（--incremental）の状態ファイル
+        self.incremental = kw.get("incremental", False)
+        self.state_file = kw.get("state_file", root / "pipeline_state.json")
+        # ステージ成果物のキャッシュ（--memo）
+        self.cache_dir = kw.get("cache_dir", root / ".pipeline_cache")
+        # ステージ計測（--profile）。None なら計測しない
+        self.profiler = kw.get("profiler")
+        # 学習済みの業界分類器（--classifier / pipeline/classifier.py）。None ならキーワード推定
+        self.classifier = kw.get("classifier")
+
+    def outputs(self):
+        paths = [self.top100, self.others, self.manual_template, self.manual_prefill, self.suggest,
+                 self.keyword_freq, self.auto_mapped, self.final, self.auto_apply_log]
+        return [p for p in paths if p is not None] + list(self.extra_backups)
+
+
+# ヘルパー
+def backup_outputs(cfg: PipelineConfig):
+    """出力先の既存ファイルを BackupStore に保存し、(store, run_id) を返す"""
+    store = BackupStore(cfg.backup_dir)
+    run_id, stored = store.backup(cfg.outputs(), note="before_run")
+    store.prune(keep=cfg.backup_keep, max_age_days=cfg.backup_max_age_days)
+    print(f"Step: バックアップ {run_id}（新規保存 {stored} 件）")
+    return store, run_id
+
+
+def write_header_only(path: Path, fieldnames):
+    with path.open("w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerow(fieldnames)
+
+
+def find_source(cfg: PipelineConfig):
+    for p in cfg.sources:
+        if p.exists():
+            return p
+    return None
+
+
+def require_source(cfg: PipelineConfig):
+    src = find_source(cfg)
+    if src is None:
+        print("ERROR: " + " または ".join(p.name for p in cfg.sources) + " をプロジェクトルートに置いてください。")
+        sys.exit(1)
+    return src
+
+
+def load_source(cfg: PipelineConfig):
+    table = CompanyTable.from_csv(require_source(cfg))
+    if not len(table):
+        print("ERROR: 入力ファイルが空です。")
+        sys.exit(1)
+    # medical_relevance_score を整備
+    for r in table:
+        r["medical_relevance_score"] = r.get("medical_relevance_score") or "0"
+    return table
+
+
+def build_suggestions(table, keyword_map):
+    """全件の業界候補とキーワード頻度を作る"""
+    suggestions = []
+    token_freq = Counter()
+    for r in table:
+        suggestions.append(suggest_row(r, keyword_map))
+        token_freq.update(split_tokens(r.get("raw_medical_keywords")))
+    return suggestions, token_freq
+
+
+def write_keyword_freq(path: Path, token_freq):
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["token","count"])
+        for tok,cnt in token_freq.most_common():
+            w.writerow([tok,cnt])
+
+
+def ensure_manual_template(path: Path):
+    if not path.exists():
+        write_header_only(path, ["company_id","company_name","force_industry"])
+        print("Step: manual_industry_map_template.csv を新規作成しました（空）。")
+
+
+def prefill_rows(suggestions, threshold):
+    return [{k: s[k] for k in PREFILL_FIELDS}
+            for s in suggestions if s["confidence"] >= threshold and s["suggested_industry"]]
+
+
+def print_summary(rows):
+    # 業界はコードにして bincount で数える（順位が同じなら従来どおり先に出てきた業界が先）
+    cnt = Counter(CategoricalColumn.encode(r.get("industry") or "その他" for r in rows).counts())
+    scores = [int(r.get("medical_relevance_score") or 0) for r in rows]
+    print_summary_counts(len(rows), sum(scores), cnt)
+
+
+def print_summary_counts(total, score_sum, cnt):
+    print("\n===== SUMMARY =====")
+    print("総件数:", total)
+    print("平均 medical_relevance_score:", round(score_sum/total,2) if total else 0)
+    print("業界上位10:")
+    for k,v in cnt.most_common(10):
+        print(f"{k}: {v}")
+    print("====================\n")
+
+
+def run_pipeline(cfg: PipelineConfig):
+    prof = cfg.profiler or NullProfiler()
+
+    # 0. 入力ファイル検出
+    with prof.stage("load") as rec:
+        table = load_source(cfg)
+        rec["rows"] = len(table)
+
+    # 1. バックアップ（重要ファイル）
+    with prof.stage("backup"):
+        backup_outputs(cfg)
+
+    # 2. top100 / others 分割
+    with prof.stage("split", rows=len(table)):
+        table = table.sorted_by("medical_relevance_score")
+        top, others = table.split(cfg.top_n)
+        write_csv(cfg.top100, top, fieldnames=table.fieldnames)
+        write_csv(cfg.others, others, fieldnames=table.fieldnames)
+    print("Step: top100 / others を生成しました。")
+
+    # 3. manual template がなければ作成（空テンプレ）し、手動指定を読み込む
+    with prof.stage("manual_load") as rec:
+        ensure_manual_template(cfg.manual_template)
+        manual_map = load_manual_map(cfg.manual_template)
+        rec["rows"] = len(manual_map)
+
+    # 4. 行ごとに 候補生成 → manual override / 自動適用、その後スコア再計算を列単位でまとめて行う
+    #    --incremental では内容と manual 指定が前回と同じ行は保存済みの結果を使う
+    state = IncrementalState(cfg.state_file, rules_fingerprint(cfg)) if cfg.incremental else None
+    fieldnames = table.fieldnames
+    auto_fieldnames = fieldnames + [k for k in ["industry"] if k not in fieldnames]
+    final_fieldnames = auto_fieldnames + [k for k in FINAL_FIELDS if k not in auto_fieldnames]
+    suggestions = []
+    token_freq = Counter()
+    log = []
+    pending = []    # 再計算が必要な行
+    predicted = None
+    if cfg.classifier is not None:
+        # 分類器は全行を1回の疎行列の積でまとめて予測する
+        with prof.stage("classify", rows=len(table)):
+            predicted = cfg.classifier.suggest_rows(table.rows)
+    records = []    # 差分実行の状態に記録する (cid, hash, manual, suggestion, log, row)
+    with prof.stage("process", rows=len(table)), cfg.auto_mapped.open("w", encoding="utf-8", newline="") as f_auto:
+        w_auto = csv.DictWriter(f_auto, fieldnames=auto_fieldnames, extrasaction="ignore")
+        w_auto.writeheader()
+        for i, r in enumerate(table):
+            cid = r.get("company_id","")
+            manual = manual_map.get(cid, "")
+            h = row_hash(r) if state else None
+            cached = state.lookup(cid, h, manual) if state else None
+            token_freq.update(split_tokens(r.get("raw_medical_keywords")))
+            if cached:
+                s = cached["suggestion"]
+                r["industry"] = cached["industry"]
+                entry = cached["log"]
+                w_auto.writerow(r)
+                r.update(cached["final"])
+            else:
+                s = predicted[i] if predicted else prof.call("suggest", suggest_row, r, cfg.keyword_map)
+                entry = prof.call("auto_apply", apply_industry_row, r, s, manual_map, cfg.auto_apply_threshold)
+                prof.call("write_auto", w_auto.writerow, r)
+                pending.append(r)
+            suggestions.append(s)
+            if entry:
+                log.append(entry)
+            if state:
+                records.append((cid, h, manual, s, entry, r))
+
+    with prof.stage("rescore", rows=len(pending)):
+        finalize_rows(pending)
+    if state:
+        for cid, h, manual, s, entry, r in records:
+            state.record(cid, h, manual, s, r.get("industry",""), entry, {k: r[k] for k in FINAL_FIELDS})
+
+    # 5. 候補一覧・キーワード頻度・自動プリフィル（レビュー用ファイル）
+    with prof.stage("write", rows=len(table)):
+        write_csv(cfg.suggest, suggestions, fieldnames=cfg.suggest_fields)
+        write_keyword_freq(cfg.keyword_freq, token_freq)
+        print("Step: 自動候補とキーワード頻度を出力しました。")
+        if cfg.manual_prefill is not None:
+            prefill = prefill_rows(suggestions, cfg.prefill_threshold)
+            write_csv(cfg.manual_prefill, prefill, fieldnames=PREFILL_FIELDS)
+            if prefill:
+                print(f"Step: manual_prefill を作成しました（{len(prefill)} 件）。編集して manual_industry_map_template.csv に反映できます。")
+            else:
+                print("Step: manual_prefill は候補なし（空ファイルを作成）。")
+        if cfg.auto_apply_log is not None:
+            write_csv(cfg.auto_apply_log, log, fieldnames=AUTO_APPLY_LOG_FIELDS)
+            print(f"Step: 自動適用ログを出力しました（{len(log)} 件）。")
+
+        # 6. 最終出力（ファイル書き込み）
+        write_csv(cfg.final, table, fieldnames=final_fieldnames)
+        print("Step: 最終ファイルを書き出しました ->", cfg.final.name)
+        if state:
+            state.save()
+            print(f"Step: 差分実行 再計算 {state.recomputed} 件 / 再利用 {state.reused} 件 -> {cfg.state_file.name}")
+
+    # 7. 最終サマリ表示
+    print_summary(table.rows)
+    return table
@@ -0,0 +1,246 @@
+# pipeline/scoring.py
+# スコア帯ルールの評価エンジン（compute_scores / fill_scores / rescale_scores / finalize_templates_and_scores /
+# run_* パイプライン共通）
+#
+# medical_relevance_score（ms）の帯と業界カテゴリから
+#   side_job_fit_score / career_shift_fit_score / hybrid_fit_score / learning_growth_score / risk_level /
+#   target_background
+# を求める。スクリプトごとに帯の境界や値が少しずつ違うので、その差は ScoreRules の定義で表す。
+#   score_columns()  列（ms 配列・業界配列）をまとめて評価（np.searchsorted / np.select）
+#   score_one()      1行だけ評価（ストリーミングなど行単位の処理用。結果は score_columns と同じ）
+# 業界は文字列のまま比較せず、ユニークな業界ごとに1回だけカテゴリを判定してコード配列にする。
+from bisect import bisect_right
+
+import numpy as np
+
+from pipeline.categorical import CategoricalColumn
+from pipeline.quantiles import KLLSketch, breakpoints, rescale
+
+# 業界カテゴリ（コード = リストの位置）
+CATEGORIES = ["other", "it", "device", "pharma", "care"]
+CATEGORY_CODE = {c: i for i, c in enumerate(CATEGORIES)}
+
+# カテゴリ判定に使う業界名の部分文字列
+CATEGORY_KEYWORDS = {
+    "it": ("医療IT",),
+    "device": ("医療機器",),
+    "pharma": ("製薬", "バイオ"),
+    "care": ("介護",),
+}
+
+TARGET_BACKGROUNDS = {
+    "it": "ITエンジニア;医療現場経験者;データサイエンティスト",
+    "device": "機械設計;臨床経験者;品質管理",
+    "pharma": "研究職;臨床開発;薬剤師",
+    "care": "介護職;看護師;福祉系経験者",
+    "other": "医療関連経験者;業界未経験者歓迎",
+}
+# target_background の判定順（先に当たったもの）
+TARGET_ORDER = ["it", "device", "pharma", "care"]
+
+_TARGET_CACHE = {}
+
+SCORE_FIELDS = ["side_job_fit_score","career_shift_fit_score","hybrid_fit_score","learning_growth_score","risk_level","target_background"]
+
+
+class Bands:
+    """ms >= thresholds[i] ごとに値が上がる帯。thresholds は昇順、values は len(thresholds)+1 個"""
+
+    def __init__(self, thresholds, values):
+        assert len(values) == len(thresholds) + 1
+        self.thresholds = list(thresholds)
+        self.values = list(values)
+        self._t = np.asarray(self.thresholds)
+        self._v = np.asarray(self.values)
+
+    @classmethod
+    def descending(cls, pairs, default):
+        """[(85, 90), (65, 75), ...], default 形式（元スクリプトの if ms >= ... の並び）から作る"""
+        pairs = sorted(pairs)
+        return cls([t for t, _ in pairs], [default] + [v for _, v in pairs])
+
+    def one(self, ms):
+        return self.values[bisect_right(self.thresholds, ms)]
+
+    def column(self, ms):
+        return self._v[np.searchsorted(self._t, ms, side="right")]
+
+
+class ScoreRules:
+    """スコア計算ルール一式。None の項目は計算しない（fill_scores は side / career / hybrid のみ）"""
+
+    def __init__(self, name, side, career, learning=None, risk_bases=None, risk_order=(), risk_default=45,
+                 risk_keywords=None, target_background=True, transform=None):
+        self.name = name
+        self.side = side
+        self.career = career
+        self.learning = learning
+        # risk_level の業界ベース値。risk_order の順に判定し、最初に当たったカテゴリのベースを使う
+        self.risk_bases = risk_bases
+        self.risk_order = list(risk_order)
+        self.risk_default = risk_default
+        self.risk_keywords = dict(CATEGORY_KEYWORDS, **(risk_keywords or {}))
+        self._risk_cache = {}   # 業界 → ベース値（行単位の score_one で毎回部分文字列を調べない）
+        self.target_background = target_background
+        # 帯の判定前に ms に掛ける変換（rescale のパーセンタイル正規化）。スクリプト側で済ませる場合は使わない
+        self.transform = transform
+
+    def fields(self):
+        f = ["side_job_fit_score","career_shift_fit_score","hybrid_fit_score"]
+        if self.learning:
+            f.append("learning_growth_score")
+        if self.risk_bases:
+            f.append("risk_level")
+        if self.target_background:
+            f.append("target_background")
+        return f
+
+    # 業界 → risk_level のベース値
+    def risk_base(self, industry):
+        industry = industry or ""
+        base = self._risk_cache.get(industry)
+        if base is None:
+            base = self.risk_default
+            for cat in self.risk_order:
+                if any(k in industry for k in self.risk_keywords[cat]):
+                    base = self.risk_bases[cat]
+                    break
+            self._risk_cache[industry] = base
+        return base
+
+    @staticmethod
+    def target_category(industry):
+        industry = industry or ""
+        cat = _TARGET_CACHE.get(industry)
+        if cat is None:
+            cat = "other"
+            for c in TARGET_ORDER:
+                if any(k in industry for k in CATEGORY_KEYWORDS[c]):
+                    cat = c
+                    break
+            _TARGET_CACHE[industry] = cat
+        return cat
+
+    @staticmethod
+    def adjust_risk(base, ms):
+        # relevance が高いほどリスクはやや低めにする
+        if ms >= 80: base -= 10
+        if ms <= 10: base += 10
+        return max(10, min(90, base))
+
+    def score_one(self, ms, industry):
+        """1行分のスコアを dict で返す"""
+        s = self.side.one(ms)
+        c = self.career.one(ms)
+        out = {"side_job_fit_score": s, "career_shift_fit_score": c, "hybrid_fit_score": int((s + c) / 2)}
+        if self.learning:
+            out["learning_growth_score"] = self.learning.one(ms)
+        if self.risk_bases:
+            out["risk_level"] = self.adjust_risk(self.risk_base(industry), ms)
+        if self.target_background:
+            out["target_background"] = TARGET_BACKGROUNDS[self.target_category(industry)]
+        return out
+
+    def score_columns(self, ms, industries=None, encoded=None):
+        """ms（整数配列）と業界（文字列の並び）から列ごとの numpy 配列を dict で返す。
+
+        業界がすでにコード化されていれば encoded=(ユニークな業界のリスト, コード配列) で渡す。
+        """
+        ms = np.asarray(ms, dtype=np.int64)
+        s = self.side.column(ms)
+        c = self.career.column(ms)
+        out = {"side_job_fit_score": s, "career_shift_fit_score": c, "hybrid_fit_score": (s + c) // 2}
+        if self.learning:
+            out["learning_growth_score"] = self.learning.column(ms)
+        if self.risk_bases or self.target_background:
+            uniq, codes = encoded or industry_codes(industries if industries is not None else [""] * len(ms))
+        if self.risk_bases:
+            bases = np.array([self.risk_base(u) for u in uniq], dtype=np.int64)[codes]
+            base = np.select([ms >= 80, ms <= 10], [bases - 10, bases + 10], bases)
+            out["risk_level"] = np.clip(base, 10, 90)
+        if self.target_background:
+            tb = np.array([CATEGORY_CODE[self.target_category(u)] for u in uniq], dtype=np.int8)[codes]
+            out["target_background"] = np.array([TARGET_BACKGROUNDS[c] for c in CATEGORIES], dtype=object)[tb]
+        return out
+
+
+def industry_codes(industries):
+    """業界の並び → (ユニークな業界のリスト, 各行のコード配列)"""
+    col = CategoricalColumn.encode(industries)
+    return col.dictionary.values, col.codes
+
+
+def parse_scores(values):
+    """medical_relevance_score の列を整数配列に（数値でないもの・空は 0）"""
+    out = np.zeros(len(values), dtype=np.int64)
+    for i, v in enumerate(values):
+        try:
+            out[i] = int(v or 0)
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+def score_rows(rows, rules, ms=None):
+    """rows（dict のリスト）にスコア列を書き込む。ms を省略すると medical_relevance_score から読む"""
+    if not rows:
+        return rows
+    if ms is None:
+        ms = parse_scores([r.get("medical_relevance_score") for r in rows])
+    cols = rules.score_columns(ms, [r.get("industry") for r in rows])
+    names = list(cols)
+    for r, vals in zip(rows, zip(*(cols[k].tolist() for k in names))):
+        r.update(zip(names, vals))
+    return rows
+
+
+def percentile_transform(ms):
+    """ms を全件の分布で 0-100 のパーセンタイルに写す（rescale_scores.py と同じ）"""
+    return rescale(ms, breakpoints(KLLSketch().update_many(ms)))
+
+
+# ---- スクリプトごとのルール定義（RULE_SETS に名前で登録） ----
+RULE_SETS = {}
+
+
+def register(rules):
+    RULE_SETS[rules.name] = rules
+    return rules
+
+
+_PIPELINE_RISK = {"risk_bases": {"it": 30, "pharma": 50, "device": 40}, "risk_order": ["it", "pharma", "device"]}
+
+# run_* パイプライン / finalize_templates_and_scores.py
+PIPELINE_RULES = register(ScoreRules(
+    "pipeline",
+    side=Bands.descending([(85, 90), (65, 75), (40, 60), (15, 45)], 25),
+    career=Bands.descending([(85, 30), (65, 40), (40, 60), (15, 75)], 85),
+    learning=Bands.descending([(85, 80), (65, 65), (40, 50), (15, 40)], 30),
+    **_PIPELINE_RISK))
+
+# compute_scores.py（業界の判定順が 医療機器 → 製薬 → 医療IT）
+COMPUTE_RULES = register(ScoreRules(
+    "compute",
+    side=Bands.descending([(90, 90), (70, 75), (40, 60), (10, 40)], 20),
+    career=Bands.descending([(90, 30), (70, 40), (40, 60), (10, 75)], 85),
+    learning=Bands.descending([(80, 80), (50, 65), (20, 50)], 30),
+    risk_bases={"device": 40, "pharma": 50, "it": 30}, risk_order=["device", "pharma", "it"]))
+
+# fill_scores.py（side / career / hybrid のみ）
+FILL_RULES = register(ScoreRules(
+    "fill",
+    side=Bands.descending([(80, 80), (40, 60), (10, 40)], 20),
+    career=Bands.descending([(80, 30), (40, 50), (10, 70)], 80),
+    target_background=False))
+
+# rescale_scores.py（パーセンタイル正規化後の ms に適用。target_background は付けない）
+# rescale_scores.py は保存済みスケッチで自前に正規化して ms を渡すので transform は比較用
+RESCALE_RULES = register(ScoreRules(
+    "rescale",
+    side=PIPELINE_RULES.side,
+    career=PIPELINE_RULES.career,
+    learning=Bands.descending([(80, 80), (50, 65), (20, 45)], 30),
+    risk_keywords={"it": ("医療it", "医療IT")},
+    target_background=False,
+    transform=percentile_transform,
+    **_PIPELINE_RISK))
@@ -0,0 +1,125 @@
+# pipeline/sharding.py
+# 複数プロセスでの分割実行（--workers N）
+# company_id のハッシュで行をシャードに分け、各プロセスで 候補生成 → 自動適用 → スコア再計算（列単位）を行う。
+# 並び順・top100・キーワード頻度・サマリはシャードごとの部分結果を合成して作るので、
+# 出力は run_pipeline() と同じ内容・同じ順序になる。
+import heapq, zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline.company_table import CompanyTable, write_csv, load_manual_map, apply_industry_row
+from pipeline.rules import FINAL_FIELDS, suggest_row, split_tokens, finalize_rows, safe_int
+from pipeline.runner import (
+    PREFILL_FIELDS, AUTO_APPLY_LOG_FIELDS, backup_outputs, ensure_manual_template, load_source,
+    prefill_rows, print_summary_counts, write_keyword_freq,
+)
+
+
+def shard_of(cid, n):
+    """company_id → シャード番号（プロセスをまたいで安定なハッシュ）"""
+    return zlib.crc32(str(cid).encode("utf-8")) % n
+
+
+def count_first(counts, key, pos):
+    """counts[key] = [件数, 最初に現れた並び位置] を更新する"""
+    ent = counts.get(key)
+    if ent is None:
+        counts[key] = [1, pos]
+    else:
+        ent[0] += 1
+        if pos < ent[1]:
+            ent[1] = pos
+
+
+def merge_counts(partials):
+    """シャードごとの counts を合成した Counter を返す。
+
+    件数降順・初出順に挿入するので、most_common() は逐次処理のときと同じ順序になる。
+    """
+    total = {}
+    for part in partials:
+        for k, (c, pos) in part.items():
+            ent = total.get(k)
+            if ent is None:
+                total[k] = [c, pos]
+            else:
+                ent[0] += c
+                ent[1] = min(ent[1], pos)
+    return Counter({k: c for k, (c, _) in sorted(total.items(), key=lambda kv: (-kv[1][0], kv[1][1]))})
+
+
+def process_shard(args):
+    """1シャード分の処理（ワーカープロセスで実行）"""
+    items, keyword_map, manual_map, threshold = args
+    results = {}
+    order = []
+    tokens = {}
+    industries = {}
+    score_sum = 0
+    for idx, r in items:
+        # pos はスコア降順・入力順の並び位置（sorted の安定ソートと同じ）
+        pos = (-safe_int(r.get("medical_relevance_score")), idx)
+        order.append(pos)
+        s = suggest_row(r, keyword_map)
+        for t in split_tokens(r.get("raw_medical_keywords")):
+            count_first(tokens, t, pos)
+        entry = apply_industry_row(r, s, manual_map, threshold)
+        auto_vals = {k: r.get(k) for k in FINAL_FIELDS if k in r}
+        count_first(industries, r.get("industry") or "その他", pos)
+        score_sum += safe_int(r.get("medical_relevance_score"))
+        results[idx] = (s, entry, auto_vals, r)
+    finalize_rows([res[3] for res in results.values()])
+    order.sort()
+    return results, order, tokens, industries, score_sum
+
+
+def run_pipeline_sharded(cfg, workers):
+    table = load_source(cfg)
+    fieldnames = table.fieldnames
+    backup_outputs(cfg)
+    ensure_manual_template(cfg.manual_template)
+    manual_map = load_manual_map(cfg.manual_template)
+
+    # 1. company_id のハッシュでシャード分割
+    shards = [[] for _ in range(workers)]
+    for idx, r in enumerate(table):
+        shards[shard_of(r.get("company_id",""), workers)].append((idx, dict(r)))
+    jobs = [(items, cfg.keyword_map, manual_map, cfg.auto_apply_threshold) for items in shards if items]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        parts = list(ex.map(process_shard, jobs))
+    print(f"Step: {len(jobs)} シャードを {workers} プロセスで処理しました。")
+
+    # 2. 並び順（= top100 / others）をシャードごとのソート済み部分列のマージで決める
+    results = {}
+    for res, *_ in parts:
+        results.update(res)
+    order = [idx for _, idx in heapq.merge(*(p[1] for p in parts))]
+    base_rows = table.rows
+    write_csv(cfg.top100, (base_rows[i] for i in order[:cfg.top_n]), fieldnames=fieldnames)
+    write_csv(cfg.others, (base_rows[i] for i in order[cfg.top_n:]), fieldnames=fieldnames)
+    print("Step: top100 / others を生成しました。")
+
+    # 3. 元の並び順で各ファイルを書き出す
+    suggestions = [results[i][0] for i in order]
+    log = [results[i][1] for i in order if results[i][1]]
+    auto_fieldnames = fieldnames + [k for k in ["industry"] if k not in fieldnames]
+    final_fieldnames = auto_fieldnames + [k for k in FINAL_FIELDS if k not in auto_fieldnames]
+    write_csv(cfg.suggest, suggestions, fieldnames=cfg.suggest_fields)
+    write_keyword_freq(cfg.keyword_freq, merge_counts(p[2] for p in parts))
+    print("Step: 自動候補とキーワード頻度を出力しました。")
+    if cfg.manual_prefill is not None:
+        prefill = prefill_rows(suggestions, cfg.prefill_threshold)
+        write_csv(cfg.manual_prefill, prefill, fieldnames=PREFILL_FIELDS)
+        print(f"Step: manual_prefill を作成しました（{len(prefill)} 件）。")
+    if cfg.auto_apply_log is not None:
+        write_csv(cfg.auto_apply_log, log, fieldnames=AUTO_APPLY_LOG_FIELDS)
+        print(f"Step: 自動適用ログを出力しました（{len(log)} 件）。")
+    write_csv(cfg.auto_mapped, ({**results[i][3], **results[i][2]} for i in order), fieldnames=auto_fieldnames)
+    final_rows = [results[i][3] for i in order]
+    write_csv(cfg.final, final_rows, fieldnames=final_fieldnames)
+    print("Step: 最終ファイルを書き出しました ->", cfg.final.name)
+
+    # 4. サマリもシャードの部分集計から
+    industries = merge_counts(p[3] for p in parts)
+    print_summary_counts(len(order), sum(p[4] for p in parts), industries)
+    return CompanyTable(final_rows, final_fieldnames)
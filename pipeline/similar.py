@@ -0,0 +1,122 @@
+# pipeline/similar.py
+# 似ている企業の一覧（LINE の「詳細を見る」の次に出す候補）をオフラインで作る
+#
+#   python -m pipeline.similar                                 # companies_master_final.csv → line_tools/similar_companies.*
+#   python -m pipeline.similar --input line_tools/companies_master_final.csv -k 20
+#
+# 説明・キーワード・領域・対象の経歴を文字 n-gram の TF-IDF にし（L2 正規化なので内積 = コサイン類似度）、
+# 業界ごとのブロックの中だけで類似度を計算する。大きな業界は行をさらに分け、一度に作る密行列は
+# MAX_CELLS 要素まで。n×n の行列は作らない。
+#
+# 出力は line_tools/similar_companies.py がそのまま mmap して O(k) で引ける形式:
+#   similar_companies.bin   ヘッダ（MAGIC, FORMAT_VERSION, n, k）+ 近傍の行番号 int32[n][k] + 類似度 float32[n][k]
+#                           近傍が k 件に満たない行は -1 / 0.0 で埋める
+#   similar_companies.json  行番号 → company_id・社名・業界・スコア
+import argparse, json, struct, sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from pipeline.loader import load_rows
+
+OUT = Path("line_tools") / "similar_companies.bin"
+MAGIC = b"SIMC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIII")   # line_tools/similar_companies.py と同じ
+DEFAULT_K = 10
+MAX_CELLS = 4_000_000   # 1回に作る類似度の密行列の要素数の上限
+TEXT_FIELDS = ["short_description","raw_medical_keywords","raw_medical_domains","target_background"]
+
+
+def company_text(r):
+    return " ".join((r.get(k) or "") for k in TEXT_FIELDS)
+
+
+def unique_rows(rows):
+    """company_id が重複する行は先の行だけを使う"""
+    seen, out = set(), []
+    for r in rows:
+        cid = r.get("company_id","")
+        if cid and cid not in seen:
+            seen.add(cid)
+            out.append(r)
+    return out
+
+
+def top_k_blocked(X, blocks, k):
+    """blocks（行番号の配列のリスト）ごとに、ブロック内の類似度の上位 k 件を求める"""
+    n = X.shape[0]
+    nbrs = np.full((n, k), -1, dtype=np.int32)
+    sims = np.zeros((n, k), dtype=np.float32)
+    for members in blocks:
+        if len(members) < 2:
+            continue
+        B = X[members]
+        kk = min(k, len(members) - 1)
+        step = max(1, MAX_CELLS // len(members))
+        for start in range(0, len(members), step):
+            rows = members[start:start + step]
+            S = (X[rows] @ B.T).toarray()
+            S[np.arange(len(rows)), np.arange(start, start + len(rows))] = -np.inf   # 自分自身は除く
+            part = np.argpartition(-S, kk - 1, axis=1)[:, :kk]
+            order = np.take_along_axis(S, part, axis=1).argsort(axis=1)[:, ::-1]
+            top = np.take_along_axis(part, order, axis=1)
+            nbrs[rows, :kk] = members[top]
+            sims[rows, :kk] = np.take_along_axis(S, top, axis=1)
+    return nbrs, sims
+
+
+def build(rows, k=DEFAULT_K):
+    """(近傍の行番号, 類似度, 行ごとの情報)"""
+    rows = unique_rows(rows)
+    X = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 3), sublinear_tf=True).fit_transform(
+        [company_text(r) for r in rows]).tocsr()
+    by_industry = {}
+    for i, r in enumerate(rows):
+        by_industry.setdefault((r.get("industry") or "").strip(), []).append(i)
+    blocks = [np.array(m, dtype=np.int64) for m in by_industry.values()]
+    nbrs, sims = top_k_blocked(X, blocks, k)
+    meta = [{"company_id": r.get("company_id",""), "company_name": r.get("company_name",""),
+             "industry": r.get("industry","") or "", "medical_relevance_score": r.get("medical_relevance_score","") or ""}
+            for r in rows]
+    return nbrs, sims, meta
+
+
+def write_graph(path: Path, nbrs, sims, meta):
+    n, k = nbrs.shape
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, n, k))
+        f.write(nbrs.astype("<i4").tobytes())
+        f.write(sims.astype("<f4").tobytes())
+    tmp.replace(path)
+    side = path.with_suffix(".json")
+    tmp = side.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(side)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="似ている企業の一覧（mmap 用の隣接配列）を作る")
+    parser.add_argument("--input", default="companies_master_final.csv")
+    parser.add_argument("--out", default=str(OUT))
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    args = parser.parse_args(argv)
+
+    src = Path(args.input)
+    if not src.exists():
+        print(f"ERROR: {src.name} がありません。")
+        return 1
+    rows, _ = load_rows(src)
+    nbrs, sims, meta = build(rows, args.k)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    write_graph(out, nbrs, sims, meta)
+    filled = int((nbrs >= 0).sum())
+    print(f"Step: {len(meta)} 社 × 上位 {args.k} 件（近傍 {filled} 件）-> {out} / {out.with_suffix('.json').name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+# pipeline/snapshots.py
+# 名前付き・バージョン付きの企業テーブルスナップショット（Arrow / Parquet）
+#
+# snapshots/<name>/
+#   manifest.json          バージョン一覧（base / delta、件数、作成日時、元ステージ）
+#   v0001.parquet          base: 全行（zstd 圧縮）
+#   v0002.delta.parquet    delta: 前バージョンから追加・変更された行と削除 ID（__op 列）
+#   latest.arrow           最新版の非圧縮 Arrow IPC。memory map で読むので CSV の解析が要らない
+#
+# industry / target_background / short_description は Arrow の dictionary 型（値の一覧 + int32 コード）で持つ。
+#
+# companies_master_*_vN.csv のように全件コピーを増やす代わりに、履歴は差分だけを積む。
+#
+# 集計レポート（pipeline/reports.py）は CSV と同じ名前のスナップショットが CSV より新しければ、
+# latest.arrow から必要な列だけを読む（load_latest_rows）。
+import argparse, csv, json, sys
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline.categorical import CATEGORICAL_FIELDS
+
+KEY = "company_id"
+OP = "__op"                 # delta 内の操作（"upsert" / "delete"）
+BASE_EVERY = 10             # この世代ごとに全件の base を書き直す
+NUMERIC_FIELDS = [
+    "medical_relevance_score","side_job_fit_score","career_shift_fit_score","hybrid_fit_score",
+    "risk_level","learning_growth_score","raw_total_medical_score",
+]
+
+
+def rows_to_table(rows, fieldnames):
+    """dict 行を Arrow テーブルにする。数値列は全行が整数なら int64、カテゴリ列は dictionary 型、それ以外は文字列"""
+    cols = {}
+    for k in fieldnames:
+        vals = [r.get(k) for r in rows]
+        vals = [None if v is None or v == "" else v for v in vals]
+        if k in NUMERIC_FIELDS:
+            try:
+                cols[k] = pa.array([None if v is None else int(v) for v in vals], pa.int64())
+                continue
+            except (TypeError, ValueError):
+                pass
+        arr = pa.array([None if v is None else str(v) for v in vals], pa.string())
+        cols[k] = arr.dictionary_encode() if k in CATEGORICAL_FIELDS else arr
+    return pa.table(cols)
+
+
+def table_to_rows(table):
+    """Arrow テーブルを csv.DictReader と同じ文字列の dict 行に戻す"""
+    out = []
+    for r in table.to_pylist():
+        out.append({k: "" if v is None else str(v) for k, v in r.items()})
+    return out
+
+
+class SnapshotStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _dir(self, name):
+        return self.root / name
+
+    def manifest(self, name):
+        p = self._dir(name) / "manifest.json"
+        if not p.exists():
+            return {"name": name, "versions": []}
+        return json.loads(p.read_text(encoding="utf-8"))
+
+    def _save_manifest(self, name, m):
+        p = self._dir(name) / "manifest.json"
+        tmp = p.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(m, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(p)
+
+    def versions(self, name):
+        return [v["version"] for v in self.manifest(name)["versions"]]
+
+    def write(self, name, rows, fieldnames, source=""):
+        """rows を新しいバージョンとして保存し、バージョン番号を返す"""
+        d = self._dir(name)
+        d.mkdir(parents=True, exist_ok=True)
+        m = self.manifest(name)
+        version = (m["versions"][-1]["version"] + 1) if m["versions"] else 1
+        table = rows_to_table(rows, fieldnames)
+
+        kind = "base"
+        if m["versions"] and (version - 1) % BASE_EVERY != 0:
+            delta = self._delta(self.load(name), table)
+            if delta is not None and delta.num_rows <= table.num_rows // 2:
+                kind = "delta"
+        if kind == "base":
+            fname = f"v{version:04d}.parquet"
+            pq.write_table(table, d / fname, compression="zstd")
+            stored = table.num_rows
+        else:
+            fname = f"v{version:04d}.delta.parquet"
+            pq.write_table(delta, d / fname, compression="zstd")
+            stored = delta.num_rows
+
+        # 最新版は非圧縮 IPC で置き換える（memory map 用）。IPC ファイルはバッチ間で辞書を共有するので1つにまとめる
+        table = table.unify_dictionaries().combine_chunks()
+        tmp = d / "latest.arrow.tmp"
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as w:
+                w.write_table(table)
+        tmp.replace(d / "latest.arrow")
+
+        m["versions"].append({
+            "version": version,
+            "kind": kind,
+            "file": fname,
+            "rows": table.num_rows,
+            "stored_rows": stored,
+            "columns": list(fieldnames),
+            "source": source,
+            "created": datetime.now().isoformat(timespec="seconds"),
+        })
+        self._save_manifest(name, m)
+        return version
+
+    def _delta(self, prev, cur):
+        """prev → cur の差分（追加・変更行は upsert、消えた ID は delete）。
+
+        apply_delta() で cur と同じ行・同じ順に戻せないとき（company_id が空・重複、
+        残った行の順が変わった、追加行が末尾でない）は None を返す（呼び出し側は base を書く）。
+        """
+        prev_list, cur_list = prev.to_pylist(), cur.to_pylist()
+        prev_ids = [r[KEY] for r in prev_list]
+        cur_ids = [r[KEY] for r in cur_list]
+        if not unique_ids(prev_ids) or not unique_ids(cur_ids):
+            return None
+        prev_set, cur_set = set(prev_ids), set(cur_ids)
+        kept = [cid for cid in cur_ids if cid in prev_set]
+        if kept != [cid for cid in prev_ids if cid in cur_set] or not all(cid in prev_set for cid in cur_ids[:len(kept)]):
+            return None
+        prev_rows = dict(zip(prev_ids, prev_list))
+        upserts = [r for r in cur_list if prev_rows.get(r[KEY]) != r]
+        deleted = [cid for cid in prev_ids if cid not in cur_set]
+        ops = pa.array(["upsert"] * len(upserts) + ["delete"] * len(deleted), pa.string())
+        body = pa.Table.from_pylist(upserts + [{KEY: cid} for cid in deleted], schema=cur.schema)
+        return body.append_column(OP, ops)
+
+    def load(self, name, columns=None, version=None):
+        """スナップショットを Arrow テーブルで返す。
+
+        version 省略時は latest.arrow を memory map で読む（解析なし・指定列のみ）。
+        古いバージョンは直前の base に delta を順に当てて復元する（行順も保存時と同じ。
+        順序が変わったバージョンや company_id が一意でないバージョンは base で保存している）。
+        """
+        m = self.manifest(name)
+        if not m["versions"]:
+            raise FileNotFoundError(f"スナップショットがありません: {name}")
+        latest = m["versions"][-1]["version"]
+        if version is None or version == latest:
+            source = pa.memory_map(str(self._dir(name) / "latest.arrow"), "r")
+            table = pa.ipc.open_file(source).read_all()
+            return table.select(columns) if columns else table
+
+        entries = [v for v in m["versions"] if v["version"] <= version]
+        if not entries or entries[-1]["version"] != version:
+            raise KeyError(f"{name} にバージョン {version} はありません")
+        start = max(i for i, v in enumerate(entries) if v["kind"] == "base")
+        table = pq.read_table(self._dir(name) / entries[start]["file"])
+        for v in entries[start + 1:]:
+            table = apply_delta(table, pq.read_table(self._dir(name) / v["file"]))
+        return table.select(columns) if columns else table
+
+    def load_rows(self, name, columns=None, version=None):
+        return table_to_rows(self.load(name, columns=columns, version=version))
+
+    def export_csv(self, name, path: Path, version=None):
+        table = self.load(name, version=version)
+        with Path(path).open("w", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=table.column_names)
+            w.writeheader()
+            for r in table_to_rows(table):
+                w.writerow(r)
+
+
+def unique_ids(ids):
+    """company_id がすべて空でなく重複もないか"""
+    return all(ids) and len(set(ids)) == len(ids)
+
+
+def apply_delta(table, delta):
+    """delta を当てる。変更行は元の位置で差し替え、新規行は末尾に付ける"""
+    updated, deleted = {}, set()
+    for r, op in zip(delta.drop_columns([OP]).to_pylist(), delta.column(OP).to_pylist()):
+        if op == "delete":
+            deleted.add(r[KEY])
+        else:
+            updated[r[KEY]] = r
+    rows = []
+    for r in table.to_pylist():
+        if r[KEY] in deleted:
+            continue
+        rows.append(updated.pop(r[KEY], r))
+    rows.extend(updated.values())
+    return pa.Table.from_pylist(rows, schema=delta.schema.remove(delta.schema.get_field_index(OP)))
+
+
+def load_latest_rows(root: Path, path: Path, columns=None):
+    """path（CSV）と同じ名前の最新スナップショットを (dict 行, 列名) で返す。
+
+    スナップショットが無い・CSV より古い・columns の列が足りないときは None（呼び出し側は CSV を読む）。
+    """
+    path = Path(path)
+    latest = Path(root) / path.stem / "latest.arrow"
+    if not latest.exists() or (path.exists() and latest.stat().st_mtime < path.stat().st_mtime):
+        return None
+    table = SnapshotStore(root).load(path.stem)
+    if columns is not None:
+        if any(k not in table.column_names for k in columns):
+            return None
+        table = table.select(list(columns))
+    return table_to_rows(table), table.column_names
+
+
+def read_csv_rows(path: Path):
+    """CSV の dict 行と列名。同じ列名が複数あれば注意を出し、最初の位置に1列だけ残す（値は後の列）"""
+    with Path(path).open(encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        rows, fieldnames = list(reader), reader.fieldnames or []
+    dup = sorted({k for k in fieldnames if fieldnames.count(k) > 1}, key=fieldnames.index)
+    if dup:
+        print(f"注意: {Path(path).name} の列名が重複しています（後の列の値だけを保存します）:", ", ".join(dup))
+        fieldnames = list(dict.fromkeys(fieldnames))
+    return rows, fieldnames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="企業テーブルのスナップショット管理")
+    parser.add_argument("--root", default="snapshots", help="スナップショットの保存先")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_imp = sub.add_parser("import", help="CSV を新しいバージョンとして取り込む")
+    p_imp.add_argument("name")
+    p_imp.add_argument("csv", nargs="+", help="複数指定すると古い順に 1 バージョンずつ取り込む")
+    p_ls = sub.add_parser("list", help="バージョン一覧")
+    p_ls.add_argument("name")
+    p_exp = sub.add_parser("export", help="スナップショットを CSV に書き出す")
+    p_exp.add_argument("name")
+    p_exp.add_argument("out")
+    p_exp.add_argument("--version", type=int)
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(Path(args.root))
+    if args.cmd == "import":
+        for path in args.csv:
+            rows, fieldnames = read_csv_rows(Path(path))
+            v = store.write(args.name, rows, fieldnames, source=Path(path).name)
+            print(f"取り込み: {path} -> {args.name} v{v}")
+    elif args.cmd == "list":
+        for v in store.manifest(args.name)["versions"]:
+            print(f"v{v['version']:04d} {v['kind']:5s} rows={v['rows']} stored={v['stored_rows']} {v['created']} {v['source']}")
+    elif args.cmd == "export":
+        store.export_csv(args.name, Path(args.out), version=args.version)
+        print("書き出し完了:", args.out)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
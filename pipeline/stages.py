@@ -0,0 +1,210 @@
+# pipeline/stages.py
+# 一発実行パイプラインをステージのグラフとして宣言し、成果物をメモ化して実行する
+# 各ステージのキーは「入力ファイルの内容ハッシュ + パラメータ + コードのバージョン」。
+# キーが前回と同じステージは実行せず、キャッシュ済みの成果物を出力先に戻す（内容ベースの make）。
+import hashlib, json, shutil
+from pathlib import Path
+from collections import Counter
+
+from pipeline.company_table import CompanyTable, read_csv, write_csv, load_manual_map
+from pipeline.rules import TEMPLATES, finalize_rows, split_tokens, suggest_row
+from pipeline.runner import (
+    PREFILL_FIELDS, AUTO_APPLY_LOG_FIELDS, backup_outputs, ensure_manual_template, load_source,
+    prefill_rows, print_summary, require_source, write_keyword_freq,
+)
+
+PKG_DIR = Path(__file__).resolve().parent
+# ステージの処理内容に関わるモジュール。中身が変わればキャッシュは全て無効になる
+CODE_FILES = ["rules.py", "scoring.py", "quantiles.py", "keywords.py", "company_table.py", "loader.py",
+              "categorical.py", "classifier.py", "runner.py", "stages.py"]
+KEEP_ENTRIES = 5   # ステージごとに残すキャッシュ世代数
+
+
+def file_digest(path: Path):
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def code_version():
+    h = hashlib.sha256()
+    for name in CODE_FILES:
+        h.update((PKG_DIR / name).read_bytes())
+    return h.hexdigest()
+
+
+class Stage:
+    """inputs のファイルから outputs のファイルを作る処理 fn（引数なし）
+
+    external は人が用意する入力（元データ・manual template）。キーには含めるが依存関係は作らない。
+    """
+
+    def __init__(self, name, inputs, outputs, fn, params=None, external=None):
+        self.name = name
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.fn = fn
+        self.params = params or {}
+        self.external = list(external or [])
+
+    def key(self, code):
+        h = hashlib.sha256()
+        h.update(self.name.encode("utf-8"))
+        h.update(code.encode("utf-8"))
+        h.update(json.dumps(self.params, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        for p in self.inputs + self.external:
+            h.update(p.name.encode("utf-8"))
+            h.update(file_digest(p).encode("utf-8") if p.exists() else b"-")
+        return h.hexdigest()
+
+
+class StageGraph:
+    def __init__(self, stages, cache_dir: Path):
+        self.stages = {s.name: s for s in stages}
+        self.cache_dir = cache_dir
+        self.ran = []
+        self.skipped = []
+
+    def deps(self, stage):
+        """stage の入力を出力に持つステージ名"""
+        return [o.name for o in self.stages.values() if o is not stage and set(o.outputs) & set(stage.inputs)]
+
+    def order(self):
+        done, out = set(), []
+
+        def visit(name, path):
+            if name in done:
+                return
+            if name in path:
+                raise ValueError("ステージグラフが循環しています: " + " -> ".join(path + [name]))
+            for d in self.deps(self.stages[name]):
+                visit(d, path + [name])
+            done.add(name)
+            out.append(self.stages[name])
+
+        for name in self.stages:
+            visit(name, [])
+        return out
+
+    def restore(self, stage, entry: Path):
+        manifest = json.loads((entry / "manifest.json").read_text(encoding="utf-8"))
+        for p in stage.outputs:
+            digest = manifest["outputs"][p.name]
+            if not (p.exists() and file_digest(p) == digest):
+                shutil.copy(entry / p.name, p)
+
+    def store(self, stage, entry: Path):
+        tmp = entry.with_name(entry.name + ".tmp")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        outputs = {}
+        for p in stage.outputs:
+            shutil.copy(p, tmp / p.name)
+            outputs[p.name] = file_digest(p)
+        manifest = {"stage": stage.name, "params": stage.params, "outputs": outputs}
+        (tmp / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        if entry.exists():
+            shutil.rmtree(entry)
+        tmp.replace(entry)
+        self.prune(entry.parent)
+
+    def prune(self, stage_dir: Path):
+        entries = sorted((d for d in stage_dir.iterdir() if d.is_dir()), key=lambda d: d.stat().st_mtime, reverse=True)
+        for d in entries[KEEP_ENTRIES:]:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def run(self):
+        code = code_version()
+        for stage in self.order():
+            key = stage.key(code)
+            entry = self.cache_dir / stage.name / key
+            if (entry / "manifest.json").exists():
+                self.restore(stage, entry)
+                entry.touch()
+                self.skipped.append(stage.name)
+                print(f"Stage: {stage.name} は入力に変化がないためスキップ（キャッシュ {key[:12]}）")
+                continue
+            stage.fn()
+            self.store(stage, entry)
+            self.ran.append(stage.name)
+            print(f"Stage: {stage.name} を実行しました（キー {key[:12]}）")
+
+
+def read_suggestions(path: Path):
+    rows = read_csv(path)
+    for s in rows:
+        s["confidence"] = float(s.get("confidence") or 0)
+    return rows
+
+
+def build_graph(cfg, src: Path):
+    """run_pipeline() と同じ処理をステージに分けて宣言する"""
+
+    def split():
+        table = load_source(cfg).sorted_by("medical_relevance_score")
+        top, others = table.split(cfg.top_n)
+        write_csv(cfg.top100, top, fieldnames=table.fieldnames)
+        write_csv(cfg.others, others, fieldnames=table.fieldnames)
+
+    def sorted_rows():
+        # top100 + others でスコア順の全件になる
+        return read_csv(cfg.top100) + read_csv(cfg.others)
+
+    def suggest():
+        suggestions = []
+        token_freq = Counter()
+        for r in sorted_rows():
+            suggestions.append(suggest_row(r, cfg.keyword_map))
+            token_freq.update(split_tokens(r.get("raw_medical_keywords")))
+        write_csv(cfg.suggest, suggestions, fieldnames=cfg.suggest_fields)
+        write_keyword_freq(cfg.keyword_freq, token_freq)
+
+    def prefill():
+        rows = prefill_rows(read_suggestions(cfg.suggest), cfg.prefill_threshold)
+        write_csv(cfg.manual_prefill, rows, fieldnames=PREFILL_FIELDS)
+
+    def auto_apply():
+        table = CompanyTable(sorted_rows())
+        fieldnames = table.fieldnames
+        sug_index = CompanyTable(read_suggestions(cfg.suggest)).index
+        log = table.apply_industry(sug_index, load_manual_map(cfg.manual_template), cfg.auto_apply_threshold)
+        write_csv(cfg.auto_mapped, table, fieldnames=fieldnames + [k for k in ["industry"] if k not in fieldnames])
+        if cfg.auto_apply_log is not None:
+            write_csv(cfg.auto_apply_log, log, fieldnames=AUTO_APPLY_LOG_FIELDS)
+
+    def finalize():
+        table = CompanyTable.from_csv(cfg.auto_mapped)
+        finalize_rows(table.rows)
+        write_csv(cfg.final, table, fieldnames=table.fieldnames)
+
+    stages = [
+        Stage("split", [], [cfg.top100, cfg.others], split, {"top_n": cfg.top_n}, external=[src]),
+        Stage("suggest", [cfg.top100, cfg.others], [cfg.suggest, cfg.keyword_freq], suggest,
+              {"keyword_map": cfg.keyword_map, "fields": cfg.suggest_fields}),
+        Stage("auto_apply", [cfg.top100, cfg.others, cfg.suggest],
+              [cfg.auto_mapped] + ([cfg.auto_apply_log] if cfg.auto_apply_log is not None else []), auto_apply,
+              {"auto_apply_threshold": cfg.auto_apply_threshold}, external=[cfg.manual_template]),
+        Stage("finalize", [cfg.auto_mapped], [cfg.final], finalize, {"templates": TEMPLATES}),
+    ]
+    if cfg.manual_prefill is not None:
+        stages.append(Stage("prefill", [cfg.suggest], [cfg.manual_prefill], prefill,
+                            {"prefill_threshold": cfg.prefill_threshold}))
+    return StageGraph(stages, cfg.cache_dir)
+
+
+def run_pipeline_memo(cfg):
+    """ステージグラフで実行する run_pipeline()。変化のないステージはキャッシュを使う"""
+    src = require_source(cfg)
+    backup_outputs(cfg)
+    ensure_manual_template(cfg.manual_template)
+
+    graph = build_graph(cfg, src)
+    graph.run()
+    print(f"Step: ステージ実行 {len(graph.ran)} 件 / スキップ {len(graph.skipped)} 件")
+
+    rows = read_csv(cfg.final)
+    print_summary(rows)
+    return graph
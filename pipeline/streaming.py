@@ -0,0 +1,134 @@
+# pipeline/streaming.py
+# 省メモリのストリーミング実行（--stream）
+# 行をジェネレータで読み、suggest → override → rescore → 書き出し を1行ずつ流す。
+# top100 は heapq で上位 K 件だけ保持する。全件をリストに載せないので、
+# メモリ使用量は入力件数に依存しない（キーワード頻度と業界集計は語彙・業界数に比例）。
+import csv
+from pathlib import Path
+from collections import Counter
+
+from pipeline.company_table import load_manual_map, apply_industry_row
+from pipeline.reports import TopK
+from pipeline.rules import FINAL_FIELDS, suggest_row, split_tokens, finalize_row, safe_int
+from pipeline.runner import (
+    PREFILL_FIELDS, AUTO_APPLY_LOG_FIELDS, backup_outputs, ensure_manual_template, require_source,
+    print_summary_counts, write_keyword_freq,
+)
+
+
+def open_source(src):
+    """src は Path か、テキストのファイルオブジェクトを返す関数"""
+    return src() if callable(src) else src.open(encoding="utf-8")
+
+
+def iter_csv(src):
+    """CSV を1行ずつ dict で返す（medical_relevance_score は空なら "0" に整備）"""
+    with open_source(src) as f:
+        for r in csv.DictReader(f):
+            r["medical_relevance_score"] = r.get("medical_relevance_score") or "0"
+            yield r
+
+
+def read_header(path: Path):
+    with path.open(encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+class RowWriter:
+    """DictWriter を開いたまま1行ずつ書く"""
+
+    def __init__(self, path: Path, fieldnames):
+        self.f = path.open("w", encoding="utf-8", newline="")
+        self.w = csv.DictWriter(self.f, fieldnames=list(fieldnames), extrasaction="ignore")
+        self.w.writeheader()
+        self.count = 0
+
+    def write(self, r):
+        self.w.writerow(r)
+        self.count += 1
+
+    def close(self):
+        self.f.close()
+
+
+def run_pipeline_stream(cfg):
+    """run_pipeline() のストリーミング版。
+
+    入力を2回読む: 1回目で top100 の行番号を決め、2回目で残りの処理を1パスで流す。
+    others_companies.csv と以降のファイルは入力順で書き出す（run_pipeline() はスコア順）。
+    """
+    src = require_source(cfg)
+    fieldnames = read_header(src)
+
+    store, run_id = backup_outputs(cfg)
+    # 入力が出力先（companies_master_final.csv へのフォールバック）なら、読みながら上書きしないようバックアップから読む
+    if src in cfg.outputs():
+        name = src.name
+        src = lambda: store.open_text(run_id, name)
+
+    # 1パス目: top100（heap で上位 K 件のみ保持）
+    top = TopK(cfg.top_n)
+    n = 0
+    for idx, r in enumerate(iter_csv(src)):
+        top.push(safe_int(r["medical_relevance_score"]), idx, r)
+        n += 1
+    if not n:
+        print("ERROR: 入力ファイルが空です。")
+        raise SystemExit(1)
+    top_items = top.items()
+    top_idx = {idx for idx, _ in top_items}
+    w_top = RowWriter(cfg.top100, fieldnames)
+    for _, r in top_items:
+        w_top.write(r)
+    w_top.close()
+    del top, top_items
+    print("Step: top100 を生成しました（heap 上位選択）。")
+
+    ensure_manual_template(cfg.manual_template)
+    manual_map = load_manual_map(cfg.manual_template)
+
+    # 2パス目: others / 候補 / 自動適用 / 最終化 を1行ずつ
+    auto_fieldnames = fieldnames + [k for k in ["industry"] if k not in fieldnames]
+    final_fieldnames = auto_fieldnames + [k for k in FINAL_FIELDS if k not in auto_fieldnames]
+    writers = {
+        "others": RowWriter(cfg.others, fieldnames),
+        "suggest": RowWriter(cfg.suggest, cfg.suggest_fields),
+        "auto": RowWriter(cfg.auto_mapped, auto_fieldnames),
+        "final": RowWriter(cfg.final, final_fieldnames),
+    }
+    if cfg.manual_prefill is not None:
+        writers["prefill"] = RowWriter(cfg.manual_prefill, PREFILL_FIELDS)
+    if cfg.auto_apply_log is not None:
+        writers["log"] = RowWriter(cfg.auto_apply_log, AUTO_APPLY_LOG_FIELDS)
+
+    token_freq = Counter()
+    industry_cnt = Counter()
+    score_sum = 0
+    try:
+        for idx, r in enumerate(iter_csv(src)):
+            if idx not in top_idx:
+                writers["others"].write(r)
+            s = suggest_row(r, cfg.keyword_map)
+            writers["suggest"].write(s)
+            token_freq.update(split_tokens(r.get("raw_medical_keywords")))
+            if "prefill" in writers and s["confidence"] >= cfg.prefill_threshold and s["suggested_industry"]:
+                writers["prefill"].write(s)
+            entry = apply_industry_row(r, s, manual_map, cfg.auto_apply_threshold)
+            if entry and "log" in writers:
+                writers["log"].write(entry)
+            writers["auto"].write(r)
+            finalize_row(r)
+            writers["final"].write(r)
+            industry_cnt[r.get("industry") or "その他"] += 1
+            score_sum += safe_int(r.get("medical_relevance_score"))
+    finally:
+        for w in writers.values():
+            w.close()
+    write_keyword_freq(cfg.keyword_freq, token_freq)
+    print("Step: others / 候補 / 自動適用 / 最終ファイルを1パスで書き出しました ->", cfg.final.name)
+    if "prefill" in writers:
+        print(f"Step: manual_prefill {writers['prefill'].count} 件")
+    if "log" in writers:
+        print(f"Step: 自動適用ログ {writers['log'].count} 件")
+
+    print_summary_counts(n, score_sum, industry_cnt)
@@ -0,0 +1,114 @@
+# pipeline/sweep.py
+# prefill / 自動適用の閾値チューニング（--sweep）
+# 候補生成は1回だけ行い、confidence などを配列で持ったまま閾値の組み合わせごとに件数を数える。
+# ファイルは一切書き出さない（入力と manual テンプレートを読むだけ）。
+import numpy as np
+
+from pipeline.categorical import Dictionary
+from pipeline.company_table import load_manual_map
+from pipeline.rules import suggest_row
+from pipeline.runner import find_source, load_source
+
+# 既定のグリッド（confidence は 0.55 / 0.7 / 0.85 / 0.95 のいずれか）
+DEFAULT_GRID = "0.4:0.95:0.05"
+
+
+def parse_grid(spec):
+    """'0.5,0.6,0.8' または 'start:stop:step'（stop を含む）→ 閾値のリスト"""
+    spec = spec.strip()
+    try:
+        if ":" in spec:
+            start, stop, step = (float(x) for x in spec.split(":"))
+            n = int(round((stop - start) / step)) + 1
+            values = [round(start + i * step, 4) for i in range(max(n, 0))]
+        else:
+            values = [round(float(x), 4) for x in spec.split(",") if x.strip()]
+    except (ValueError, ZeroDivisionError, OverflowError):
+        values = []
+    if not values:   # 'start:stop:step' の向きが逆・空の指定も空の表になるので不正とする
+        raise ValueError(f"閾値の指定が不正です: {spec!r}（'0.5,0.6,0.8' または 'start:stop:step'）")
+    return values
+
+
+class SweepData:
+    """閾値に依存しない部分（候補・元の業界・manual 指定）を配列にしたもの"""
+
+    def __init__(self, rows, manual_map, keyword_map, classifier=None):
+        if classifier is not None:
+            suggestions = classifier.suggest_rows(rows)
+        else:
+            suggestions = [suggest_row(r, keyword_map) for r in rows]
+        self.n = len(rows)
+        ind = Dictionary()
+        code = ind.code
+        self.industries = ind.values   # コード → 業界名
+
+        self.conf = np.array([float(s["confidence"] or 0) for s in suggestions])
+        self.has_suggestion = np.array([bool(s["suggested_industry"]) for s in suggestions])
+        self.suggested = np.array([code(s["suggested_industry"]) for s in suggestions], dtype=np.int64)
+        self.original = np.array([code(r.get("industry","") or "") for r in rows], dtype=np.int64)
+        cids = [r.get("company_id","") for r in rows]
+        self.manual = np.array([cid in manual_map for cid in cids])
+        self.manual_industry = np.array([code(manual_map.get(cid, "")) for cid in cids], dtype=np.int64)
+
+    def prefill_mask(self, threshold):
+        return self.has_suggestion & (self.conf >= threshold)
+
+    def auto_mask(self, threshold):
+        # manual 指定のある行は manual が優先される（apply_industry_row と同じ）
+        return ~self.manual & self.has_suggestion & (self.conf >= threshold)
+
+    def auto_stats(self, threshold):
+        auto = self.auto_mask(threshold)
+        changed = auto & (self.suggested != self.original)
+        # manual 指定がなければ自動適用されていた行（= manual と重なる行）
+        overlap = self.manual & self.has_suggestion & (self.conf >= threshold)
+        agree = overlap & (self.suggested == self.manual_industry)
+        by_industry = np.bincount(self.suggested[changed], minlength=len(self.industries))
+        return {
+            "threshold": threshold,
+            "auto_applied": int(auto.sum()),
+            "changed": int(changed.sum()),
+            "manual_overlap": int(overlap.sum()),
+            "manual_agree": int(agree.sum()),
+            "changes_by_industry": {self.industries[i]: int(c) for i, c in
+                                    sorted(enumerate(by_industry), key=lambda kv: -kv[1]) if c},
+        }
+
+    def pair_stats(self, prefill_threshold, auto_threshold):
+        prefill = self.prefill_mask(prefill_threshold)
+        auto = self.auto_mask(auto_threshold)
+        return {
+            "prefill": prefill_threshold,
+            "auto": auto_threshold,
+            "prefilled": int(prefill.sum()),
+            "prefilled_manual": int((prefill & self.manual).sum()),
+            "auto_applied": int(auto.sum()),
+            # prefill には入るが自動適用されず、manual 指定もない行（人がレビューする件数）
+            "review": int((prefill & ~auto & ~self.manual).sum()),
+        }
+
+
+def run_sweep(cfg, prefill_grid, auto_grid):
+    src = find_source(cfg)
+    table = load_source(cfg)
+    manual_map = load_manual_map(cfg.manual_template)
+    data = SweepData(table.rows, manual_map, cfg.keyword_map, cfg.classifier)
+    print(f"Step: 候補を1回生成しました（{data.n} 件 / manual 指定 {int(data.manual.sum())} 件）<- {src.name}")
+
+    print("\n===== AUTO APPLY =====")
+    print("閾値   適用  変更  manual重複(一致)  業界別の変更")
+    autos = [data.auto_stats(a) for a in auto_grid]
+    for st in autos:
+        changes = ", ".join(f"{k}:{v}" for k, v in list(st["changes_by_industry"].items())[:5])
+        print(f"{st['threshold']:<5} {st['auto_applied']:>5} {st['changed']:>5} "
+              f"{st['manual_overlap']:>8}({st['manual_agree']})  {changes}")
+
+    print("\n===== PREFILL x AUTO =====")
+    print("prefill auto   prefill件数(manual済) 自動適用 レビュー")
+    pairs = [data.pair_stats(p, a) for p in prefill_grid for a in auto_grid]
+    for st in pairs:
+        print(f"{st['prefill']:<7} {st['auto']:<6} {st['prefilled']:>8}({st['prefilled_manual']}) "
+              f"{st['auto_applied']:>10} {st['review']:>8}")
+    print(f"==================== ({len(pairs)} 組)\n")
+    return {"auto": autos, "pairs": pairs}
@@ -0,0 +1,140 @@
+# pipeline/synthetic.py
+# ベンチマーク用の合成データ（companies_master_raw.csv と同じ列）
+# 実データ（companies_master_raw.csv）から short_description・キーワード・領域・業界・スコアの
+# 出現分布を取り、その分布に従って任意件数の行を生成する。
+import argparse, csv, random
+from pathlib import Path
+from collections import Counter
+
+from pipeline.rules import split_tokens
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SOURCE = REPO_ROOT / "companies_master_raw.csv"
+
+FIELDS = ["company_id","company_name","short_description","medical_relevance_score","side_job_fit_score",
+          "career_shift_fit_score","hybrid_fit_score","industry","work_style","risk_level","learning_growth_score",
+          "target_background","note_for_coach","raw_medical_keywords","raw_medical_domains","raw_total_medical_score"]
+
+# 実データが無いときの最小限の語彙
+FALLBACK = {
+    "descriptions": ["医療・ヘルスケア分野に関連する事業を展開し、医療や生活者の健康を支援する企業です。",
+                     "医療機器の開発・製造を行い、医療現場で使われる製品を提供しています。",
+                     "介護・福祉サービスを提供し、高齢者支援や在宅ケアを行っています。"],
+    "tokens": ["医療","患者","臨床","介護","ヘルスケア","医療機器","診断","検査","製薬","看護","在宅","医療データ"],
+    "domains": ["", "医療機器メーカー", "介護・福祉", "医療IT・医療データ", "製薬・バイオ"],
+    "industries": ["その他医療関連", "介護・福祉", "医療IT・医療データ", "医療機器メーカー", "製薬・バイオ"],
+    "name_chars": "メディカルケアヘルスライフ医療薬品工業ABCDEFG",
+}
+
+
+class Vocab:
+    """値とその出現回数（重み）の組"""
+
+    def __init__(self, descriptions, tokens, token_counts, domains, industries, scores, name_chars):
+        self.descriptions = descriptions      # Counter
+        self.tokens = tokens                  # Counter
+        self.token_counts = token_counts      # 1行あたりのキーワード数の Counter
+        self.domains = domains
+        self.industries = industries
+        self.scores = scores
+        self.name_chars = name_chars
+
+    @classmethod
+    def from_master(cls, path: Path = DEFAULT_SOURCE):
+        if not path.exists():
+            return cls.fallback()
+        desc, toks, tcnt, doms, inds, scores, chars = Counter(), Counter(), Counter(), Counter(), Counter(), Counter(), set()
+        with path.open(encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                desc[r.get("short_description") or ""] += 1
+                ts = split_tokens(r.get("raw_medical_keywords"))
+                toks.update(ts)
+                tcnt[len(ts)] += 1
+                doms[r.get("raw_medical_domains") or ""] += 1
+                inds[r.get("industry") or ""] += 1
+                try:
+                    scores[int(r.get("medical_relevance_score") or 0)] += 1
+                except ValueError:
+                    scores[0] += 1
+                chars.update(r.get("company_name") or "")
+        if not desc:
+            return cls.fallback()
+        return cls(desc, toks, tcnt, doms, inds, scores, "".join(sorted(chars)))
+
+    @classmethod
+    def fallback(cls):
+        fb = FALLBACK
+        return cls(Counter(fb["descriptions"]), Counter(fb["tokens"]), Counter({0: 3, 2: 3, 5: 3, 8: 1}),
+                   Counter(fb["domains"]), Counter(fb["industries"]), Counter(range(0, 101)), fb["name_chars"])
+
+
+class Sampler:
+    """Counter の重みで値を引く（cum_weights を事前計算しておく）"""
+
+    def __init__(self, counter, rng):
+        self.values = list(counter.keys())
+        self.weights = list(counter.values())
+        self.rng = rng
+        cum, total = [], 0
+        for w in self.weights:
+            total += w
+            cum.append(total)
+        self.cum = cum
+
+    def draw(self, k=1):
+        return self.rng.choices(self.values, cum_weights=self.cum, k=k)
+
+
+def iter_rows(n, vocab=None, seed=0):
+    """n 行の合成企業行を返すジェネレータ"""
+    vocab = vocab or Vocab.from_master()
+    rng = random.Random(seed)
+    desc = Sampler(vocab.descriptions, rng)
+    toks = Sampler(vocab.tokens, rng)
+    tcnt = Sampler(vocab.token_counts, rng)
+    doms = Sampler(vocab.domains, rng)
+    inds = Sampler(vocab.industries, rng)
+    scores = Sampler(vocab.scores, rng)
+    chars = vocab.name_chars
+    for i in range(1, n + 1):
+        k = tcnt.draw()[0]
+        kws = list(dict.fromkeys(toks.draw(k))) if k else []
+        ms = scores.draw()[0]
+        yield {
+            "company_id": str(i),
+            "company_name": "".join(rng.choices(chars, k=rng.randint(3, 10))),
+            "short_description": desc.draw()[0],
+            "medical_relevance_score": ms,
+            "side_job_fit_score": "",
+            "career_shift_fit_score": "",
+            "hybrid_fit_score": "",
+            "industry": inds.draw()[0],
+            "work_style": "",
+            "risk_level": "",
+            "learning_growth_score": "",
+            "target_background": "",
+            "note_for_coach": "",
+            "raw_medical_keywords": ",".join(kws),
+            "raw_medical_domains": doms.draw()[0],
+            "raw_total_medical_score": ms + len(kws),
+        }
+
+
+def generate(n, out: Path, vocab=None, seed=0):
+    with Path(out).open("w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        for r in iter_rows(n, vocab, seed):
+            w.writerow(r)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合成の companies_master_raw.csv を作る")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("out", nargs="?", default="companies_master_raw.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", default=str(DEFAULT_SOURCE), help="分布を取る実データ")
+    args = parser.parse_args()
+    generate(args.rows, Path(args.out), Vocab.from_master(Path(args.source)), args.seed)
+    print("書き出し完了:", args.out)
@@ -0,0 +1,192 @@
+# pipeline/watch.py
+# 常駐の監視モード（--watch）
+# companies_master_raw.csv と manual_industry_map_template.csv を watchdog で監視し、保存されたら
+# 変化した分だけ再計算して出力を書き直す。プロセスを起動したままなので、読み込み済みの表・
+# 行ごとの結果はメモリに残る（起動し直しや全件の再計算をしない）。
+#
+#   raw が変わった      : 内容ハッシュの変わった行だけ候補生成からやり直し、すべての出力を書き直す
+#   manual だけ変わった : manual 指定が変わった行だけ適用・スコア再計算し、
+#                         companies_master_auto.csv / 最終ファイル / 自動適用ログだけを書き直す
+#
+# 連続した保存（エディタの一時ファイル・連続保存）は debounce 秒だけ待ってまとめて1回処理する。
+# 出力は run_pipeline() と同じ内容になる。
+import csv, threading, time
+from pathlib import Path
+from collections import Counter
+
+from pipeline.backup_store import sha256_file
+from pipeline.company_table import write_csv, load_manual_map, apply_industry_row
+from pipeline.incremental import row_hash
+from pipeline.rules import FINAL_FIELDS, suggest_row, split_tokens, finalize_rows
+from pipeline.runner import (
+    PREFILL_FIELDS, AUTO_APPLY_LOG_FIELDS, backup_outputs, ensure_manual_template, find_source, load_source,
+    prefill_rows, print_summary, write_keyword_freq,
+)
+
+DEFAULT_DEBOUNCE = 1.0   # 最後の保存からこの秒数だけ待って実行する
+
+
+class WarmPipeline:
+    """読み込み済みの表と行ごとの結果をメモリに持ち、変化した分だけ再計算する"""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.table = None         # スコア順の元の行（出力用の行はここからコピーして作る）
+        self.hashes = []          # table の行ごとの内容ハッシュ
+        self.source_digest = None
+        self.manual_digest = None
+        self.manual_map = {}
+        self.results = {}         # 行の内容ハッシュ → {"suggestion", "manual", "industry", "log", "final"}
+        self.token_freq = Counter()
+
+    def _digest(self, path: Path):
+        return sha256_file(path) if path.exists() else None
+
+    def refresh(self):
+        """入力ファイルの内容が変わったかを調べて (raw の変化, manual の変化) を返す"""
+        src = find_source(self.cfg)
+        source_digest = self._digest(src) if src else None
+        manual_digest = self._digest(self.cfg.manual_template)
+        changed = (source_digest != self.source_digest, manual_digest != self.manual_digest)
+        self.source_digest, self.manual_digest = source_digest, manual_digest
+        return changed
+
+    def run(self, force=False):
+        """変化があれば再計算して出力する。実行したかどうかを返す"""
+        raw_changed, manual_changed = self.refresh()
+        if force:
+            raw_changed = manual_changed = True
+        if not (raw_changed or manual_changed):
+            return False
+        if self.source_digest is None:
+            print("ERROR: " + " または ".join(p.name for p in self.cfg.sources) + " がありません（保存を待ちます）。")
+            return False
+        t0 = time.perf_counter()
+        cfg = self.cfg
+        backup_outputs(cfg)
+
+        # 1. 入力の読み込み・top100 / others 分割・候補生成（raw が変わったときだけ）
+        if raw_changed or self.table is None:
+            try:
+                table = load_source(cfg).sorted_by("medical_relevance_score")
+            except SystemExit:   # 空ファイルなど。次の保存で読み直す
+                self.source_digest = self.manual_digest = None
+                return False
+            top, others = table.split(cfg.top_n)
+            write_csv(cfg.top100, top, fieldnames=table.fieldnames)
+            write_csv(cfg.others, others, fieldnames=table.fieldnames)
+            print("Step: top100 / others を生成しました。")
+            self.token_freq = Counter()
+            suggestions = []
+            hashes = []
+            results = {}
+            for r in table:
+                self.token_freq.update(split_tokens(r.get("raw_medical_keywords")))
+                h = row_hash(r)
+                # 内容の変わった行（= 新しいハッシュ）は候補生成・manual 判定からやり直す
+                ent = results.get(h) or self.results.get(h) or {"suggestion": suggest_row(r, cfg.keyword_map),
+                                                                 "manual": None}
+                results[h] = ent
+                hashes.append(h)
+                suggestions.append(ent["suggestion"])
+            self.table, self.hashes, self.results = table, hashes, results
+            write_csv(cfg.suggest, suggestions, fieldnames=cfg.suggest_fields)
+            write_keyword_freq(cfg.keyword_freq, self.token_freq)
+            print("Step: 自動候補とキーワード頻度を出力しました。")
+            if cfg.manual_prefill is not None:
+                write_csv(cfg.manual_prefill, prefill_rows(suggestions, cfg.prefill_threshold), fieldnames=PREFILL_FIELDS)
+        if manual_changed:
+            ensure_manual_template(cfg.manual_template)
+            self.manual_map = load_manual_map(cfg.manual_template)
+
+        # 2. manual override / 自動適用・スコア再計算（manual 指定か内容が変わった行だけ）
+        fieldnames = self.table.fieldnames
+        auto_fieldnames = fieldnames + [k for k in ["industry"] if k not in fieldnames]
+        final_fieldnames = auto_fieldnames + [k for k in FINAL_FIELDS if k not in auto_fieldnames]
+        rows = [dict(r) for r in self.table]
+        log = []
+        pending = []    # 再計算する (結果, 行)
+        followers = []  # 同じ内容の行が先に再計算待ちになっている (結果, 行)
+        with cfg.auto_mapped.open("w", encoding="utf-8", newline="") as f_auto:
+            w_auto = csv.DictWriter(f_auto, fieldnames=auto_fieldnames, extrasaction="ignore")
+            w_auto.writeheader()
+            for r, h in zip(rows, self.hashes):
+                manual = self.manual_map.get(r.get("company_id",""), "")
+                ent = self.results[h]
+                if ent["manual"] == manual:
+                    r["industry"] = ent["industry"]
+                    entry = ent["log"]
+                    w_auto.writerow(r)
+                    if ent["final"] is None:
+                        followers.append((ent, r))
+                    else:
+                        r.update(ent["final"])
+                else:
+                    entry = apply_industry_row(r, ent["suggestion"], self.manual_map, cfg.auto_apply_threshold)
+                    w_auto.writerow(r)
+                    ent.update({"manual": manual, "industry": r.get("industry",""), "log": entry, "final": None})
+                    pending.append((ent, r))
+                if entry:
+                    log.append(entry)
+        finalize_rows([r for _, r in pending])
+        for ent, r in pending:
+            ent["final"] = {k: r[k] for k in FINAL_FIELDS}
+        for ent, r in followers:
+            r.update(ent["final"])
+
+        if cfg.auto_apply_log is not None:
+            write_csv(cfg.auto_apply_log, log, fieldnames=AUTO_APPLY_LOG_FIELDS)
+        write_csv(cfg.final, rows, fieldnames=final_fieldnames)
+        print(f"Step: 最終ファイルを書き出しました -> {cfg.final.name}"
+              f"（再計算 {len(pending)} 件 / 再利用 {len(rows) - len(pending)} 件・{time.perf_counter() - t0:.2f} 秒）")
+        print_summary(rows)
+        return True
+
+
+def watched_paths(cfg):
+    """監視するファイル（出力先を兼ねる入力候補は自分の書き出しで再実行しないよう除く）"""
+    outputs = set(cfg.outputs()) - {cfg.manual_template}
+    return [p for p in cfg.sources if p not in outputs] + [cfg.manual_template]
+
+
+def watch(cfg, debounce=DEFAULT_DEBOUNCE, after_run=None):
+    """Ctrl+C まで監視を続ける。after_run は出力を書き直すたびに呼ぶ（変更セットの記録など）"""
+    # watchdog は監視モードでだけ読み込む
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    targets = {p.resolve() for p in watched_paths(cfg)}
+    dirty = threading.Event()
+    last_event = [0.0]
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            # エディタは一時ファイルからの rename で保存することがあるので移動先も見る
+            paths = [getattr(event, "src_path", ""), getattr(event, "dest_path", "")]
+            if any(p and Path(p).resolve() in targets for p in paths):
+                last_event[0] = time.monotonic()
+                dirty.set()
+
+    warm = WarmPipeline(cfg)
+    if warm.run(force=True) and after_run:
+        after_run()
+    observer = Observer()
+    for d in {p.parent for p in targets}:
+        observer.schedule(Handler(), str(d), recursive=False)
+    observer.start()
+    print("Step: 監視中（Ctrl+C で終了）:", ", ".join(sorted(p.name for p in targets)))
+    try:
+        while True:
+            if not dirty.wait(timeout=0.5):
+                continue
+            # 最後の保存から debounce 秒たつまで待つ（その間の保存はまとめる）
+            while time.monotonic() - last_event[0] < debounce:
+                time.sleep(0.1)
+            dirty.clear()
+            if warm.run() and after_run:
+                after_run()
+    except KeyboardInterrupt:
+        print("Step: 監視を終了します。")
+    finally:
+        observer.stop()
+        observer.join()
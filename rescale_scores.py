@@ -1,71 +1,82 @@
 # rescale_scores.py
-import csv
+#
+#   python rescale_scores.py                 入力全件で分布スケッチを作り直して正規化
+#   python rescale_scores.py --save-sketch   さらにそのスケッチを score_sketch.json に保存
+#   python rescale_scores.py --reuse-sketch  保存済みのスケッチ（既存の分布）に対して入力を正規化
+#   python rescale_scores.py --reuse-sketch --add-to-sketch
+#                                            さらに入力のスコアをスケッチに追加して保存（新規企業の取り込み）
+import argparse, csv, sys
 from pathlib import Path
 import numpy as np
 
+from pipeline.quantiles import KLLSketch, breakpoints, rescale
+from pipeline.scoring import RESCALE_RULES, score_rows
+
 IN = Path("companies_master_reclassified_v4.csv")
 OUT = Path("companies_master_scored_v2.csv")
+SKETCH = Path("score_sketch.json")
+
 
-rows = []
-with IN.open(encoding="utf-8") as f:
-    r = csv.DictReader(f)
-    for row in r:
-        try:
-            row["medical_relevance_score"] = int(row.get("medical_relevance_score") or 0)
-        except:
-            row["medical_relevance_score"] = 0
-        rows.append(row)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="medical_relevance_score のパーセンタイル正規化とスコア再計算")
+    parser.add_argument("--reuse-sketch", action="store_true", help="保存済みの分布スケッチに対して正規化する")
+    parser.add_argument("--add-to-sketch", action="store_true", help="入力のスコアをスケッチに追加して保存する")
+    parser.add_argument("--save-sketch", action="store_true", help="入力全件で作ったスケッチを保存する（--reuse-sketch で使う）")
+    parser.add_argument("--sketch", default=str(SKETCH))
+    args = parser.parse_args(argv)
+    sketch_path = Path(args.sketch)
+    if args.add_to_sketch and not args.reuse_sketch:
+        print("ERROR: --add-to-sketch は --reuse-sketch と一緒に指定してください。")
+        return 1
+    if args.save_sketch and args.reuse_sketch:
+        print("ERROR: --save-sketch と --reuse-sketch は併用できません（保存済みのスケッチに足すときは --add-to-sketch）。")
+        return 1
 
-scores = np.array([r["medical_relevance_score"] for r in rows])
-if len(scores) == 0:
-    raise SystemExit("データがありません")
+    rows = []
+    with IN.open(encoding="utf-8") as f:
+        r = csv.DictReader(f)
+        for row in r:
+            try:
+                row["medical_relevance_score"] = int(row.get("medical_relevance_score") or 0)
+            except:
+                row["medical_relevance_score"] = 0
+            rows.append(row)
 
-# パーセンタイル正規化（0-100）
-pcts = np.percentile(scores, np.linspace(0,100,101))
-def percentile_scale(x):
-    # x を 0-100 にマップ（0-100 のままだが分布を滑らかに）
-    return int(np.interp(x, pcts, np.linspace(0,100,101)))
+    scores = np.array([r["medical_relevance_score"] for r in rows])
+    if len(scores) == 0:
+        raise SystemExit("データがありません")
 
-for r in rows:
-    ms = r["medical_relevance_score"]
-    ms_scaled = percentile_scale(ms)
-    r["medical_relevance_score"] = ms_scaled
-    # 再計算ルール（例）
-    if ms_scaled >= 85:
-        s = 90; c = 30
-    elif ms_scaled >= 65:
-        s = 75; c = 40
-    elif ms_scaled >= 40:
-        s = 60; c = 60
-    elif ms_scaled >= 15:
-        s = 45; c = 75
+    # パーセンタイル正規化（0-100）
+    # x を 0-100 にマップ（0-100 のままだが分布を滑らかに）。分布は KLL スケッチで持ち、全件まとめて補間する
+    if args.reuse_sketch:
+        if not sketch_path.exists():
+            raise SystemExit(f"{sketch_path} がありません（先に --save-sketch で実行してください）")
+        sketch = KLLSketch.load(sketch_path)
+        if args.add_to_sketch:
+            sketch.merge(KLLSketch(k=sketch.k).update_many(scores))
+            sketch.save(sketch_path)
     else:
-        s = 25; c = 85
-    r["side_job_fit_score"] = s
-    r["career_shift_fit_score"] = c
-    r["hybrid_fit_score"] = int((s + c) / 2)
-    # learning_growth: ms_scaled に応じて
-    if ms_scaled >= 80: lg = 80
-    elif ms_scaled >= 50: lg = 65
-    elif ms_scaled >= 20: lg = 45
-    else: lg = 30
-    r["learning_growth_score"] = lg
-    # risk_level: 業界ベース微調整
-    ind = (r.get("industry") or "")
-    base = 45
-    if "医療機器" in ind: base = 40
-    if "製薬" in ind or "バイオ" in ind: base = 50
-    if "医療it" in ind or "医療IT" in ind: base = 30
-    if ms_scaled >= 80: base -= 10
-    if ms_scaled <= 10: base += 10
-    r["risk_level"] = max(10, min(90, base))
+        sketch = KLLSketch().update_many(scores)
+        if args.save_sketch:
+            sketch.save(sketch_path)
+    scaled = rescale(scores, breakpoints(sketch))
+    for r, ms_scaled in zip(rows, scaled.tolist()):
+        r["medical_relevance_score"] = ms_scaled
+
+    # 再計算ルール（帯・業界ベースの risk_level）は pipeline/scoring.py の RESCALE_RULES
+    score_rows(rows, RESCALE_RULES, ms=scaled)
+
+    # write out
+    with OUT.open("w", encoding="utf-8", newline="") as f_out:
+        fieldnames = list(rows[0].keys())
+        writer = csv.DictWriter(f_out, fieldnames=fieldnames)
+        writer.writeheader()
+        for r in rows:
+            writer.writerow(r)
+
+    print("書き出し完了:", OUT)
+    return 0
 
-# write out
-with OUT.open("w", encoding="utf-8", newline="") as f_out:
-    fieldnames = list(rows[0].keys())
-    writer = csv.DictWriter(f_out, fieldnames=fieldnames)
-    writer.writeheader()
-    for r in rows:
-        writer.writerow(r)
 
-print("書き出し完了:", OUT)
+if __name__ == "__main__":
+    sys.exit(main())
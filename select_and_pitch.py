@@ -10,6 +10,8 @@ import requests
 from requests.exceptions import RequestException
 import time
 
+from pipeline.company import load_companies
+
 ROOT = Path.cwd()
 INPUT = ROOT / "companies_master_final.csv"
 CAND20 = ROOT / "candidates_top20.csv"
@@ -29,22 +31,12 @@ CAREER_PATHS = [             # 企業サイト上の採用ページ候補パス
 HTTP_TIMEOUT = 5             # seconds for HEAD requests
 USER_AGENT = "Mozilla/5.0 (compatible; CandidateChecker/1.0)"
 
-def read_csv(path):
-    with path.open(encoding="utf-8") as f:
-        return list(csv.DictReader(f))
-
-def write_csv(path, rows, fieldnames):
+def write_csv(path, companies, fieldnames):
     with path.open("w", encoding="utf-8", newline="") as f:
         w = csv.DictWriter(f, fieldnames=fieldnames)
         w.writeheader()
-        for r in rows:
-            w.writerow(r)
-
-def safe_int(v, default=0):
-    try:
-        return int(float(v))
-    except:
-        return default
+        for c in companies:
+            w.writerow(c.to_row(fieldnames))
 
 def check_career_urls(base_url):
     """簡易チェック: base_url があれば CAREER_PATHS を HEAD で試す。
@@ -73,13 +65,13 @@ def check_career_urls(base_url):
             continue
     return False, ""
 
-def generate_pitch(row):
+def generate_pitch(c):
     """短いピッチ（3行）を自動生成"""
-    name = row.get("company_name","").strip()
-    industry = row.get("industry","") or "業界情報なし"
-    score = safe_int(row.get("medical_relevance_score",0))
-    hybrid = safe_int(row.get("hybrid_fit_score",0))
-    risk = safe_int(row.get("risk_level",0))
+    name = c.company_name.strip()
+    industry = c.industry or "業界情報なし"
+    score = c.score("medical_relevance_score")
+    hybrid = c.score("hybrid_fit_score")
+    risk = c.score("risk_level")
     reason = []
     reason.append(f"理由: 医療関連性 {score} / ハイブリッド適合 {hybrid}、業界: {industry}。")
     # 強調点
@@ -103,32 +95,28 @@ def main():
         print("ERROR: companies_master_final.csv が見つかりません。プロジェクトルートに配置してください。")
         sys.exit(1)
 
-    rows = read_csv(INPUT)
+    # 数値列は読み込み時に1回だけ int にする
+    companies, fieldnames = load_companies(INPUT)
     # フィルタ条件で候補抽出
-    candidates = []
-    for r in rows:
-        ms = safe_int(r.get("medical_relevance_score",0))
-        hy = safe_int(r.get("hybrid_fit_score",0))
-        rl = safe_int(r.get("risk_level",0))
-        if ms >= MIN_MEDICAL_SCORE and hy >= MIN_HYBRID_SCORE and rl <= MAX_RISK_LEVEL:
-            candidates.append(r)
+    candidates = [c for c in companies
+                  if c.score("medical_relevance_score") >= MIN_MEDICAL_SCORE
+                  and c.score("hybrid_fit_score") >= MIN_HYBRID_SCORE
+                  and c.score("risk_level") <= MAX_RISK_LEVEL]
     # スコア順にソート
-    candidates_sorted = sorted(candidates, key=lambda x: safe_int(x.get("medical_relevance_score",0)), reverse=True)
+    candidates_sorted = sorted(candidates, key=lambda c: c.score("medical_relevance_score"), reverse=True)
     top_candidates = candidates_sorted[:TOP_N_CANDIDATES]
     if not top_candidates:
         print("候補が見つかりませんでした。閾値を下げるかデータを確認してください。")
         sys.exit(0)
 
     # 書き出し: candidates_top20.csv
-    fieldnames = list(top_candidates[0].keys())
     write_csv(CAND20, top_candidates, fieldnames=fieldnames)
     print(f"候補上位 {len(top_candidates)} 件を {CAND20.name} に出力しました。")
 
     # 簡易求人チェック: company_website または raw_medical_domains を利用
-    enriched = []
-    for r in top_candidates:
+    for c in top_candidates:
         # try to find a website field; common columns: company_website, website, url, raw_medical_domains
-        base = r.get("company_website") or r.get("website") or r.get("url") or r.get("raw_medical_domains") or ""
+        base = c.get("company_website") or c.get("website") or c.get("url") or c.raw_medical_domains or ""
         # if raw_medical_domains contains comma-separated domains, take first
         if base and "," in base:
             base = base.split(",")[0].strip()
@@ -137,34 +125,32 @@ def main():
             has_jobs, matched_url = check_career_urls(base)
             # small delay to be polite
             time.sleep(0.2)
-        r2 = dict(r)
-        r2["has_open_jobs"] = "1" if has_jobs else "0"
-        r2["matched_jobs_url"] = matched_url
-        enriched.append(r2)
+        c["has_open_jobs"] = "1" if has_jobs else "0"
+        c["matched_jobs_url"] = matched_url
 
     # write candidates with job check
-    fieldnames2 = list(enriched[0].keys())
-    write_csv(CAND20_JOBS, enriched, fieldnames=fieldnames2)
+    fieldnames2 = fieldnames + ["has_open_jobs", "matched_jobs_url"]
+    write_csv(CAND20_JOBS, top_candidates, fieldnames=fieldnames2)
     print(f"求人チェック結果を {CAND20_JOBS.name} に出力しました。")
 
     # 最終選定: 採用シグナル優先 -> medical_relevance_score 降順
-    with_jobs = [r for r in enriched if r.get("has_open_jobs") == "1"]
-    without_jobs = [r for r in enriched if r.get("has_open_jobs") != "1"]
-    ordered = sorted(with_jobs, key=lambda x: safe_int(x.get("medical_relevance_score",0)), reverse=True) + \
-              sorted(without_jobs, key=lambda x: safe_int(x.get("medical_relevance_score",0)), reverse=True)
+    with_jobs = [c for c in top_candidates if c.get("has_open_jobs") == "1"]
+    without_jobs = [c for c in top_candidates if c.get("has_open_jobs") != "1"]
+    ordered = sorted(with_jobs, key=lambda c: c.score("medical_relevance_score"), reverse=True) + \
+              sorted(without_jobs, key=lambda c: c.score("medical_relevance_score"), reverse=True)
     final3 = ordered[:TOP_K_FINAL]
     if not final3:
         print("最終候補が見つかりません。")
         sys.exit(0)
 
     # 出力 final_3_recommendations.csv
-    write_csv(FINAL3, final3, fieldnames=list(final3[0].keys()))
+    write_csv(FINAL3, final3, fieldnames=fieldnames2)
     print(f"最終3社を {FINAL3.name} に出力しました。")
 
     # ピッチ生成
     with PITCH.open("w", encoding="utf-8") as f:
-        for r in final3:
-            pitch = generate_pitch(r)
+        for c in final3:
+            pitch = generate_pitch(c)
             f.write(pitch + "\n\n" + ("-"*40) + "\n\n")
     print(f"各社の短いピッチを {PITCH.name} に出力しました。")
 
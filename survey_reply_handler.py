@@ -6,10 +6,11 @@
 
 import os
 import json
-import pandas as pd
 from linebot import LineBotApi
 from linebot.models import TextSendMessage
 
+from pipeline.company import load_companies
+
 # --- 設定 ---
 # 環境変数に設定することを推奨
 CHANNEL_ACCESS_TOKEN = os.environ.get("LINE_CHANNEL_ACCESS_TOKEN", "YOUR_CHANNEL_ACCESS_TOKEN")
@@ -18,12 +19,6 @@ CSV_PATH = os.path.join(os.getcwd(), "companies_master_final.csv")  # 必ず最
 
 line_api = LineBotApi(CHANNEL_ACCESS_TOKEN)
 
-def _safe_int(v, default=0):
-    try:
-        return int(float(v))
-    except Exception:
-        return default
-
 def select_top3_from_csv(csv_path, survey_payload=None):
     """
     companies_master_final.csv を読み、合成スコアで上位3社を返す
@@ -32,24 +27,21 @@ def select_top3_from_csv(csv_path, survey_payload=None):
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"{csv_path} が見つかりません")
 
-    df = pd.read_csv(csv_path, dtype=str).fillna("")
-    # 数値化
-    df["medical_relevance_score"] = pd.to_numeric(df.get("medical_relevance_score", 0), errors="coerce").fillna(0)
-    df["hybrid_fit_score"] = pd.to_numeric(df.get("hybrid_fit_score", 0), errors="coerce").fillna(0)
-    df["risk_level"] = pd.to_numeric(df.get("risk_level", 0), errors="coerce").fillna(100)
+    # 数値列は小数も切り捨てずに使う（空欄・不正値は number() の既定値）
+    companies, _ = load_companies(csv_path)
 
-    # 合成スコア（既存提案ロジック）
-    df["composite"] = df["medical_relevance_score"] * 2 + df["hybrid_fit_score"] - df["risk_level"]
-    df_sorted = df.sort_values(by="composite", ascending=False)
+    # 合成スコア（既存提案ロジック）。risk_level が無い企業は 100 とみなす
+    def composite(c):
+        return c.number("medical_relevance_score") * 2 + c.number("hybrid_fit_score") - c.number("risk_level", 100)
 
     top3 = []
-    for _, row in df_sorted.head(3).iterrows():
+    for c in sorted(companies, key=composite, reverse=True)[:3]:
         top3.append({
-            "company_name": row.get("company_name", "").strip(),
-            "industry": row.get("industry", "").strip(),
-            "overview": (row.get("short_description", "") or row.get("company_overview", "")).strip(),
-            "medical_relevance_score": int(row.get("medical_relevance_score") or 0),
-            "hybrid_fit_score": int(row.get("hybrid_fit_score") or 0)
+            "company_name": c.company_name.strip(),
+            "industry": c.industry.strip(),
+            "overview": (c.short_description or c.get("company_overview", "")).strip(),
+            "medical_relevance_score": int(c.number("medical_relevance_score")),
+            "hybrid_fit_score": int(c.number("hybrid_fit_score"))
         })
     return top3
 